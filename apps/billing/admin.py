@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Invoice, InvoiceItem, Payment, TaxRate, Discount
+from .models import Invoice, InvoiceItem, Payment, TaxRate, Discount, DiscountRedemption, NightAudit, Folio, FolioEntry, BankStatement, StatementLine
 
 
 @admin.register(Invoice)
@@ -18,7 +18,7 @@ class InvoiceAdmin(admin.ModelAdmin):
             'fields': ('customer_name', 'customer_email', 'customer_phone', 'customer_address')
         }),
         ('Financial Information', {
-            'fields': ('subtotal', 'tax_amount', 'discount_amount', 'total_amount', 'paid_amount')
+            'fields': ('subtotal', 'tax_amount', 'discount_amount', 'total_amount', 'paid_amount', 'balance_amount', 'last_payment_at')
         }),
         ('Status', {
             'fields': ('status',)
@@ -36,7 +36,7 @@ class InvoiceAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('balance_amount', 'last_payment_at', 'created_at', 'updated_at')
 
 
 @admin.register(InvoiceItem)
@@ -62,7 +62,7 @@ class InvoiceItemAdmin(admin.ModelAdmin):
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ('invoice', 'amount', 'payment_method', 'payment_status', 'payment_date', 'transaction_id')
-    list_filter = ('payment_method', 'payment_status', 'payment_date')
+    list_filter = ('payment_method', 'payment_status', 'payment_date', 'reconciled_at')
     search_fields = ('invoice__invoice_number', 'transaction_id', 'processed_by__username')
     ordering = ('-payment_date',)
     
@@ -71,7 +71,7 @@ class PaymentAdmin(admin.ModelAdmin):
             'fields': ('invoice', 'amount', 'payment_method', 'payment_status', 'transaction_id')
         }),
         ('Processing', {
-            'fields': ('payment_date', 'processed_by')
+            'fields': ('payment_date', 'processed_by', 'reconciled_at')
         }),
         ('Notes', {
             'fields': ('notes',),
@@ -79,19 +79,19 @@ class PaymentAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ('payment_date',)
+    readonly_fields = ('payment_date', 'reconciled_at')
 
 
 @admin.register(TaxRate)
 class TaxRateAdmin(admin.ModelAdmin):
-    list_display = ('name', 'rate', 'is_active', 'created_at')
-    list_filter = ('is_active', 'created_at')
+    list_display = ('name', 'rate', 'applies_to', 'is_active', 'created_at')
+    list_filter = ('applies_to', 'is_active', 'created_at')
     search_fields = ('name', 'description')
     ordering = ('name',)
     
     fieldsets = (
         ('Tax Rate Information', {
-            'fields': ('name', 'rate', 'description', 'is_active')
+            'fields': ('name', 'rate', 'applies_to', 'description', 'is_active')
         }),
         ('Timestamps', {
             'fields': ('created_at',),
@@ -128,4 +128,138 @@ class DiscountAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ('created_at',)
+    readonly_fields = ('used_count', 'created_at')
+
+
+@admin.register(DiscountRedemption)
+class DiscountRedemptionAdmin(admin.ModelAdmin):
+    list_display = ('code', 'discount', 'invoice', 'order_amount', 'discount_amount', 'redeemed_by', 'redeemed_at')
+    list_filter = ('redeemed_at',)
+    search_fields = ('code', 'invoice__invoice_number')
+    date_hierarchy = 'redeemed_at'
+    ordering = ('-redeemed_at',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class StatementLineInline(admin.TabularInline):
+    model = StatementLine
+    extra = 0
+    can_delete = False
+    fields = ('line_number', 'posted_on', 'amount', 'reference', 'description', 'match_source', 'match_id', 'match_rule')
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(BankStatement)
+class BankStatementAdmin(admin.ModelAdmin):
+    list_display = ('name', 'date_from', 'date_to', 'line_count', 'matched_count', 'matched_amount', 'imported_by', 'imported_at')
+    list_filter = ('file_format', 'imported_at')
+    search_fields = ('name',)
+    date_hierarchy = 'imported_at'
+    ordering = ('-imported_at',)
+    readonly_fields = ('name', 'file_format', 'date_from', 'date_to', 'window_days', 'line_count', 'matched_count',
+                       'total_amount', 'matched_amount', 'imported_at', 'imported_by')
+    inlines = [StatementLineInline]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(NightAudit)
+class NightAuditAdmin(admin.ModelAdmin):
+    list_display = ('business_date', 'occupied_rooms', 'occupancy_rate', 'no_show_count', 'overdue_invoice_count', 'overdue_stay_count', 'completed_at')
+    date_hierarchy = 'business_date'
+    ordering = ('-business_date',)
+
+    fieldsets = (
+        ('Audit', {
+            'fields': ('business_date', 'started_at', 'completed_at', 'run_by')
+        }),
+        ('Transitions', {
+            'fields': ('no_show_count', 'overdue_invoice_count', 'overdue_restaurant_invoice_count', 'overdue_stay_count')
+        }),
+        ('Occupancy', {
+            'fields': ('total_rooms', 'out_of_service_rooms', 'occupied_rooms', 'arrivals', 'departures')
+        }),
+        ('Revenue', {
+            'fields': ('room_revenue', 'restaurant_revenue', 'payments_received')
+        }),
+        ('Details', {
+            'fields': ('details',),
+            'classes': ('collapse',)
+        }),
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class FolioEntryInline(admin.TabularInline):
+    model = FolioEntry
+    fields = ('sequence', 'posted_at', 'entry_type', 'source', 'description', 'amount', 'running_balance', 'posted_by')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Folio)
+class FolioAdmin(admin.ModelAdmin):
+    list_display = ('folio_number', 'booking', 'guest', 'status', 'total_charges', 'total_payments', 'balance', 'opened_at')
+    list_filter = ('status', 'opened_at')
+    search_fields = ('folio_number', 'booking__booking_number', 'guest__first_name', 'guest__last_name')
+    ordering = ('-opened_at',)
+    inlines = [FolioEntryInline]
+
+    fieldsets = (
+        ('Folio', {
+            'fields': ('folio_number', 'booking', 'guest', 'status', 'opened_at', 'closed_at')
+        }),
+        ('Totals', {
+            'fields': ('total_charges', 'total_payments', 'total_adjustments', 'balance', 'entry_count')
+        }),
+    )
+
+    readonly_fields = ('folio_number', 'booking', 'guest', 'status', 'opened_at', 'closed_at',
+                       'total_charges', 'total_payments', 'total_adjustments', 'balance', 'entry_count')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(FolioEntry)
+class FolioEntryAdmin(admin.ModelAdmin):
+    list_display = ('folio', 'sequence', 'entry_type', 'source', 'description', 'amount', 'running_balance', 'posted_at')
+    list_filter = ('entry_type', 'source', 'posted_at')
+    search_fields = ('folio__folio_number', 'description', 'reference', 'posting_key')
+    ordering = ('-posted_at',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
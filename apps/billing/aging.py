@@ -0,0 +1,177 @@
+"""
+Accounts-receivable aging.
+
+Open amounts come from three ledgers: unpaid billing invoices (their running
+``balance_amount``), unpaid restaurant invoices and conference bookings with
+a balance. Each ledger is annotated to the same columns (customer, kind,
+due date, amount) and the three are combined with ``UNION ALL``, so the
+bucket sums for every customer and receivable type come back from a single
+query using conditional aggregation. Nothing is evaluated per invoice in
+Python; the per-customer and per-type totals are folded from the grouped
+rows.
+
+Records that a billing invoice already covers (a conference booking or a
+restaurant order invoiced through billing) are left out of their own ledger
+so the same debt is never counted twice.
+
+Days overdue are counted from the due date: a conference booking falls due
+when its event ends.
+"""
+from collections import OrderedDict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import models
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from apps.conference.models import ConferenceBooking
+from apps.restaurant.models import RestaurantInvoice
+from .models import Invoice
+
+
+ZERO = Decimal('0.00')
+
+BUCKETS = [
+    ('current', 'Current'),
+    ('days_1_30', '1-30 days'),
+    ('days_31_60', '31-60 days'),
+    ('days_61_90', '61-90 days'),
+    ('days_90_plus', '90+ days'),
+]
+
+CLOSED_INVOICE_STATUSES = ['paid', 'cancelled']
+
+MONEY = models.DecimalField(max_digits=12, decimal_places=2)
+
+
+def bucket_filters(as_of):
+    """Q filter on the ``due`` column for each bucket"""
+    return OrderedDict([
+        ('current', Q(due__gte=as_of)),
+        ('days_1_30', Q(due__lt=as_of, due__gte=as_of - timedelta(days=30))),
+        ('days_31_60', Q(due__lt=as_of - timedelta(days=30), due__gte=as_of - timedelta(days=60))),
+        ('days_61_90', Q(due__lt=as_of - timedelta(days=60), due__gte=as_of - timedelta(days=90))),
+        ('days_90_plus', Q(due__lt=as_of - timedelta(days=90))),
+    ])
+
+
+def open_receivables():
+    """The three ledgers annotated to document, kind, customer, due and amount"""
+    invoices = (
+        Invoice.objects
+        .exclude(status__in=CLOSED_INVOICE_STATUSES)
+        .filter(balance_amount__gt=0)
+        .annotate(
+            document=F('invoice_number'),
+            kind=F('invoice_type'),
+            customer=F('customer_name'),
+            due=F('due_date'),
+            amount=F('balance_amount'),
+        )
+    )
+    restaurant = (
+        RestaurantInvoice.objects
+        .exclude(status__in=CLOSED_INVOICE_STATUSES)
+        .filter(total_amount__gt=0)
+        .exclude(order__billing_invoices__in=Invoice.objects.exclude(status='cancelled'))
+        .annotate(
+            document=F('invoice_number'),
+            kind=Value('restaurant', output_field=models.CharField()),
+            customer=F('customer_name'),
+            due=F('due_date'),
+            amount=F('total_amount'),
+        )
+    )
+    conference = (
+        ConferenceBooking.objects
+        .exclude(status='cancelled')
+        .filter(balance_amount__gt=0)
+        .exclude(invoices__in=Invoice.objects.exclude(status='cancelled'))
+        .annotate(
+            document=F('booking_number'),
+            kind=Value('conference', output_field=models.CharField()),
+            customer=F('client_name'),
+            due=TruncDate('end_datetime'),
+            amount=F('balance_amount'),
+        )
+    )
+    return [invoices, restaurant, conference]
+
+
+def aging_report(as_of=None):
+    """Bucketed open amounts as of a date.
+
+    Returns a dict with ``rows`` (one per customer and receivable type),
+    ``by_customer``, ``by_type`` and ``totals``; every row maps each bucket
+    key plus ``total`` and ``documents`` to its value.
+    """
+    as_of = as_of or timezone.localdate()
+    buckets = bucket_filters(as_of)
+    aggregates = {
+        name: Coalesce(Sum('amount', filter=condition), Value(ZERO), output_field=MONEY)
+        for name, condition in buckets.items()
+    }
+    aggregates['total'] = Coalesce(Sum('amount'), Value(ZERO), output_field=MONEY)
+    aggregates['documents'] = Count('pk')
+
+    grouped = [
+        queryset.order_by().values('customer', 'kind').annotate(**aggregates)
+        for queryset in open_receivables()
+    ]
+    rows = list(grouped[0].union(*grouped[1:], all=True))
+    rows.sort(key=lambda row: (-row['total'], row['customer'], row['kind']))
+
+    type_labels = dict(Invoice.INVOICE_TYPES, restaurant='Restaurant', conference='Conference')
+    for row in rows:
+        row['kind_label'] = type_labels.get(row['kind'], row['kind'])
+        for name in [key for key, _ in BUCKETS] + ['total']:
+            row[name] = Decimal(row[name]).quantize(ZERO)
+
+    return {
+        'as_of': as_of,
+        'buckets': BUCKETS,
+        'rows': rows,
+        'by_customer': _fold(rows, 'customer'),
+        'by_type': _fold(rows, 'kind_label'),
+        'totals': _fold(rows, None)[0] if rows else _empty_row(None),
+    }
+
+
+def aging_documents(as_of=None):
+    """One row per open document with its bucket, for exports.
+
+    Returns a values_list queryset of (document, kind, customer, due,
+    days overdue bucket, amount) ordered by customer and due date, suitable
+    for ``.iterator()``.
+    """
+    as_of = as_of or timezone.localdate()
+    bucket = Case(
+        *[When(condition, then=Value(name)) for name, condition in bucket_filters(as_of).items()],
+        output_field=models.CharField(),
+    )
+    documents = [
+        queryset.annotate(bucket=bucket).order_by().values_list('document', 'kind', 'customer', 'due', 'bucket', 'amount')
+        for queryset in open_receivables()
+    ]
+    return documents[0].union(*documents[1:], all=True).order_by('customer', 'due')
+
+
+def _empty_row(key):
+    row = {name: ZERO for name, _ in BUCKETS}
+    row.update(key=key, total=ZERO, documents=0)
+    return row
+
+
+def _fold(rows, field):
+    """Sum grouped rows by ``field`` (or into one row when field is None)"""
+    folded = OrderedDict()
+    for row in rows:
+        key = row[field] if field else None
+        target = folded.setdefault(key, _empty_row(key))
+        for name, _ in BUCKETS:
+            target[name] += row[name]
+        target['total'] += row['total']
+        target['documents'] += row['documents']
+    return sorted(folded.values(), key=lambda row: -row['total'])
@@ -5,3 +5,17 @@ class BillingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.billing'
     verbose_name = 'Billing'
+
+    def ready(self):
+        from django.db.models.signals import post_save, post_delete
+        from .discounts import invalidate_discount_cache
+        from .models import Discount, TaxRate
+        from .pricing import invalidate_tax_rates
+
+        # New snapshot version for every process whenever a discount changes
+        post_save.connect(invalidate_discount_cache, sender=Discount, dispatch_uid='billing_discount_saved')
+        post_delete.connect(invalidate_discount_cache, sender=Discount, dispatch_uid='billing_discount_deleted')
+
+        # New snapshot version for every process whenever a tax rate changes
+        post_save.connect(invalidate_tax_rates, sender=TaxRate, dispatch_uid='billing_tax_rate_saved')
+        post_delete.connect(invalidate_tax_rates, sender=TaxRate, dispatch_uid='billing_tax_rate_deleted')
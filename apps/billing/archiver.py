@@ -0,0 +1,107 @@
+"""
+Archiving of settled records.
+
+Paying an invoice no longer deletes the booking or restaurant orders behind
+it. Settled records are instead marked with ``archived_at`` by this module,
+off the request path: the ``archive_settled_records`` Celery task is queued
+after a full payment commits, runs every few minutes from the beat schedule,
+and can also be run with ``manage.py archive_settled``.
+
+Each batch is one transaction: the primary keys are read with a LIMIT, the
+rows are marked with one ``UPDATE`` and their history rows are written with
+one bulk insert. Nothing is deleted, so reports keep seeing every stay and
+order; lists simply leave archived rows out by default.
+
+A booking is settled once it is over (completed, cancelled or no-show),
+nothing is owed on it and its folio, if any, is closed and at zero. A
+restaurant order is settled once it is billed and paid or charged to a room,
+or cancelled.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.bookings.models import Booking
+from apps.restaurant.models import Order
+
+
+BATCH_SIZE = 500
+
+CHANGE_REASON = 'Archived after settlement'
+
+
+def settled_bookings():
+    return Booking.objects.filter(
+        archived_at__isnull=True,
+        status__in=['completed', 'cancelled', 'no_show'],
+        balance_amount__lte=0,
+    ).filter(
+        Q(folio__isnull=True) | Q(folio__status='closed', folio__balance__lte=0)
+    )
+
+
+def settled_orders():
+    return Order.objects.filter(archived_at__isnull=True).filter(
+        Q(status='billed', payment_status__in=['paid', 'charged_to_room', 'refunded'])
+        | Q(status='cancelled')
+    )
+
+
+def archive_settled_records(batch_size=BATCH_SIZE, max_batches=None, user=None):
+    """Mark every settled booking and order as archived, batch by batch.
+
+    Returns the number of rows archived per model.
+    """
+    return {
+        'bookings': _archive(settled_bookings, batch_size, max_batches, user),
+        'orders': _archive(settled_orders, batch_size, max_batches, user),
+    }
+
+
+def queue_archiver():
+    """Queue the archiver after the current transaction commits.
+
+    Without a Celery broker the scheduled ``archive_settled`` command picks the
+    records up instead.
+    """
+    if not getattr(settings, 'CELERY_BROKER_URL', None):
+        return
+
+    def enqueue():
+        from .tasks import archive_settled_records as task
+        try:
+            task.delay()
+        except Exception:
+            # The beat schedule runs the archiver anyway; never fail a payment over it
+            pass
+
+    transaction.on_commit(enqueue)
+
+
+def _archive(settled, batch_size, max_batches, user):
+    """Archive the rows returned by ``settled()`` in batches of ``batch_size``"""
+    model = settled().model
+    archived = batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            ids = list(
+                settled()
+                .select_for_update(skip_locked=True, of=('self',))
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            now = timezone.now()
+            model.objects.filter(pk__in=ids).update(archived_at=now)
+            model.history.bulk_history_create(
+                model.objects.filter(pk__in=ids),
+                update=True,
+                default_user=user,
+                default_change_reason=CHANGE_REASON,
+                default_date=now,
+            )
+        archived += len(ids)
+        batches += 1
+    return archived
@@ -0,0 +1,120 @@
+"""
+Discount-code redemption.
+
+Validating a code reads a per-process snapshot of the active discounts
+instead of loading the Discount row. Like the tax rates in
+``billing.pricing``, the snapshot is tagged with a ``billing.versions``
+version (``discounts``) that is bumped whenever a discount is saved or
+deleted (see ``BillingConfig.ready``), so every process rebuilds it with one
+query the next time a code is checked.
+
+Redeeming increments ``used_count`` with a single conditional UPDATE that
+only matches while the code is active, in date and under its usage limit, so
+concurrent redemptions can never exceed ``usage_limit`` and no row lock is
+held while the invoice is written. Every redemption is logged as a
+DiscountRedemption.
+"""
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import versions
+from .models import Discount, DiscountRedemption
+
+
+VERSION_NAME = 'discounts'
+
+CENT = Decimal('0.01')
+
+DiscountRule = namedtuple(
+    'DiscountRule',
+    'id code discount_type value minimum_amount maximum_discount valid_from valid_until usage_limit',
+)
+
+
+class DiscountError(Exception):
+    """Raised when a discount code cannot be applied"""
+
+
+_snapshot = (None, {})
+
+
+def active_discounts():
+    """Active discount rules keyed by upper-case code, from the in-process snapshot"""
+    global _snapshot
+    version = versions.current(VERSION_NAME).token
+    if _snapshot[0] != version:
+        rules = {
+            rule.code.upper(): rule
+            for rule in (
+                DiscountRule(*row) for row in
+                Discount.objects.filter(is_active=True).values_list(*DiscountRule._fields)
+            )
+        }
+        _snapshot = (version, rules)
+    return _snapshot[1]
+
+
+def invalidate_discount_cache(**kwargs):
+    """Move every process on to a new snapshot; connected to Discount post_save/post_delete"""
+    versions.bump(VERSION_NAME)
+
+
+def quote_discount(code, amount, today=None):
+    """Validate a code against an amount without writing anything.
+
+    Returns (rule, discount amount). The usage limit is only enforced when
+    the code is redeemed.
+    """
+    today = today or timezone.localdate()
+    amount = Decimal(amount)
+    rule = active_discounts().get((code or '').strip().upper())
+    if rule is None:
+        raise DiscountError(f'Discount code {code!r} does not exist or is not active.')
+    if not rule.valid_from <= today <= rule.valid_until:
+        raise DiscountError(f'Discount code {rule.code} is only valid from {rule.valid_from} to {rule.valid_until}.')
+    if amount < rule.minimum_amount:
+        raise DiscountError(f'Discount code {rule.code} needs a minimum amount of ${rule.minimum_amount}.')
+
+    if rule.discount_type == 'percentage':
+        discount = amount * rule.value / 100
+    else:
+        discount = rule.value
+    if rule.maximum_discount is not None:
+        discount = min(discount, rule.maximum_discount)
+    discount = min(discount, amount).quantize(CENT, rounding=ROUND_HALF_UP)
+    return rule, discount
+
+
+def redeem_discount(code, amount, invoice=None, user=None):
+    """Apply a code to an amount and log it.
+
+    Call inside the transaction that saves the discounted document, so a
+    failure there also gives the use back. Raises DiscountError when the code
+    is invalid or its usage limit has been reached.
+    """
+    today = timezone.localdate()
+    rule, discount = quote_discount(code, amount, today)
+
+    with transaction.atomic():
+        claimed = (
+            Discount.objects
+            .filter(pk=rule.id, is_active=True, valid_from__lte=today, valid_until__gte=today)
+            .filter(Q(usage_limit__isnull=True) | Q(used_count__lt=F('usage_limit')))
+            .update(used_count=F('used_count') + 1)
+        )
+        if not claimed:
+            raise DiscountError(f'Discount code {rule.code} has been fully redeemed.')
+
+        redemption = DiscountRedemption.objects.create(
+            discount_id=rule.id,
+            invoice=invoice,
+            code=rule.code,
+            order_amount=amount,
+            discount_amount=discount,
+            redeemed_by=user,
+        )
+    return redemption
@@ -0,0 +1,244 @@
+"""
+Guest folios: one append-only ledger per stay.
+
+Room, restaurant, conference and billing charges and every payment for a
+stay are posted here as FolioEntry rows. Posting locks the folio rows once,
+numbers the new entries per folio, inserts them with one bulk insert and
+moves the folio totals with one bulk update, so posting a whole batch costs
+the same few statements as posting one entry. Reading a folio's balance is a
+single primary-key read; a statement is one indexed read of its entries.
+
+Folios are opened at check-in with the stay's room charge and any payments
+taken before arrival, and closed at check-out. A closed folio still accepts
+payments and adjustments so the balance can be settled, but no new charges.
+"""
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from simple_history.utils import bulk_create_with_history, bulk_update_with_history
+
+from .models import Folio, FolioEntry
+
+
+Posting = namedtuple(
+    'Posting',
+    'folio_id entry_type source amount description order reference key',
+    defaults=(None, '', None),
+)
+
+
+class FolioError(Exception):
+    """Raised when a posting is not allowed on a folio"""
+
+
+def post_entries(postings, user=None):
+    """Post several entries, possibly to several folios, in one go.
+
+    ``postings`` is a list of Posting tuples. Returns the created entries in
+    the order given; postings whose ``key`` has already been posted are
+    skipped, so a batch can safely be posted again. Raises FolioError without
+    writing anything if any folio is missing or a charge targets a closed
+    folio.
+    """
+    if not postings:
+        return []
+    now = timezone.now()
+
+    with transaction.atomic():
+        folios = {
+            folio.pk: folio
+            for folio in Folio.objects.select_for_update().filter(pk__in={p.folio_id for p in postings})
+        }
+        # Checked under the folio locks; the unique index covers postings racing across folios
+        posted = set(
+            FolioEntry.objects.filter(posting_key__in={p.key for p in postings if p.key})
+            .values_list('posting_key', flat=True)
+        )
+        entries = []
+        for posting in postings:
+            if posting.key:
+                if posting.key in posted:
+                    continue
+                posted.add(posting.key)
+            folio = folios.get(posting.folio_id)
+            if folio is None:
+                raise FolioError(f'Folio {posting.folio_id} does not exist.')
+            if posting.entry_type == 'charge' and not folio.is_open:
+                raise FolioError(f'Folio {folio.folio_number} is closed; charges can no longer be posted.')
+
+            amount = Decimal(posting.amount)
+            if posting.entry_type == 'charge':
+                folio.total_charges += amount
+                folio.balance += amount
+            elif posting.entry_type == 'payment':
+                folio.total_payments += amount
+                folio.balance -= amount
+            elif posting.entry_type == 'adjustment':
+                folio.total_adjustments += amount
+                folio.balance += amount
+            else:
+                raise FolioError(f'Unknown entry type {posting.entry_type!r}.')
+
+            folio.entry_count += 1
+            folio.updated_at = now
+            entries.append(FolioEntry(
+                folio=folio,
+                sequence=folio.entry_count,
+                entry_type=posting.entry_type,
+                source=posting.source,
+                description=posting.description[:200],
+                amount=amount,
+                running_balance=folio.balance,
+                order=posting.order,
+                reference=posting.reference,
+                posting_key=posting.key,
+                posted_at=now,
+                posted_by=user,
+            ))
+
+        FolioEntry.objects.bulk_create(entries)
+        bulk_update_with_history(
+            list(folios.values()), Folio,
+            ['total_charges', 'total_payments', 'total_adjustments', 'balance', 'entry_count', 'updated_at'],
+            default_user=user,
+            default_change_reason='Folio posting',
+        )
+    return entries
+
+
+def post_charge(folio, amount, description, source='other', user=None, order=None, reference='', key=None):
+    return post_entries([Posting(folio.pk, 'charge', source, amount, description, order, reference, key)], user)[0]
+
+
+def post_payment(folio, amount, description, source='billing', user=None, reference=''):
+    return post_entries([Posting(folio.pk, 'payment', source, amount, description, None, reference)], user)[0]
+
+
+def post_adjustment(folio, amount, description, source='other', user=None, reference=''):
+    return post_entries([Posting(folio.pk, 'adjustment', source, amount, description, None, reference)], user)[0]
+
+
+def open_folios(bookings, user=None):
+    """Open folios for checked-in bookings that do not have one yet.
+
+    Each new folio starts with the stay's room charge and, when the guest
+    paid before arrival, one payment entry for that amount. Returns the ids
+    of the folios opened.
+    """
+    existing = set(Folio.objects.filter(booking__in=bookings).values_list('booking_id', flat=True))
+    bookings = [booking for booking in bookings if booking.pk not in existing]
+    if not bookings:
+        return []
+
+    bulk_create_with_history(
+        [Folio(booking=booking, guest_id=booking.guest_id) for booking in bookings], Folio,
+        default_user=user,
+        default_change_reason='Folio opened',
+    )
+    folio_ids = dict(Folio.objects.filter(booking__in=bookings).values_list('booking_id', 'pk'))
+    postings = []
+    for booking in bookings:
+        folio_id = folio_ids[booking.pk]
+        postings.append(Posting(
+            folio_id, 'charge', 'room', booking.total_amount,
+            f'Room charge, {booking.duration} night(s)', None, booking.booking_number,
+        ))
+        if booking.paid_amount > 0:
+            postings.append(Posting(
+                folio_id, 'payment', 'room', booking.paid_amount,
+                'Payments received before arrival', None, booking.booking_number,
+            ))
+    post_entries(postings, user)
+    return list(folio_ids.values())
+
+
+def close_folios(bookings, user=None, extra_charges=None):
+    """Post any check-out charges and close the bookings' open folios.
+
+    ``extra_charges`` optionally maps booking id to an amount charged at
+    check-out.
+    """
+    extra_charges = extra_charges or {}
+    with transaction.atomic():
+        rows = list(
+            Folio.objects.filter(booking__in=bookings, status='open').values_list('pk', 'booking_id', 'booking__booking_number')
+        )
+        post_entries([
+            Posting(folio_id, 'charge', 'room', extra_charges[booking_id], 'Charges at check-out', None, booking_number)
+            for folio_id, booking_id, booking_number in rows
+            if extra_charges.get(booking_id)
+        ], user)
+
+        now = timezone.now()
+        folios = list(Folio.objects.select_for_update().filter(pk__in=[row[0] for row in rows]))
+        for folio in folios:
+            folio.status = 'closed'
+            folio.closed_at = now
+            folio.updated_at = now
+        bulk_update_with_history(
+            folios, Folio, ['status', 'closed_at', 'updated_at'],
+            default_user=user,
+            default_change_reason='Folio closed',
+        )
+    return folios
+
+
+def folio_for_room(room_id):
+    """The open folio of the stay currently in a room, or None"""
+    return (
+        Folio.objects
+        .filter(status='open', booking__status='active')
+        .filter(
+            Q(booking__check_in__actual_room_id=room_id)
+            | Q(booking__check_in__actual_room__isnull=True, booking__room_id=room_id)
+        )
+        .select_related('booking', 'guest')
+        .first()
+    )
+
+
+def charge_order_to_room(order, user=None, amount=None):
+    """Post a restaurant order to the folio of the stay in the order's room.
+
+    Raises FolioError when the order has no room, the room has no open stay
+    or the order was already charged.
+    """
+    if not order.room_id:
+        raise FolioError(f'Order {order.order_number} is not linked to a room.')
+
+    with transaction.atomic():
+        if FolioEntry.objects.filter(posting_key=order_posting_key(order.pk)).exists():
+            raise FolioError(f'Order {order.order_number} has already been charged to a room.')
+        folio = folio_for_room(order.room_id)
+        if folio is None:
+            raise FolioError(f'Room {order.room.room_number} has no checked-in stay to charge.')
+
+        entry = post_charge(
+            folio,
+            order.total_amount if amount is None else amount,
+            f'Restaurant order {order.order_number}',
+            source='restaurant',
+            user=user,
+            order=order,
+            reference=order.order_number,
+            key=order_posting_key(order.pk),
+        )
+    return entry
+
+
+def order_posting_key(order_id):
+    """Posting key of a restaurant order's room charge"""
+    return f'order:{order_id}'
+
+
+def record_booking_payment(booking, amount, user=None, reference=''):
+    """Mirror a booking payment onto the stay's folio when it has one"""
+    folio_id = Folio.objects.filter(booking=booking).values_list('pk', flat=True).first()
+    if folio_id is None:
+        return None
+    return post_entries(
+        [Posting(folio_id, 'payment', 'billing', amount, 'Payment received', None, reference)], user
+    )[0]
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from apps.billing.archiver import archive_settled_records, BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Archive settled bookings and restaurant orders in batches (for deployments without Celery beat)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Rows marked per transaction",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=None,
+            help="Stop after this many batches per model",
+        )
+
+    def handle(self, *args, **options):
+        counts = archive_settled_records(options["batch_size"], options["max_batches"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {counts['bookings']} booking(s) and {counts['orders']} order(s)."
+        ))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.billing.reconciliation import import_statement, StatementError, WINDOW_DAYS
+
+
+class Command(BaseCommand):
+    help = "Import a bank or card statement file (CSV or OFX) and reconcile it against recorded payments"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Statement file to import")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "ofx"],
+            default=None,
+            help="File format (default: from the file extension)",
+        )
+        parser.add_argument(
+            "--window",
+            type=int,
+            default=WINDOW_DAYS,
+            help="Days either side of the statement date a payment may fall",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or ("ofx" if path.lower().endswith((".ofx", ".qfx")) else "csv")
+        try:
+            with open(path, encoding="utf-8-sig", newline="") as stream:
+                statement = import_statement(stream, path, file_format=file_format, window_days=options["window"])
+        except (OSError, StatementError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {statement.line_count} line(s): {statement.matched_count} matched, "
+            f"{statement.unmatched_count} unmatched (${statement.matched_amount:.2f} of ${statement.total_amount:.2f})."
+        ))
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.billing.night_audit import run_night_audit, default_business_date
+
+
+class Command(BaseCommand):
+    help = "Run the night audit: roll over no-shows and overdue invoices and write the frozen audit report"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            help="Business date to close (YYYY-MM-DD); defaults to yesterday",
+        )
+
+    def handle(self, *args, **options):
+        if options["date"]:
+            try:
+                business_date = datetime.strptime(options["date"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--date must be in YYYY-MM-DD format")
+        else:
+            business_date = default_business_date()
+
+        audit, created = run_night_audit(business_date)
+        if not created:
+            self.stdout.write(self.style.WARNING(
+                f"{business_date} was already audited at {audit.completed_at:%Y-%m-%d %H:%M}."
+            ))
+            return
+
+        self.stdout.write(f"No-shows: {audit.no_show_count}")
+        self.stdout.write(f"Overdue invoices: {audit.overdue_invoice_count}")
+        self.stdout.write(f"Overdue restaurant invoices: {audit.overdue_restaurant_invoice_count}")
+        self.stdout.write(f"Stays past check-out: {audit.overdue_stay_count}")
+        self.stdout.write(f"Occupancy: {audit.occupied_rooms}/{audit.total_rooms - audit.out_of_service_rooms} ({audit.occupancy_rate}%)")
+        self.stdout.write(self.style.SUCCESS(
+            f"Night audit for {business_date} completed in "
+            f"{(audit.completed_at - audit.started_at).total_seconds():.2f}s."
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from apps.billing.room_charges import post_room_charges, BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Post restaurant orders charged to a room to the stays' folios in batches (for deployments without Celery beat)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Orders posted per transaction",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=None,
+            help="Stop after this many batches",
+        )
+
+    def handle(self, *args, **options):
+        run = post_room_charges(options["batch_size"], options["max_batches"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Posted {run.posted} order(s) to room folios; {run.waiting} waiting for a checked-in stay."
+        ))
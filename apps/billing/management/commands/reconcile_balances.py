@@ -0,0 +1,91 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.db.models import F, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from apps.billing.models import Invoice, Payment
+from apps.bookings.models import Booking, BookingPayment
+from apps.conference.models import ConferenceBooking, ConferencePayment
+
+
+# (label, model, payment model, payment foreign key, filter for payments that count)
+LEDGERS = [
+    ('Bookings', Booking, BookingPayment, 'booking', {'status': 'completed'}),
+    ('Invoices', Invoice, Payment, 'invoice', {'payment_status': 'completed'}),
+    ('Conference bookings', ConferenceBooking, ConferencePayment, 'booking', {}),
+]
+
+
+class Command(BaseCommand):
+    help = "Verify the maintained paid/balance columns against payment records, in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Rewrite mismatched rows from their payment records",
+        )
+        parser.add_argument(
+            "--show",
+            type=int,
+            default=20,
+            help="Number of mismatched rows to list per ledger",
+        )
+
+    def handle(self, *args, **options):
+        total_mismatches = 0
+        for label, model, payment_model, fk, payment_filter in LEDGERS:
+            payments = (
+                payment_model.objects
+                .filter(**{fk: OuterRef('pk')}, **payment_filter)
+                .order_by()
+                .values(fk)
+            )
+            expected_paid = Coalesce(
+                Subquery(payments.annotate(total=Sum('amount')).values('total')),
+                Value(Decimal('0.00')),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            )
+            last_payment = Subquery(payments.annotate(last=Max('payment_date')).values('last'))
+
+            mismatched = list(
+                model.objects
+                .annotate(expected_paid=expected_paid)
+                .filter(
+                    ~Q(paid_amount=F('expected_paid'))
+                    | ~Q(balance_amount=F('total_amount') - F('expected_paid'))
+                )
+                .values_list('pk', 'paid_amount', 'balance_amount', 'expected_paid', 'total_amount')
+            )
+            total_mismatches += len(mismatched)
+
+            if not mismatched:
+                self.stdout.write(self.style.SUCCESS(f"{label}: all balances match"))
+                continue
+
+            self.stdout.write(self.style.WARNING(f"{label}: {len(mismatched)} mismatched"))
+            for pk, paid, balance, expected, total in mismatched[:options["show"]]:
+                self.stdout.write(
+                    f"  #{pk}: paid {paid} (payments {expected}), "
+                    f"balance {balance} (expected {total - expected})"
+                )
+
+            if options["fix"]:
+                ids = [row[0] for row in mismatched]
+                with transaction.atomic():
+                    model.objects.filter(pk__in=ids).update(
+                        paid_amount=expected_paid,
+                        balance_amount=F('total_amount') - expected_paid,
+                        last_payment_at=last_payment,
+                    )
+                    model.history.bulk_history_create(
+                        model.objects.filter(pk__in=ids),
+                        update=True,
+                        default_change_reason='Balance reconciliation',
+                    )
+                self.stdout.write(self.style.SUCCESS(f"{label}: fixed {len(ids)}"))
+
+        if total_mismatches and not options["fix"]:
+            self.stdout.write("Run with --fix to rewrite mismatched rows from their payment records.")
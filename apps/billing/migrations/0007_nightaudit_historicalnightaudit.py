@@ -0,0 +1,81 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import simple_history.models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('billing', '0006_historicalinvoice_conference_booking_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NightAudit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_date', models.DateField(unique=True)),
+                ('started_at', models.DateTimeField()),
+                ('completed_at', models.DateTimeField()),
+                ('no_show_count', models.PositiveIntegerField(default=0)),
+                ('overdue_invoice_count', models.PositiveIntegerField(default=0)),
+                ('overdue_restaurant_invoice_count', models.PositiveIntegerField(default=0)),
+                ('overdue_stay_count', models.PositiveIntegerField(default=0)),
+                ('total_rooms', models.PositiveIntegerField(default=0)),
+                ('out_of_service_rooms', models.PositiveIntegerField(default=0)),
+                ('occupied_rooms', models.PositiveIntegerField(default=0)),
+                ('arrivals', models.PositiveIntegerField(default=0)),
+                ('departures', models.PositiveIntegerField(default=0)),
+                ('room_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('restaurant_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('payments_received', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('details', models.JSONField(blank=True, default=dict, help_text='Booking and invoice numbers behind each count')),
+                ('run_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='night_audits', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Night Audit',
+                'verbose_name_plural': 'Night Audits',
+                'ordering': ['-business_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='HistoricalNightAudit',
+            fields=[
+                ('id', models.BigIntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('business_date', models.DateField(db_index=True)),
+                ('started_at', models.DateTimeField()),
+                ('completed_at', models.DateTimeField()),
+                ('no_show_count', models.PositiveIntegerField(default=0)),
+                ('overdue_invoice_count', models.PositiveIntegerField(default=0)),
+                ('overdue_restaurant_invoice_count', models.PositiveIntegerField(default=0)),
+                ('overdue_stay_count', models.PositiveIntegerField(default=0)),
+                ('total_rooms', models.PositiveIntegerField(default=0)),
+                ('out_of_service_rooms', models.PositiveIntegerField(default=0)),
+                ('occupied_rooms', models.PositiveIntegerField(default=0)),
+                ('arrivals', models.PositiveIntegerField(default=0)),
+                ('departures', models.PositiveIntegerField(default=0)),
+                ('room_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('restaurant_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('payments_received', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('details', models.JSONField(blank=True, default=dict, help_text='Booking and invoice numbers behind each count')),
+                ('history_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField(db_index=True)),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('run_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'historical Night Audit',
+                'verbose_name_plural': 'historical Night Audits',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': ('history_date', 'history_id'),
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:23
+
+import apps.billing.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import simple_history.models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('restaurant', '0007_alter_historicalorder_payment_status_and_more'),
+        ('guests', '0007_guestprofilesummary'),
+        ('bookings', '0005_booking_last_payment_at_booking_paid_amount_and_more'),
+        ('billing', '0008_historicalinvoice_balance_amount_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Folio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('folio_number', models.CharField(default=apps.billing.models.generate_folio_number, max_length=20, unique=True)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('closed', 'Closed')], default='open', max_length=20)),
+                ('total_charges', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_payments', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_adjustments', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('opened_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('booking', models.OneToOneField(on_delete=django.db.models.deletion.PROTECT, related_name='folio', to='bookings.booking')),
+                ('guest', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='folios', to='guests.guest')),
+            ],
+            options={
+                'verbose_name': 'Folio',
+                'verbose_name_plural': 'Folios',
+                'ordering': ['-opened_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='HistoricalFolio',
+            fields=[
+                ('id', models.BigIntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('folio_number', models.CharField(db_index=True, default=apps.billing.models.generate_folio_number, max_length=20)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('closed', 'Closed')], default='open', max_length=20)),
+                ('total_charges', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_payments', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_adjustments', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('opened_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(blank=True, editable=False)),
+                ('history_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField(db_index=True)),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('booking', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='bookings.booking')),
+                ('guest', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='guests.guest')),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'historical Folio',
+                'verbose_name_plural': 'historical Folios',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': ('history_date', 'history_id'),
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.CreateModel(
+            name='FolioEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveIntegerField()),
+                ('entry_type', models.CharField(choices=[('charge', 'Charge'), ('payment', 'Payment'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('source', models.CharField(choices=[('room', 'Room'), ('restaurant', 'Restaurant'), ('conference', 'Conference'), ('billing', 'Billing'), ('other', 'Other')], default='other', max_length=20)),
+                ('description', models.CharField(max_length=200)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('running_balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('reference', models.CharField(blank=True, max_length=100)),
+                ('posted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('folio', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='entries', to='billing.folio')),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='folio_entries', to='restaurant.order')),
+                ('posted_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='folio_entries_posted', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Folio Entry',
+                'verbose_name_plural': 'Folio Entries',
+                'ordering': ['folio', 'sequence'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='folioentry',
+            constraint=models.UniqueConstraint(fields=('folio', 'sequence'), name='unique_folio_entry_sequence'),
+        ),
+        migrations.AddIndex(
+            model_name='folio',
+            index=models.Index(fields=['status', 'guest'], name='billing_fol_status_7ca996_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('billing', '0009_folio_historicalfolio_folioentry_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiscountRedemption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=20)),
+                ('order_amount', models.DecimalField(decimal_places=2, help_text='Amount the discount was applied to', max_digits=10)),
+                ('discount_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('redeemed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('discount', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='redemptions', to='billing.discount')),
+                ('invoice', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='discount_redemptions', to='billing.invoice')),
+                ('redeemed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='discount_redemptions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Discount Redemption',
+                'verbose_name_plural': 'Discount Redemptions',
+                'ordering': ['-redeemed_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0010_discountredemption'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicaltaxrate',
+            name='applies_to',
+            field=models.CharField(choices=[('all', 'All Services'), ('restaurant', 'Restaurant'), ('gym', 'Gym'), ('swimming_pool', 'Swimming Pool'), ('custom', 'Custom Invoices')], default='all', help_text='Service whose invoices this rate is charged on; rates for the same service add up', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='taxrate',
+            name='applies_to',
+            field=models.CharField(choices=[('all', 'All Services'), ('restaurant', 'Restaurant'), ('gym', 'Gym'), ('swimming_pool', 'Swimming Pool'), ('custom', 'Custom Invoices')], default='all', help_text='Service whose invoices this rate is charged on; rates for the same service add up', max_length=20),
+        ),
+    ]
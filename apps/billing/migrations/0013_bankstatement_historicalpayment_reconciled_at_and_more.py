@@ -0,0 +1,70 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('billing', '0012_documentsequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankStatement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='File the statement was imported from', max_length=255)),
+                ('file_format', models.CharField(choices=[('csv', 'CSV'), ('ofx', 'OFX')], default='csv', max_length=10)),
+                ('date_from', models.DateField(blank=True, null=True)),
+                ('date_to', models.DateField(blank=True, null=True)),
+                ('window_days', models.PositiveIntegerField(default=3, help_text='Days either side of the statement date a payment may fall')),
+                ('line_count', models.PositiveIntegerField(default=0)),
+                ('matched_count', models.PositiveIntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('matched_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('imported_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('imported_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bank_statements_imported', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Bank Statement',
+                'verbose_name_plural': 'Bank Statements',
+                'ordering': ['-imported_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='historicalpayment',
+            name='reconciled_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Set when the payment is matched to a bank or card statement line', null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='reconciled_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Set when the payment is matched to a bank or card statement line', null=True),
+        ),
+        migrations.CreateModel(
+            name='StatementLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('line_number', models.PositiveIntegerField()),
+                ('posted_on', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('reference', models.CharField(blank=True, max_length=100)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('match_source', models.CharField(blank=True, choices=[('billing_payment', 'Invoice Payment'), ('booking_payment', 'Booking Payment'), ('conference_payment', 'Conference Payment'), ('restaurant_transaction', 'Restaurant Transaction')], max_length=30)),
+                ('match_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('match_rule', models.CharField(blank=True, choices=[('reference', 'Reference and amount'), ('amount_date', 'Amount and date')], max_length=20)),
+                ('statement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='billing.bankstatement')),
+            ],
+            options={
+                'verbose_name': 'Statement Line',
+                'verbose_name_plural': 'Statement Lines',
+                'ordering': ['statement', 'line_number'],
+                'indexes': [models.Index(fields=['statement', 'match_source'], name='billing_sta_stateme_75335d_idx')],
+            },
+        ),
+    ]
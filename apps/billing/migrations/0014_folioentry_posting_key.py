@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:48
+
+from django.db import migrations, models
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat
+
+
+def backfill_order_keys(apps, schema_editor):
+    FolioEntry = apps.get_model('billing', 'FolioEntry')
+    first_charge = (
+        FolioEntry.objects.filter(order_id=OuterRef('order_id'), entry_type='charge')
+        .order_by('pk').values('pk')[:1]
+    )
+    FolioEntry.objects.filter(entry_type='charge', order__isnull=False, pk=Subquery(first_charge)).update(
+        posting_key=Concat(Value('order:'), Cast('order_id', CharField()))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0013_bankstatement_historicalpayment_reconciled_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='folioentry',
+            name='posting_key',
+            field=models.CharField(blank=True, help_text='Identifies the source posting so it is only ever posted once', max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_order_keys, migrations.RunPython.noop),
+    ]
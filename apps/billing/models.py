@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
 from django.conf import settings
 from apps.bookings.models import Booking
 from apps.restaurant.models import Order
@@ -40,6 +42,8 @@ class Invoice(models.Model):
     discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     paid_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    balance_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    last_payment_at = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
     notes = models.TextField(blank=True)
     created_by = models.ForeignKey(
@@ -60,9 +64,38 @@ class Invoice(models.Model):
     def __str__(self):
         return f"Invoice {self.invoice_number} - {self.customer_name}"
 
+    def save(self, *args, **kwargs):
+        self.balance_amount = self.total_amount - self.paid_amount
+        super().save(*args, **kwargs)
+
+    def record_payment(self, amount, user=None):
+        """Add a completed payment to the running totals with one UPDATE.
+
+        Call inside the transaction that stores the Payment row. A fully paid
+        invoice becomes 'paid' and a draft becomes 'sent'.
+        """
+        now = timezone.now()
+        paid = F('paid_amount') + amount
+        Invoice.objects.filter(pk=self.pk).update(
+            paid_amount=paid,
+            balance_amount=F('total_amount') - paid,
+            status=Case(
+                When(total_amount__lte=paid, then=Value('paid')),
+                When(status='draft', then=Value('sent')),
+                default=F('status'),
+            ),
+            last_payment_at=now,
+            updated_at=now,
+        )
+        self.refresh_from_db(fields=['paid_amount', 'balance_amount', 'status', 'last_payment_at', 'updated_at'])
+        Invoice.history.bulk_history_create(
+            [self], update=True, default_user=user,
+            default_change_reason='Payment received', default_date=now,
+        )
+
     @property
     def remaining_amount(self):
-        return self.total_amount - self.paid_amount
+        return self.balance_amount
 
     @property
     def is_overdue(self):
@@ -120,6 +153,8 @@ class Payment(models.Model):
         related_name='billing_payments_processed'
     )
     notes = models.TextField(blank=True)
+    reconciled_at = models.DateTimeField(null=True, blank=True, db_index=True,
+                                         help_text="Set when the payment is matched to a bank or card statement line")
     history = HistoricalRecords()
 
     class Meta:
@@ -133,8 +168,22 @@ class Payment(models.Model):
 
 class TaxRate(models.Model):
     """Tax rates for different services"""
+    SERVICE_CHOICES = [
+        ('all', 'All Services'),
+        ('restaurant', 'Restaurant'),
+        ('gym', 'Gym'),
+        ('swimming_pool', 'Swimming Pool'),
+        ('custom', 'Custom Invoices'),
+    ]
+
     name = models.CharField(max_length=100)
     rate = models.DecimalField(max_digits=5, decimal_places=2, help_text='Tax rate as percentage')
+    applies_to = models.CharField(
+        max_length=20,
+        choices=SERVICE_CHOICES,
+        default='all',
+        help_text='Service whose invoices this rate is charged on; rates for the same service add up',
+    )
     description = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -188,3 +237,305 @@ class Discount(models.Model):
             self.valid_from <= today <= self.valid_until and
             (self.usage_limit is None or self.used_count < self.usage_limit)
         )
+
+
+class DiscountRedemption(models.Model):
+    """Log of every discount code applied; written by ``apps.billing.discounts``"""
+    discount = models.ForeignKey(Discount, on_delete=models.PROTECT, related_name='redemptions')
+    invoice = models.ForeignKey(Invoice, on_delete=models.SET_NULL, null=True, blank=True, related_name='discount_redemptions')
+    code = models.CharField(max_length=20)
+    order_amount = models.DecimalField(max_digits=10, decimal_places=2, help_text='Amount the discount was applied to')
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    redeemed_at = models.DateTimeField(default=timezone.now, db_index=True)
+    redeemed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='discount_redemptions'
+    )
+
+    class Meta:
+        verbose_name = 'Discount Redemption'
+        verbose_name_plural = 'Discount Redemptions'
+        ordering = ['-redeemed_at']
+
+    def __str__(self):
+        return f"{self.code} -{self.discount_amount} ({self.redeemed_at:%Y-%m-%d})"
+
+
+class NightAudit(models.Model):
+    """Frozen end-of-day report written by the night audit"""
+    business_date = models.DateField(unique=True)
+    started_at = models.DateTimeField()
+    completed_at = models.DateTimeField()
+    run_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='night_audits'
+    )
+
+    # Transitions applied by the audit
+    no_show_count = models.PositiveIntegerField(default=0)
+    overdue_invoice_count = models.PositiveIntegerField(default=0)
+    overdue_restaurant_invoice_count = models.PositiveIntegerField(default=0)
+    overdue_stay_count = models.PositiveIntegerField(default=0)
+
+    # Snapshot of the business date
+    total_rooms = models.PositiveIntegerField(default=0)
+    out_of_service_rooms = models.PositiveIntegerField(default=0)
+    occupied_rooms = models.PositiveIntegerField(default=0)
+    arrivals = models.PositiveIntegerField(default=0)
+    departures = models.PositiveIntegerField(default=0)
+    room_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    restaurant_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    payments_received = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    details = models.JSONField(default=dict, blank=True, help_text='Booking and invoice numbers behind each count')
+    history = HistoricalRecords()
+
+    class Meta:
+        verbose_name = 'Night Audit'
+        verbose_name_plural = 'Night Audits'
+        ordering = ['-business_date']
+
+    def __str__(self):
+        return f"Night audit {self.business_date}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Night audit reports are frozen and cannot be changed")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Night audit reports are frozen and cannot be deleted")
+
+    @property
+    def occupancy_rate(self):
+        sellable = self.total_rooms - self.out_of_service_rooms
+        if sellable <= 0:
+            return 0
+        return round(self.occupied_rooms * 100 / sellable, 1)
+
+
+def generate_folio_number():
+    from .numbering import next_number
+    return next_number('FOL')
+
+
+class Folio(models.Model):
+    """Running account for one guest stay.
+
+    Every charge, payment and adjustment is posted as an append-only
+    FolioEntry; the totals below are kept in step by the posting code in
+    ``apps.billing.folio`` so the balance is read from this row alone.
+    """
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('closed', 'Closed'),
+    ]
+
+    folio_number = models.CharField(max_length=20, unique=True, default=generate_folio_number)
+    booking = models.OneToOneField(Booking, on_delete=models.PROTECT, related_name='folio')
+    guest = models.ForeignKey('guests.Guest', on_delete=models.PROTECT, related_name='folios')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+    total_charges = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_payments = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_adjustments = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    entry_count = models.PositiveIntegerField(default=0)
+    opened_at = models.DateTimeField(default=timezone.now)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    history = HistoricalRecords()
+
+    class Meta:
+        verbose_name = 'Folio'
+        verbose_name_plural = 'Folios'
+        ordering = ['-opened_at']
+        indexes = [
+            models.Index(fields=['status', 'guest']),
+        ]
+
+    def __str__(self):
+        return f"Folio {self.folio_number} - {self.booking.booking_number}"
+
+    @property
+    def is_open(self):
+        return self.status == 'open'
+
+
+class FolioEntry(models.Model):
+    """One posting on a folio; entries are never changed or removed.
+
+    ``amount`` is positive for charges and payments and signed for
+    adjustments. ``running_balance`` is the folio balance right after this
+    entry, so a statement is one ordered read of the folio's entries.
+    """
+    ENTRY_TYPES = [
+        ('charge', 'Charge'),
+        ('payment', 'Payment'),
+        ('adjustment', 'Adjustment'),
+    ]
+
+    SOURCE_CHOICES = [
+        ('room', 'Room'),
+        ('restaurant', 'Restaurant'),
+        ('conference', 'Conference'),
+        ('billing', 'Billing'),
+        ('other', 'Other'),
+    ]
+
+    folio = models.ForeignKey(Folio, on_delete=models.PROTECT, related_name='entries')
+    sequence = models.PositiveIntegerField()
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPES)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='other')
+    description = models.CharField(max_length=200)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    running_balance = models.DecimalField(max_digits=12, decimal_places=2)
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='folio_entries')
+    reference = models.CharField(max_length=100, blank=True)
+    posting_key = models.CharField(max_length=64, null=True, blank=True, unique=True,
+                                   help_text="Identifies the source posting so it is only ever posted once")
+    posted_at = models.DateTimeField(default=timezone.now)
+    posted_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='folio_entries_posted'
+    )
+
+    class Meta:
+        verbose_name = 'Folio Entry'
+        verbose_name_plural = 'Folio Entries'
+        ordering = ['folio', 'sequence']
+        constraints = [
+            models.UniqueConstraint(fields=['folio', 'sequence'], name='unique_folio_entry_sequence'),
+        ]
+
+    def __str__(self):
+        return f"{self.folio.folio_number} #{self.sequence} {self.get_entry_type_display()} {self.amount}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Folio entries are append-only; post an adjustment instead")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Folio entries are append-only; post an adjustment instead")
+
+    @property
+    def balance_effect(self):
+        """Signed change this entry made to the folio balance"""
+        return -self.amount if self.entry_type == 'payment' else self.amount
+
+
+class DocumentSequence(models.Model):
+    """Counter behind document numbers on databases without native sequences.
+
+    PostgreSQL uses real sequences instead; see ``billing.numbering``.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Document Sequence'
+        verbose_name_plural = 'Document Sequences'
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class CacheVersion(models.Model):
+    """Version token of data that processes cache for themselves; see ``billing.versions``"""
+    name = models.CharField(max_length=50, unique=True)
+    token = models.CharField(max_length=32)
+    changed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Cache Version'
+        verbose_name_plural = 'Cache Versions'
+
+    def __str__(self):
+        return f"{self.name} = {self.token}"
+
+
+class BankStatement(models.Model):
+    """Imported bank or card settlement statement; see ``apps.billing.reconciliation``"""
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('ofx', 'OFX'),
+    ]
+
+    name = models.CharField(max_length=255, help_text='File the statement was imported from')
+    file_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='csv')
+    date_from = models.DateField(null=True, blank=True)
+    date_to = models.DateField(null=True, blank=True)
+    window_days = models.PositiveIntegerField(default=3, help_text='Days either side of the statement date a payment may fall')
+    line_count = models.PositiveIntegerField(default=0)
+    matched_count = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    matched_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    imported_at = models.DateTimeField(default=timezone.now, db_index=True)
+    imported_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='bank_statements_imported'
+    )
+
+    class Meta:
+        verbose_name = 'Bank Statement'
+        verbose_name_plural = 'Bank Statements'
+        ordering = ['-imported_at']
+
+    def __str__(self):
+        return f"{self.name} ({self.imported_at:%Y-%m-%d})"
+
+    @property
+    def unmatched_count(self):
+        return self.line_count - self.matched_count
+
+
+class StatementLine(models.Model):
+    """One row of an imported statement and the payment it was matched to"""
+    SOURCE_CHOICES = [
+        ('billing_payment', 'Invoice Payment'),
+        ('booking_payment', 'Booking Payment'),
+        ('conference_payment', 'Conference Payment'),
+        ('restaurant_transaction', 'Restaurant Transaction'),
+    ]
+
+    MATCH_RULE_CHOICES = [
+        ('reference', 'Reference and amount'),
+        ('amount_date', 'Amount and date'),
+    ]
+
+    statement = models.ForeignKey(BankStatement, on_delete=models.CASCADE, related_name='lines')
+    line_number = models.PositiveIntegerField()
+    posted_on = models.DateField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    reference = models.CharField(max_length=100, blank=True)
+    description = models.CharField(max_length=255, blank=True)
+    match_source = models.CharField(max_length=30, choices=SOURCE_CHOICES, blank=True)
+    match_id = models.PositiveBigIntegerField(null=True, blank=True)
+    match_rule = models.CharField(max_length=20, choices=MATCH_RULE_CHOICES, blank=True)
+
+    class Meta:
+        verbose_name = 'Statement Line'
+        verbose_name_plural = 'Statement Lines'
+        ordering = ['statement', 'line_number']
+        indexes = [
+            models.Index(fields=['statement', 'match_source']),
+        ]
+
+    def __str__(self):
+        return f"{self.statement.name} #{self.line_number} {self.amount}"
+
+    @property
+    def is_matched(self):
+        return bool(self.match_source)
@@ -0,0 +1,159 @@
+"""
+Night audit: close a business date for the whole property.
+
+The audit rolls over every status that depends only on the calendar with one
+set-based ``UPDATE`` per transition, writes the matching history rows with one
+bulk insert per model and stores a frozen ``NightAudit`` report. No model
+instance is saved individually, so the run time depends on the number of
+queries (a fixed handful) rather than on the number of bookings or invoices.
+
+Transitions for business date ``D``:
+
+* pending/confirmed bookings arriving on or before ``D`` that were never
+  checked in become ``no_show``;
+* unpaid draft/sent invoices due on or before ``D`` become ``overdue``;
+* sent restaurant invoices due on or before ``D`` become ``overdue``.
+
+Active stays past their check-out date have no status of their own, so they
+are listed in the report for the front desk instead of being changed.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from apps.bookings.models import Booking, BookingPayment
+from apps.restaurant.models import RestaurantInvoice, Transaction
+from apps.rooms.models import Room
+from .models import Invoice, Payment, NightAudit
+
+
+CHANGE_REASON = 'Night audit'
+
+
+def default_business_date():
+    """The audit normally runs after midnight and closes the previous day"""
+    return timezone.localdate() - timedelta(days=1)
+
+
+def run_night_audit(business_date=None, user=None):
+    """Run the audit for a business date.
+
+    Returns (audit, created). A date that has already been audited is not run
+    again; its existing report is returned with created=False.
+    """
+    if business_date is None:
+        business_date = default_business_date()
+
+    existing = NightAudit.objects.filter(business_date=business_date).first()
+    if existing:
+        return existing, False
+
+    started_at = timezone.now()
+    with transaction.atomic():
+        no_shows = _rollover(
+            Booking.objects.filter(
+                status__in=['pending', 'confirmed'],
+                check_in_date__lte=business_date,
+                check_in__isnull=True,
+            ),
+            'booking_number', started_at, user, status='no_show',
+        )
+        overdue_invoices = _rollover(
+            Invoice.objects.filter(
+                status__in=['draft', 'sent'],
+                due_date__lte=business_date,
+                paid_amount__lt=F('total_amount'),
+            ),
+            'invoice_number', started_at, user, status='overdue',
+        )
+        overdue_restaurant_invoices = _rollover(
+            RestaurantInvoice.objects.filter(status='sent', due_date__lte=business_date),
+            'invoice_number', started_at, user, status='overdue',
+        )
+        overdue_stays = list(
+            Booking.objects
+            .filter(status='active', check_out_date__lte=business_date)
+            .order_by('check_out_date', 'booking_number')
+            .values_list('booking_number', 'room__room_number', 'check_out_date')
+        )
+
+        snapshot = _snapshot(business_date)
+        audit = NightAudit.objects.create(
+            business_date=business_date,
+            started_at=started_at,
+            completed_at=timezone.now(),
+            run_by=user,
+            no_show_count=len(no_shows),
+            overdue_invoice_count=len(overdue_invoices),
+            overdue_restaurant_invoice_count=len(overdue_restaurant_invoices),
+            overdue_stay_count=len(overdue_stays),
+            details={
+                'no_shows': no_shows,
+                'overdue_invoices': overdue_invoices,
+                'overdue_restaurant_invoices': overdue_restaurant_invoices,
+                'overdue_stays': [
+                    {'booking': number, 'room': room, 'check_out_date': check_out.isoformat()}
+                    for number, room, check_out in overdue_stays
+                ],
+            },
+            **snapshot,
+        )
+    return audit, True
+
+
+def _rollover(queryset, label_field, now, user, **changes):
+    """Apply changes to every row of queryset with one UPDATE and one history insert.
+
+    Returns the label_field values of the rows that were changed.
+    """
+    model = queryset.model
+    rows = list(queryset.select_for_update().values_list('pk', label_field))
+    if not rows:
+        return []
+
+    ids = [pk for pk, _ in rows]
+    model.objects.filter(pk__in=ids).update(updated_at=now, **changes)
+    model.history.bulk_history_create(
+        model.objects.filter(pk__in=ids),
+        update=True,
+        default_user=user,
+        default_change_reason=CHANGE_REASON,
+        default_date=now,
+    )
+    return [label for _, label in rows]
+
+
+def _snapshot(business_date):
+    """Occupancy and revenue figures for the business date, one aggregate per table"""
+    rooms = Room.objects.filter(is_active=True).aggregate(
+        total=Count('pk'),
+        out_of_service=Count('pk', filter=Q(status__in=['maintenance', 'out_of_order'])),
+    )
+    stays = Booking.objects.aggregate(
+        occupied=Count('pk', filter=Q(status='active', check_in_date__lte=business_date)),
+        arrivals=Count('pk', filter=Q(check_in_date=business_date, status__in=['active', 'completed'])),
+        departures=Count('pk', filter=Q(check_out_date=business_date, status='completed')),
+        room_revenue=Sum('room_rate', filter=Q(status='active', check_in_date__lte=business_date)),
+    )
+    restaurant = Transaction.objects.filter(created_at__date=business_date).aggregate(total=Sum('amount'))
+    booking_payments = BookingPayment.objects.filter(
+        status='completed', payment_date__date=business_date,
+    ).aggregate(total=Sum('amount'))
+    invoice_payments = Payment.objects.filter(
+        payment_status='completed', payment_date__date=business_date,
+    ).aggregate(total=Sum('amount'))
+
+    zero = Decimal('0.00')
+    return {
+        'total_rooms': rooms['total'],
+        'out_of_service_rooms': rooms['out_of_service'],
+        'occupied_rooms': stays['occupied'],
+        'arrivals': stays['arrivals'],
+        'departures': stays['departures'],
+        'room_revenue': stays['room_revenue'] or zero,
+        'restaurant_revenue': restaurant['total'] or zero,
+        'payments_received': (booking_payments['total'] or zero) + (invoice_payments['total'] or zero),
+    }
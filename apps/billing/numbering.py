@@ -0,0 +1,63 @@
+"""
+Document numbers.
+
+Bookings, groups, orders, invoices, transactions, folios and conference
+bookings are numbered ``<PREFIX>-<YEAR>-<NNNNNN>`` from one sequence per
+prefix and year, e.g. ``RINV-2026-000042``. Numbers only ever grow within a
+year, so new rows land at the right-hand edge of the unique index, and two
+callers can never be handed the same number: nothing is retried and the
+unique index is only a safety net.
+
+On PostgreSQL each prefix and year gets a native sequence, created the first
+time it is needed. ``nextval`` takes no row lock and is not rolled back, so a
+number used by a failed transaction is simply skipped; numbers are unique and
+increasing but may have gaps. Other databases (SQLite in development) keep
+the counters in DocumentSequence rows instead.
+
+Numbers issued before this scheme (random hex, e.g. ``ORD-1A2B3C4D``) never
+clash with the new format, which always contains the year.
+"""
+from django.db import IntegrityError, ProgrammingError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DocumentSequence
+
+
+WIDTH = 6
+
+# PostgreSQL sequences known to exist (committed) in this process
+_created = set()
+
+
+def next_number(prefix, year=None):
+    """Next document number for a prefix, e.g. next_number('INV') -> 'INV-2026-000001'"""
+    year = year or timezone.localdate().year
+    name = f'docseq_{prefix.lower()}_{year}'
+    if connection.vendor == 'postgresql':
+        value = _nextval(name)
+    else:
+        value = _increment(name)
+    return f'{prefix}-{year}-{value:0{WIDTH}d}'
+
+
+def _nextval(name):
+    with connection.cursor() as cursor:
+        if name not in _created:
+            try:
+                with transaction.atomic():
+                    cursor.execute(f'CREATE SEQUENCE IF NOT EXISTS {connection.ops.quote_name(name)}')
+            except (IntegrityError, ProgrammingError):
+                # Created by a concurrent transaction at the same moment
+                pass
+            # Only remember it once the DDL has committed with the caller's transaction
+            transaction.on_commit(lambda: _created.add(name))
+        cursor.execute('SELECT nextval(%s)', [name])
+        return cursor.fetchone()[0]
+
+
+def _increment(name):
+    with transaction.atomic():
+        DocumentSequence.objects.get_or_create(name=name)
+        DocumentSequence.objects.filter(name=name).update(value=F('value') + 1)
+        return DocumentSequence.objects.values_list('value', flat=True).get(name=name)
@@ -0,0 +1,135 @@
+"""
+Invoice pricing and tax.
+
+Active TaxRate rows are held in a per-process snapshot so pricing an invoice
+does not read the rates. The snapshot is tagged with the ``tax-rates``
+version from ``billing.versions``, which lives in the database so every
+gunicorn worker and Celery process sees it; saving or deleting a tax rate
+bumps it (see ``BillingConfig.ready``) and every process reloads the rates
+with one query the next time it prices something. Otherwise pricing costs
+one indexed read of the version row.
+
+``price_lines`` works out the line totals, subtotal, tax, discount and grand
+total of a whole invoice in one pass, rounding every amount to the cent with
+ROUND_HALF_UP. Tax is charged on the subtotal before the discount, as
+``RestaurantInvoice.save`` does. ``create_invoice_items`` then stores the
+priced lines with one bulk insert (plus one for their history rows).
+"""
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+from simple_history.utils import bulk_create_with_history
+
+from apps.restaurant.models import RestaurantInvoice, RestaurantInvoiceItem
+from . import versions
+from .models import Invoice, InvoiceItem, TaxRate
+
+
+VERSION_NAME = 'tax-rates'
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+Line = namedtuple('Line', 'description quantity unit_price menu_item_id', defaults=(None,))
+
+PricedLine = namedtuple('PricedLine', 'description quantity unit_price menu_item_id total_price')
+
+PricedInvoice = namedtuple('PricedInvoice', 'lines subtotal tax_rate tax_amount discount_amount total_amount')
+
+_snapshot = (None, {})
+
+
+def to_cents(amount):
+    return Decimal(amount).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def active_tax_rates():
+    """Combined active rate per service, from the in-process snapshot"""
+    global _snapshot
+    version = versions.current(VERSION_NAME).token
+    if _snapshot[0] != version:
+        rates = {}
+        for applies_to, rate in TaxRate.objects.filter(is_active=True).values_list('applies_to', 'rate'):
+            rates[applies_to] = rates.get(applies_to, ZERO) + rate
+        _snapshot = (version, rates)
+    return _snapshot[1]
+
+
+def invalidate_tax_rates(**kwargs):
+    """Move every process on to a new snapshot; connected to TaxRate post_save/post_delete"""
+    versions.bump(VERSION_NAME)
+
+
+def tax_rate_for(service):
+    """Percentage charged on a service: its own rates plus the 'all' rates"""
+    rates = active_tax_rates()
+    return rates.get(service, ZERO) + rates.get('all', ZERO)
+
+
+def price_lines(lines, tax_rate=ZERO, discount=ZERO):
+    """Price every line of one invoice.
+
+    ``lines`` is an iterable of Line; ``discount`` an amount, capped at the
+    subtotal. Returns a PricedInvoice.
+    """
+    tax_rate = Decimal(tax_rate)
+    priced = []
+    subtotal = ZERO
+    for line in lines:
+        quantity = int(line.quantity)
+        unit_price = to_cents(line.unit_price)
+        total_price = to_cents(quantity * unit_price)
+        priced.append(PricedLine(line.description, quantity, unit_price, line.menu_item_id, total_price))
+        subtotal += total_price
+
+    tax_amount = to_cents(subtotal * tax_rate / 100)
+    discount_amount = min(to_cents(discount), subtotal)
+    return PricedInvoice(
+        lines=priced,
+        subtotal=subtotal,
+        tax_rate=tax_rate,
+        tax_amount=tax_amount,
+        discount_amount=discount_amount,
+        total_amount=subtotal + tax_amount - discount_amount,
+    )
+
+
+def order_lines(order):
+    """Lines for every item of a restaurant order, in one query"""
+    return [
+        Line(name, quantity, unit_price, menu_item_id)
+        for menu_item_id, name, quantity, unit_price in
+        order.items.values_list('menu_item_id', 'menu_item__name', 'quantity', 'unit_price')
+    ]
+
+
+def create_invoice_items(invoice, priced, user=None):
+    """Store the priced lines as items of a billing or restaurant invoice"""
+    if isinstance(invoice, RestaurantInvoice):
+        model = RestaurantInvoiceItem
+        items = [
+            RestaurantInvoiceItem(
+                invoice=invoice,
+                menu_item_id=line.menu_item_id,
+                description=line.description,
+                quantity=line.quantity,
+                unit_price=line.unit_price,
+                total_price=line.total_price,
+            )
+            for line in priced.lines
+        ]
+    elif isinstance(invoice, Invoice):
+        model = InvoiceItem
+        items = [
+            InvoiceItem(
+                invoice=invoice,
+                description=line.description,
+                quantity=line.quantity,
+                unit_price=line.unit_price,
+                total_price=line.total_price,
+            )
+            for line in priced.lines
+        ]
+    else:
+        raise TypeError(f'Cannot add items to {type(invoice).__name__}')
+    return bulk_create_with_history(items, model, default_user=user)
@@ -0,0 +1,274 @@
+"""
+Bank and card statement reconciliation.
+
+A statement file (CSV with a header row, or OFX) is read one row at a time
+and stored as StatementLine rows in batches, so a large settlement file is
+never held in memory. Matching then works in bulk:
+
+1. The unreconciled, non-cash payments of every ledger (invoice payments,
+   booking payments, conference payments and restaurant transactions) that
+   fall inside the statement's date range, widened by the matching window,
+   are loaded with one query per ledger.
+2. They are indexed in two dictionaries: by normalised reference and by
+   amount.
+3. Each statement line is looked up in those indexes (a hash join). A line
+   whose reference and amount match a payment within the window is matched
+   on its reference. Otherwise, the unclaimed payment of the same amount
+   with the closest date within the window is used. A payment is matched at
+   most once.
+4. Matched payments are marked with ``reconciled_at`` using one UPDATE per
+   ledger, and their history rows are written in one insert per ledger.
+   The statement lines are updated with ``bulk_update``.
+
+Candidate rows are read with ``SELECT ... FOR UPDATE SKIP LOCKED``, so two
+statements imported at the same time cannot claim the same payment.
+"""
+import csv
+import re
+from collections import defaultdict, namedtuple
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.bookings.models import BookingPayment
+from apps.conference.models import ConferencePayment
+from apps.restaurant.models import Transaction
+from .models import BankStatement, Payment, StatementLine
+
+
+BATCH_SIZE = 1000
+
+WINDOW_DAYS = 3
+
+CHANGE_REASON = 'Reconciled against bank statement'
+
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d.%m.%Y', '%Y%m%d']
+
+# Accepted CSV header names for each column, compared in lower case
+CSV_COLUMNS = {
+    'posted_on': ['date', 'posted', 'posted on', 'posting date', 'transaction date', 'value date', 'settlement date'],
+    'amount': ['amount', 'credit', 'net amount', 'settled amount'],
+    'reference': ['reference', 'ref', 'reference number', 'transaction id', 'auth code', 'fitid'],
+    'description': ['description', 'details', 'memo', 'narrative', 'name'],
+}
+
+StatementRow = namedtuple('StatementRow', 'posted_on amount reference description')
+
+Candidate = namedtuple('Candidate', 'source priority pk reference amount date')
+
+Ledger = namedtuple('Ledger', 'source model queryset reference_field date_field')
+
+
+class StatementError(Exception):
+    """Raised when a statement file cannot be read"""
+
+
+def ledgers():
+    """Payments a statement line can be matched to, in tie-break order"""
+    return [
+        Ledger('billing_payment', Payment,
+               Payment.objects.filter(payment_status='completed').exclude(payment_method='cash'),
+               'transaction_id', 'payment_date'),
+        Ledger('booking_payment', BookingPayment,
+               BookingPayment.objects.filter(status='completed').exclude(payment_method='cash'),
+               'reference_number', 'payment_date'),
+        Ledger('conference_payment', ConferencePayment,
+               ConferencePayment.objects.exclude(payment_method='cash'),
+               'transaction_id', 'payment_date'),
+        Ledger('restaurant_transaction', Transaction,
+               Transaction.objects.exclude(payment_method__in=['cash', 'room_charge']),
+               'transaction_id', 'created_at'),
+    ]
+
+
+def normalise_reference(reference):
+    return re.sub(r'[^0-9A-Z]', '', (reference or '').upper())
+
+
+def parse_date(value):
+    # Drop any time of day: '2026-10-01 14:03' or '2026-10-01T14:03:00'
+    value = (value or '').strip().replace('T', ' ').split(' ')[0]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise StatementError(f'Unrecognised date {value!r}')
+
+
+def parse_amount(value):
+    cleaned = re.sub(r'[^0-9.\-]', '', (value or '').replace('(', '-'))
+    try:
+        return Decimal(cleaned).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise StatementError(f'Unrecognised amount {value!r}')
+
+
+def read_csv(stream):
+    """Yield StatementRow for every data row of a CSV statement"""
+    reader = csv.reader(stream)
+    header = [name.strip().lower() for name in next(reader, [])]
+    columns = {}
+    for field, names in CSV_COLUMNS.items():
+        for name in names:
+            if name in header:
+                columns[field] = header.index(name)
+                break
+    missing = [label for field, label in [('posted_on', 'date'), ('amount', 'amount')] if field not in columns]
+    if missing:
+        raise StatementError(f'Statement has no {" or ".join(missing)} column')
+
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        value = lambda field: row[columns[field]].strip() if field in columns and columns[field] < len(row) else ''
+        try:
+            yield StatementRow(
+                posted_on=parse_date(value('posted_on')),
+                amount=parse_amount(value('amount')),
+                reference=value('reference')[:100],
+                description=value('description')[:255],
+            )
+        except StatementError as e:
+            raise StatementError(f'Line {reader.line_num}: {e}')
+
+
+def read_ofx(stream):
+    """Yield StatementRow for every <STMTTRN> block of an OFX statement"""
+    tag = re.compile(r'<(/?)([A-Z0-9.]+)>([^<\r\n]*)', re.IGNORECASE)
+    fields = None
+    for number, line in enumerate(stream, start=1):
+        for closing, name, value in tag.findall(line):
+            name = name.upper()
+            if name == 'STMTTRN':
+                if closing and fields is not None:
+                    try:
+                        yield StatementRow(
+                            posted_on=parse_date(fields.get('DTPOSTED', '')[:8]),
+                            amount=parse_amount(fields.get('TRNAMT')),
+                            reference=(fields.get('REFNUM') or fields.get('FITID') or '')[:100],
+                            description=(fields.get('NAME') or fields.get('MEMO') or '')[:255],
+                        )
+                    except StatementError as e:
+                        raise StatementError(f'Line {number}: {e}')
+                    fields = None
+                elif not closing:
+                    fields = {}
+            elif fields is not None and not closing:
+                fields[name] = value.strip()
+
+
+def import_statement(stream, name, file_format='csv', window_days=WINDOW_DAYS, user=None):
+    """Store the rows of a statement and reconcile them.
+
+    ``stream`` is a text stream of the file. Returns the BankStatement.
+    """
+    reader = read_ofx if file_format == 'ofx' else read_csv
+    with transaction.atomic():
+        statement = BankStatement.objects.create(
+            name=name, file_format=file_format, window_days=window_days, imported_by=user,
+        )
+        batch = []
+        for number, row in enumerate(reader(stream), start=1):
+            batch.append(StatementLine(statement=statement, line_number=number, **row._asdict()))
+            statement.line_count += 1
+            statement.total_amount += row.amount
+            statement.date_from = min(statement.date_from or row.posted_on, row.posted_on)
+            statement.date_to = max(statement.date_to or row.posted_on, row.posted_on)
+            if len(batch) >= BATCH_SIZE:
+                StatementLine.objects.bulk_create(batch)
+                batch = []
+        StatementLine.objects.bulk_create(batch)
+        statement.save()
+
+        reconcile(statement, user=user)
+    return statement
+
+
+def reconcile(statement, user=None):
+    """Match the unmatched lines of a statement and mark the payments reconciled"""
+    if not statement.line_count:
+        return statement
+
+    window = timedelta(days=statement.window_days)
+    with transaction.atomic():
+        by_reference, by_amount = _index_candidates(statement.date_from - window, statement.date_to + window)
+        claimed = set()
+        matched = defaultdict(list)
+        updates = []
+
+        for line in statement.lines.filter(match_source='').iterator(chunk_size=BATCH_SIZE):
+            candidate, rule = _match(line, by_reference, by_amount, claimed, window)
+            if candidate is None:
+                continue
+            claimed.add((candidate.source, candidate.pk))
+            matched[candidate.source].append(candidate.pk)
+            line.match_source, line.match_id, line.match_rule = candidate.source, candidate.pk, rule
+            updates.append(line)
+            statement.matched_count += 1
+            statement.matched_amount += line.amount
+
+        StatementLine.objects.bulk_update(updates, ['match_source', 'match_id', 'match_rule'], batch_size=BATCH_SIZE)
+        now = timezone.now()
+        ledger_models = {ledger.source: ledger.model for ledger in ledgers()}
+        for source, ids in matched.items():
+            model = ledger_models[source]
+            model.objects.filter(pk__in=ids).update(reconciled_at=now)
+            model.history.bulk_history_create(
+                model.objects.filter(pk__in=ids),
+                update=True,
+                default_user=user,
+                default_change_reason=CHANGE_REASON,
+                default_date=now,
+                batch_size=BATCH_SIZE,
+            )
+        statement.save(update_fields=['matched_count', 'matched_amount'])
+    return statement
+
+
+def _index_candidates(date_from, date_to):
+    """Hash indexes of open payments between two dates: by reference and by amount"""
+    start = timezone.make_aware(datetime.combine(date_from, time.min))
+    end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+    by_reference = defaultdict(list)
+    by_amount = defaultdict(list)
+    for priority, ledger in enumerate(ledgers()):
+        rows = (
+            ledger.queryset
+            .filter(reconciled_at__isnull=True, **{f'{ledger.date_field}__gte': start, f'{ledger.date_field}__lt': end})
+            .select_for_update(skip_locked=True)
+            .order_by()
+            .values_list('pk', ledger.reference_field, 'amount', ledger.date_field)
+        )
+        for pk, reference, amount, moment in rows:
+            candidate = Candidate(ledger.source, priority, pk, normalise_reference(reference), amount,
+                                  timezone.localtime(moment).date())
+            if candidate.reference:
+                by_reference[candidate.reference].append(candidate)
+            by_amount[amount].append(candidate)
+    return by_reference, by_amount
+
+
+def _match(line, by_reference, by_amount, claimed, window):
+    """Best unclaimed candidate for a statement line, and the rule that matched it"""
+    def usable(candidate):
+        return (
+            (candidate.source, candidate.pk) not in claimed
+            and candidate.amount == line.amount
+            and abs(candidate.date - line.posted_on) <= window
+        )
+
+    closest = lambda candidate: (abs(candidate.date - line.posted_on), candidate.priority, candidate.pk)
+
+    reference = normalise_reference(line.reference)
+    if reference:
+        found = [candidate for candidate in by_reference.get(reference, ()) if usable(candidate)]
+        if found:
+            return min(found, key=closest), 'reference'
+
+    found = [candidate for candidate in by_amount.get(line.amount, ()) if usable(candidate)]
+    if found:
+        return min(found, key=closest), 'amount_date'
+    return None, ''
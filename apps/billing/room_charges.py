@@ -0,0 +1,161 @@
+"""
+Room charges for restaurant orders.
+
+Charging an order to a room only flags it (``Order.room_charge_requested_at``);
+nothing is posted on the request path. This module collects the flagged
+orders into the folios of the stays in their rooms, off the request path like
+the archiver: the ``post_room_charges`` Celery task is queued when an order is
+flagged, runs every few minutes from the beat schedule, and can be run with
+``manage.py post_room_charges``. Check-out posts the charges of the rooms
+being vacated first, so the folio balance read at check-out already includes
+them.
+
+Each batch is one transaction: the orders are claimed with ``SKIP LOCKED``,
+the open folio of every room in the batch is found with one query, all
+charges go through one ``post_entries`` call, the orders are settled with one
+``UPDATE`` and their history and Transaction rows are written with one bulk
+insert each. Every charge carries the posting key ``order:<id>``, so an order
+is never posted twice however often a batch is retried.
+
+Orders whose room has no checked-in stay are left waiting and reported.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from simple_history.utils import bulk_create_with_history
+
+from apps.restaurant.models import Order, Transaction
+from .folio import Posting, order_posting_key, post_entries
+from .models import Folio
+from .numbering import next_number
+
+
+BATCH_SIZE = 200
+
+CHANGE_REASON = 'Charged to room'
+
+RoomChargeRun = namedtuple('RoomChargeRun', 'posted waiting')
+
+
+def pending_room_charges():
+    return Order.objects.filter(
+        room_charge_requested_at__isnull=False,
+        room__isnull=False,
+        payment_status='pending',
+    ).exclude(status='cancelled')
+
+
+def folios_for_rooms(room_ids):
+    """Map each room id to the open folio of the stay in it, from one query"""
+    rows = (
+        Folio.objects
+        .filter(status='open', booking__status='active')
+        .filter(
+            Q(booking__check_in__actual_room_id__in=room_ids)
+            | Q(booking__check_in__actual_room__isnull=True, booking__room_id__in=room_ids)
+        )
+        .values_list('pk', 'booking__room_id', 'booking__check_in__actual_room_id')
+    )
+    return {actual_room_id or room_id: folio_id for folio_id, room_id, actual_room_id in rows}
+
+
+def post_room_charges(batch_size=BATCH_SIZE, max_batches=None, user=None, room_ids=None):
+    """Post every flagged order to its room's folio, batch by batch.
+
+    ``room_ids`` limits the run to orders for those rooms. Returns the number
+    of orders posted and the number left waiting for a stay.
+    """
+    posted = waiting = batches = 0
+    last_pk = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            orders = pending_room_charges().filter(pk__gt=last_pk)
+            if room_ids is not None:
+                orders = orders.filter(room_id__in=room_ids)
+            orders = list(
+                orders.select_for_update(skip_locked=True, of=('self',))
+                .select_related('table', 'guest', 'room')
+                .order_by('pk')[:batch_size]
+            )
+            if not orders:
+                break
+            # Waiting orders are passed over, so move on by primary key rather than re-reading them
+            last_pk = orders[-1].pk
+            folios = folios_for_rooms({order.room_id for order in orders})
+            ready = [order for order in orders if order.room_id in folios]
+            if ready:
+                _post(ready, folios, user)
+        posted += len(ready)
+        waiting += len(orders) - len(ready)
+        batches += 1
+    return RoomChargeRun(posted, waiting)
+
+
+def queue_room_charges():
+    """Queue the posting after the current transaction commits.
+
+    Without a Celery broker the scheduled ``post_room_charges`` command picks
+    the orders up instead.
+    """
+    if not getattr(settings, 'CELERY_BROKER_URL', None):
+        return
+
+    def enqueue():
+        from .tasks import post_room_charges as task
+        try:
+            task.delay()
+        except Exception:
+            # The beat schedule posts the charges anyway; never fail an order over it
+            pass
+
+    transaction.on_commit(enqueue)
+
+
+def _post(orders, folios, user):
+    now = timezone.now()
+    entries = post_entries([
+        Posting(
+            folios[order.room_id], 'charge', 'restaurant', order.total_amount,
+            f'Restaurant order {order.order_number}', order, order.order_number,
+            order_posting_key(order.pk),
+        )
+        for order in orders
+    ], user)
+    # An order whose key was already posted is settled without a second Transaction
+    charged = {entry.order_id for entry in entries}
+
+    Order.objects.filter(pk__in=[order.pk for order in orders]).update(
+        status='billed', payment_status='charged_to_room', updated_at=now,
+    )
+    for order in orders:
+        order.status = 'billed'
+        order.payment_status = 'charged_to_room'
+        order.updated_at = now
+    Order.history.bulk_history_create(
+        orders,
+        update=True,
+        default_user=user,
+        default_change_reason=CHANGE_REASON,
+        default_date=now,
+    )
+    bulk_create_with_history(
+        [
+            Transaction(
+                transaction_id=next_number('TXN'),
+                transaction_type='order',
+                order=order,
+                customer_name=order.customer_info,
+                table_number=order.table.table_number,
+                amount=order.total_amount,
+                payment_method='room_charge',
+                created_by=user,
+            )
+            for order in orders if order.pk in charged
+        ],
+        Transaction,
+        default_user=user,
+        default_change_reason=CHANGE_REASON,
+    )
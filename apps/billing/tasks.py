@@ -0,0 +1,23 @@
+from celery import shared_task
+
+from . import archiver, room_charges
+from .night_audit import run_night_audit
+
+
+@shared_task
+def night_audit():
+    """Close the previous business date; scheduled by CELERY_BEAT_SCHEDULE"""
+    audit, created = run_night_audit()
+    return {'business_date': audit.business_date.isoformat(), 'created': created}
+
+
+@shared_task
+def archive_settled_records():
+    """Archive settled bookings and orders; queued after full payments and scheduled"""
+    return archiver.archive_settled_records()
+
+
+@shared_task
+def post_room_charges():
+    """Post flagged restaurant orders to room folios; queued when an order is flagged and scheduled"""
+    return room_charges.post_room_charges()._asdict()
@@ -11,4 +11,8 @@ urlpatterns = [
     path('invoices/<int:pk>/delete/', views.invoice_delete, name='invoice_delete'),
     path('invoices/<int:pk>/payment/', views.payment_complete, name='payment_complete'),
     path('payments/', views.payment_list, name='payment_list'),
+    path('reports/aging/', views.ar_aging, name='ar_aging'),
+    path('reports/aging/export/', views.ar_aging_export, name='ar_aging_export'),
+    path('statements/', views.statement_list, name='statement_list'),
+    path('statements/<int:pk>/', views.statement_detail, name='statement_detail'),
 ] 
\ No newline at end of file
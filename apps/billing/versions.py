@@ -0,0 +1,51 @@
+"""
+Versions of data that each process caches for itself.
+
+Tax rates, discount codes, the published menu and the conference calendar are
+built once and kept in memory (or the local cache) until the data behind them
+changes. Gunicorn workers and Celery processes do not share memory, so the
+version they compare against lives in the database: one CacheVersion row per
+name, read with a single lookup on its unique index. ``bump`` gives the row a
+new token inside the transaction that changed the data, so every process sees
+the new version exactly when it can see the new data, and they all agree on
+the token (and on ``changed_at``, used for Last-Modified).
+"""
+import uuid
+from collections import namedtuple
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import CacheVersion
+
+
+Version = namedtuple('Version', 'token changed_at')
+
+
+def current(name):
+    """The version of name, created the first time it is asked for"""
+    row = CacheVersion.objects.filter(name=name).values_list('token', 'changed_at').first()
+    if row is None:
+        try:
+            with transaction.atomic():
+                version, _ = CacheVersion.objects.get_or_create(
+                    name=name, defaults={'token': uuid.uuid4().hex, 'changed_at': timezone.now()},
+                )
+        except IntegrityError:
+            # Created by another process at the same moment
+            version = CacheVersion.objects.get(name=name)
+        row = (version.token, version.changed_at)
+    return Version(*row)
+
+
+def bump(name):
+    """Give name a new version, so every process rebuilds what it cached for it"""
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    if CacheVersion.objects.filter(name=name).update(token=token, changed_at=now):
+        return
+    try:
+        with transaction.atomic():
+            CacheVersion.objects.create(name=name, token=token, changed_at=now)
+    except IntegrityError:
+        CacheVersion.objects.filter(name=name).update(token=token, changed_at=now)
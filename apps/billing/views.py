@@ -3,11 +3,14 @@ from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from apps.users.decorators import receptionist_required
+from django.db import transaction
 from django.db.models import Sum, Count, Q
 from django.utils import timezone
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from datetime import datetime, timedelta
 from decimal import Decimal
+import csv
+import io
 import json
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
@@ -15,10 +18,17 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-from .models import Invoice, Payment
-from apps.bookings.models import Booking
+from .aging import aging_report, aging_documents, BUCKETS
+from .archiver import queue_archiver
+from .discounts import quote_discount, redeem_discount, DiscountError
+from .models import BankStatement, Invoice, Payment, StatementLine
+from .numbering import next_number
+from .pricing import Line, create_invoice_items, price_lines, tax_rate_for
+from .reconciliation import import_statement, StatementError, WINDOW_DAYS
+from apps.bookings.models import Booking, BookingPayment
+from apps.restaurant.daily_close import revenue_between as restaurant_revenue_between
 from apps.restaurant.models import Order
-from apps.conference.models import ConferenceBooking
+from apps.conference.models import ConferenceBooking, ConferencePayment
 
 
 @receptionist_required
@@ -75,11 +85,8 @@ def billing_dashboard(request):
         payment_status='paid'
     ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
     
-    # Restaurant revenue - only count orders that have been paid
-    restaurant_revenue = Order.objects.filter(
-        created_at__date__range=[start_date, end_date],
-        payment_status='paid'
-    ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
+    # Restaurant revenue - daily closes, plus the live day when the range reaches it
+    restaurant_revenue = restaurant_revenue_between(start_date, end_date)
     
     # Conference revenue - only count paid conference bookings
     conference_revenue = ConferenceBooking.objects.filter(
@@ -117,10 +124,7 @@ def billing_dashboard(request):
         created_at__date__range=[previous_start, start_date],
         payment_status='paid'
     ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
-    prev_restaurant = Order.objects.filter(
-        created_at__date__range=[previous_start, start_date],
-        payment_status='paid'
-    ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
+    prev_restaurant = restaurant_revenue_between(previous_start, start_date)
     prev_conference = ConferenceBooking.objects.filter(
         created_at__date__range=[previous_start, start_date],
         payment_status='paid'
@@ -207,10 +211,7 @@ def billing_dashboard(request):
         ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
         
         # Restaurant revenue
-        month_restaurant_revenue = Order.objects.filter(
-            created_at__date__range=[month_start, month_end],
-            payment_status='paid'
-        ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
+        month_restaurant_revenue = restaurant_revenue_between(month_start, month_end)
         
         # Conference revenue
         month_conference_revenue = ConferenceBooking.objects.filter(
@@ -291,9 +292,14 @@ def invoice_create(request):
         .select_related('guest', 'room', 'room__room_type')
         .order_by('-created_at')
     )
-    from apps.restaurant.models import Order
-    # Filter orders by type based on GET preselect (front-end JS toggles visibility only)
-    order_qs = Order.objects.filter(status__in=['served', 'billed'], payment_status__in=['pending']).select_related('guest', 'room').order_by('-created_at')
+    # Filter orders by type based on GET preselect (front-end JS toggles visibility only).
+    # Orders charged to a room reach the stay's folio through billing.room_charges, so they are not re-keyed here.
+    order_qs = (
+        Order.objects
+        .filter(status__in=['served', 'billed'], payment_status__in=['pending'], room_charge_requested_at__isnull=True)
+        .select_related('guest', 'room')
+        .order_by('-created_at')
+    )
     filter_type = request.GET.get('type')
     if filter_type == 'gym':
         order_qs = order_qs.filter(special_instructions__icontains='gym')
@@ -316,8 +322,7 @@ def invoice_create(request):
     if request.method == 'POST':
         try:
             # Generate unique invoice number
-            import uuid
-            invoice_number = f"INV-{uuid.uuid4().hex[:8].upper()}"
+            invoice_number = next_number('INV')
             
             # Get form data
             customer_name = request.POST.get('customer_name')
@@ -356,9 +361,7 @@ def invoice_create(request):
                         'orders': orders,
                     })
 
-                # Compute remaining balance using BookingPayment records
-                total_paid = booking.payments.filter(status='completed').aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-                remaining_due = booking.total_amount - total_paid
+                remaining_due = booking.balance_amount
                 if remaining_due <= 0:
                     messages.error(request, 'This booking is already fully paid.')
                     return render(request, 'billing/invoice_form.html', {
@@ -398,10 +401,7 @@ def invoice_create(request):
                         'conference_bookings': conference_bookings,
                     })
 
-                # Compute remaining balance using ConferenceBookingPayment records if they exist
-                # For now, assume full amount is due if not fully paid
-                total_paid = conference_booking.paid_amount
-                remaining_due = conference_booking.total_amount - total_paid
+                remaining_due = conference_booking.balance_amount
                 if remaining_due <= 0:
                     messages.error(request, 'This conference booking is already fully paid.')
                     return render(request, 'billing/invoice_form.html', {
@@ -482,26 +482,59 @@ def invoice_create(request):
                         'orders': orders
                     })
             
-            # Create the invoice
-            invoice = Invoice.objects.create(
-                invoice_number=invoice_number,
-                customer_name=customer_name,
-                customer_email=customer_email,
-                invoice_type=invoice_type,
-                booking=booking,
-                order=order,
-                conference_booking=conference_booking,
-                total_amount=total_amount,
-                subtotal=total_amount,  # For now, subtotal equals total_amount
-                due_date=due_date or (timezone.now().date() + timedelta(days=30)),
-                status=status,
-                notes=description,
-                created_by=request.user,
+            # Discount codes apply to stand-alone invoices; booking and conference
+            # invoices bill a balance that is kept on the booking itself
+            discount_code = request.POST.get('discount_code', '').strip()
+            discount_amount = Decimal('0.00')
+            if discount_code:
+                if booking or conference_booking:
+                    raise DiscountError('Discount codes cannot be applied to booking or conference invoices.')
+                discount_amount = quote_discount(discount_code, total_amount)[1]
+            
+            # One line for the amount billed; booking and conference balances already include any tax
+            tax_rate = Decimal('0.00') if booking or conference_booking else tax_rate_for(invoice_type)
+            priced = price_lines(
+                [Line((description or dict(Invoice.INVOICE_TYPES)[invoice_type])[:200], 1, total_amount)],
+                tax_rate=tax_rate,
+                discount=discount_amount,
             )
             
+            with transaction.atomic():
+                # Create the invoice
+                invoice = Invoice.objects.create(
+                    invoice_number=invoice_number,
+                    customer_name=customer_name,
+                    customer_email=customer_email,
+                    invoice_type=invoice_type,
+                    booking=booking,
+                    order=order,
+                    conference_booking=conference_booking,
+                    total_amount=priced.total_amount,
+                    subtotal=priced.subtotal,
+                    tax_amount=priced.tax_amount,
+                    discount_amount=priced.discount_amount,
+                    due_date=due_date or (timezone.now().date() + timedelta(days=30)),
+                    status=status,
+                    notes=description,
+                    created_by=request.user,
+                )
+                create_invoice_items(invoice, priced, request.user)
+                
+                # Claim one use of the code; fails the whole invoice if it ran out meanwhile
+                if discount_code:
+                    redeem_discount(discount_code, total_amount, invoice=invoice, user=request.user)
+            
             messages.success(request, f'Invoice {invoice_number} created successfully.')
             return redirect('invoice_list')
             
+        except DiscountError as e:
+            messages.error(request, str(e))
+            return render(request, 'billing/invoice_form.html', {
+                'invoice': request.POST,
+                'bookings': bookings,
+                'orders': orders,
+                'conference_bookings': conference_bookings,
+            })
         except Exception as e:
             messages.error(request, f'Error creating invoice: {str(e)}')
             return render(request, 'billing/invoice_form.html', {
@@ -543,6 +576,132 @@ def payment_list(request):
     return render(request, 'billing/payment_list.html', context)
 
 
+def _aging_date(request):
+    """The as-of date from the query string, defaulting to today"""
+    try:
+        return datetime.strptime(request.GET.get('as_of', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return timezone.localdate()
+
+
+@receptionist_required
+def ar_aging(request):
+    """Accounts-receivable aging by customer and receivable type"""
+    report = aging_report(_aging_date(request))
+    return render(request, 'billing/ar_aging.html', {'report': report})
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+@receptionist_required
+def ar_aging_export(request):
+    """Stream the aging report as CSV, grouped by customer, type or document"""
+    as_of = _aging_date(request)
+    group = request.GET.get('group', 'customer')
+    bucket_labels = [label for _, label in BUCKETS]
+    writer = csv.writer(_Echo())
+
+    def rows():
+        if group == 'document':
+            labels = dict(BUCKETS)
+            yield writer.writerow(['Document', 'Type', 'Customer', 'Due Date', 'Bucket', 'Amount'])
+            for document, kind, customer, due, bucket, amount in aging_documents(as_of).iterator(chunk_size=2000):
+                yield writer.writerow([document, kind, customer, due.isoformat() if due else '', labels.get(bucket, bucket), amount])
+            return
+
+        report = aging_report(as_of)
+        if group == 'type':
+            yield writer.writerow(['Type'] + bucket_labels + ['Total', 'Documents'])
+            lines = [([row['key']], row) for row in report['by_type']]
+        else:
+            yield writer.writerow(['Customer', 'Type'] + bucket_labels + ['Total', 'Documents'])
+            lines = [([row['customer'], row['kind_label']], row) for row in report['rows']]
+        for key, row in lines + [(['Total'] + ([''] if group != 'type' else []), report['totals'])]:
+            yield writer.writerow(key + [row[name] for name, _ in BUCKETS] + [row['total'], row['documents']])
+
+    response = StreamingHttpResponse(rows(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="ar_aging_{group}_{as_of:%Y%m%d}.csv"'
+    return response
+
+
+@receptionist_required
+def statement_list(request):
+    """Imported bank and card statements; POST imports and reconciles a new file"""
+    if request.method == 'POST':
+        upload = request.FILES.get('statement')
+        if not upload:
+            messages.error(request, 'Please choose a statement file to import.')
+            return redirect('statement_list')
+        try:
+            window_days = max(int(request.POST.get('window_days') or WINDOW_DAYS), 0)
+        except ValueError:
+            window_days = WINDOW_DAYS
+        file_format = 'ofx' if upload.name.lower().endswith(('.ofx', '.qfx')) else 'csv'
+        try:
+            statement = import_statement(
+                io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''),
+                upload.name,
+                file_format=file_format,
+                window_days=window_days,
+                user=request.user,
+            )
+        except (StatementError, UnicodeDecodeError) as e:
+            messages.error(request, f'Could not import {upload.name}: {e}')
+            return redirect('statement_list')
+
+        messages.success(
+            request,
+            f'Imported {statement.line_count} line(s) from {statement.name}: '
+            f'{statement.matched_count} matched, {statement.unmatched_count} unmatched.'
+        )
+        return redirect('statement_detail', pk=statement.pk)
+
+    statements = BankStatement.objects.select_related('imported_by')[:50]
+    return render(request, 'billing/statement_list.html', {
+        'statements': statements,
+        'window_days': WINDOW_DAYS,
+    })
+
+
+@receptionist_required
+def statement_detail(request, pk):
+    """Matched and unmatched lines of an imported statement"""
+    try:
+        statement = BankStatement.objects.get(pk=pk)
+    except BankStatement.DoesNotExist:
+        messages.error(request, 'Statement not found.')
+        return redirect('statement_list')
+
+    show = request.GET.get('show', 'unmatched')
+    lines = statement.lines.all()
+    if show == 'matched':
+        lines = lines.exclude(match_source='')
+    elif show == 'unmatched':
+        lines = lines.filter(match_source='')
+
+    by_source = (
+        statement.lines.exclude(match_source='')
+        .values('match_source')
+        .annotate(count=Count('pk'), amount=Sum('amount'))
+        .order_by('match_source')
+    )
+    source_labels = dict(StatementLine.SOURCE_CHOICES)
+    for row in by_source:
+        row['label'] = source_labels.get(row['match_source'], row['match_source'])
+
+    return render(request, 'billing/statement_detail.html', {
+        'statement': statement,
+        'lines': lines,
+        'show': show,
+        'by_source': by_source,
+    })
+
+
 @receptionist_required
 def invoice_detail(request, pk):
     """View invoice details"""
@@ -879,7 +1038,7 @@ def invoice_delete(request, pk):
 
 @receptionist_required
 def payment_complete(request, pk):
-    """Complete payment and handle guest/order deletion if full payment"""
+    """Record a payment; settled records are archived later by the archiver"""
     try:
         invoice = Invoice.objects.get(pk=pk)
     except Invoice.DoesNotExist:
@@ -897,103 +1056,57 @@ def payment_complete(request, pk):
         try:
             payment_amount = Decimal(payment_amount)
             
-            # Create payment record
-            payment = Payment.objects.create(
-                invoice=invoice,
-                amount=payment_amount,
-                payment_method=payment_method,
-                payment_status='completed',
-                processed_by=request.user,
-                notes=f'Payment completed via {payment_method}'
-            )
-            
-            # Update invoice paid amount
-            invoice.paid_amount += payment_amount
-            invoice.save()
-            
-            # Mirror payment to booking payments if this invoice is tied to a booking
-            try:
-                if invoice.booking:
-                    from apps.bookings.models import BookingPayment
-                    booking = invoice.booking
-                    booking_payment = BookingPayment.objects.create(
-                        booking=booking,
+            with transaction.atomic():
+                # Create payment record
+                payment = Payment.objects.create(
+                    invoice=invoice,
+                    amount=payment_amount,
+                    payment_method=payment_method,
+                    payment_status='completed',
+                    processed_by=request.user,
+                    notes=f'Payment completed via {payment_method}'
+                )
+                
+                # Update invoice running totals and status
+                invoice.record_payment(payment_amount, user=request.user)
+                
+                # Mirror payment to the booking or conference booking behind the invoice
+                if invoice.booking_id:
+                    BookingPayment.objects.create(
+                        booking=invoice.booking,
                         amount=payment_amount,
                         payment_method=payment_method,
                         status='completed',
                         processed_by=request.user,
                         notes=f'Linked to invoice {invoice.invoice_number}'
                     )
-
-                    # Recompute booking payment status
-                    total_paid = booking.payments.filter(status='completed').aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-                    if total_paid >= booking.total_amount:
-                        booking.payment_status = 'paid'
-                    elif total_paid > 0:
-                        booking.payment_status = 'partial'
-                    else:
-                        booking.payment_status = 'pending'
-                    booking.save()
-            except Exception:
-                # Non-fatal; continue payment flow
-                pass
-            
-            # Check if payment is full
-            if invoice.paid_amount >= invoice.total_amount:
-                invoice.status = 'paid'
-                invoice.save()
+                    invoice.booking.record_payment(payment_amount, user=request.user)
+                elif invoice.conference_booking_id:
+                    ConferencePayment.objects.create(
+                        booking=invoice.conference_booking,
+                        amount=payment_amount,
+                        payment_method=payment_method if payment_method in dict(ConferencePayment.PAYMENT_METHOD_CHOICES) else 'other',
+                        transaction_id=invoice.invoice_number,
+                        processed_by=request.user,
+                        notes=f'Linked to invoice {invoice.invoice_number}'
+                    )
+                    invoice.conference_booking.record_payment(payment_amount, user=request.user)
                 
-                # If this is a booking guest invoice, handle guest and order deletion
-                if invoice.invoice_type == 'booking_guest' and invoice.booking:
-                    booking = invoice.booking
-                    guest = booking.guest
+                if invoice.status == 'paid':
+                    # A fully paid invoice settles the order behind it
+                    if invoice.order_id:
+                        order = invoice.order
+                        order.payment_status = 'paid'
+                        order.status = 'billed'
+                        order.save()
                     
-                    # Delete the booking first
-                    booking.delete()
-                    
-                    # Delete any restaurant orders linked to this guest
-                    try:
-                        Order.objects.filter(guest=guest).delete()
-                    except Exception:
-                        # Best-effort cleanup; continue even if orders deletion fails
-                        pass
-                    
-                    # Check if guest has any other bookings before deleting the guest
-                    remaining_bookings = Booking.objects.filter(guest=guest).count()
-                    if remaining_bookings == 0:
-                        guest.delete()
-                        messages.success(request, f'Payment completed. Guest, related orders, and booking deleted as payment was full.')
-                    else:
-                        messages.success(request, f'Payment completed. Booking deleted; guest kept due to other bookings. Related orders removed.')
-                # If this is a booking (restaurant order) invoice, delete order (and potentially guest)
-                elif invoice.invoice_type in ['booking', 'gym', 'swimming_pool'] and invoice.order:
-                    from apps.restaurant.models import Order as RestaurantOrder
-                    order = invoice.order
-                    linked_guest = order.guest
-                    order_number = order.order_number
-                    # Delete the order
-                    try:
-                        order.delete()
-                    except Exception:
-                        pass
-                    # If order had a linked guest, consider deleting guest if no other bookings or orders
-                    if linked_guest:
-                        remaining_bookings = Booking.objects.filter(guest=linked_guest).count()
-                        remaining_orders = RestaurantOrder.objects.filter(guest=linked_guest).count()
-                        if remaining_bookings == 0 and remaining_orders == 0:
-                            try:
-                                linked_guest.delete()
-                            except Exception:
-                                pass
-                            messages.success(request, f'Payment completed. Order {order_number} and guest removed (no remaining records).')
-                        else:
-                            messages.success(request, f'Payment completed. Order {order_number} removed; guest retained due to existing records.')
-                else:
-                    messages.success(request, f'Payment completed. Invoice marked as paid.')
+                    # Settled bookings and orders are archived off the request path
+                    queue_archiver()
+            
+            if invoice.status == 'paid':
+                messages.success(request, f'Payment completed. Invoice marked as paid.')
             else:
                 # Partial payment
-                invoice.status = 'sent'  # Mark as sent for partial payment
-                invoice.save()
                 messages.success(request, f'Partial payment of ${payment_amount} recorded. Remaining balance: ${invoice.remaining_amount}')
             
             # On full payment, redirect to detail with a one-time download flag
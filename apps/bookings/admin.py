@@ -1,21 +1,21 @@
 from django.contrib import admin
-from .models import Booking, CheckIn, CheckOut, BookingPayment
+from .models import Booking, CheckIn, CheckOut, BookingPayment, GroupBooking, GroupPayment
 
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     list_display = ['booking_number', 'guest', 'room', 'check_in_date', 'check_out_date', 'status', 'total_amount']
-    list_filter = ['status', 'payment_status', 'source', 'check_in_date', 'check_out_date']
+    list_filter = ['status', 'payment_status', 'source', 'check_in_date', 'check_out_date', 'archived_at']
     search_fields = ['booking_number', 'guest__first_name', 'guest__last_name', 'guest__email']
-    readonly_fields = ['booking_number', 'created_at', 'updated_at']
+    readonly_fields = ['booking_number', 'balance_amount', 'last_payment_at', 'created_at', 'updated_at', 'archived_at']
     ordering = ['-created_at']
     
     fieldsets = (
         ('Booking Information', {
-            'fields': ('booking_number', 'guest', 'room', 'check_in_date', 'check_out_date', 'number_of_guests')
+            'fields': ('booking_number', 'group', 'guest', 'room', 'room_locked', 'check_in_date', 'check_out_date', 'number_of_guests')
         }),
         ('Pricing', {
-            'fields': ('room_rate', 'total_amount', 'deposit_amount', 'balance_amount')
+            'fields': ('room_rate', 'total_amount', 'deposit_amount', 'paid_amount', 'balance_amount', 'last_payment_at')
         }),
         ('Status', {
             'fields': ('status', 'payment_status', 'source')
@@ -24,7 +24,7 @@ class BookingAdmin(admin.ModelAdmin):
             'fields': ('special_requests', 'dietary_restrictions', 'room_preferences')
         }),
         ('Timestamps', {
-            'fields': ('created_at', 'updated_at', 'confirmed_at', 'cancelled_at'),
+            'fields': ('created_at', 'updated_at', 'confirmed_at', 'cancelled_at', 'archived_at'),
             'classes': ('collapse',)
         }),
     )
@@ -100,3 +100,37 @@ class BookingPaymentAdmin(admin.ModelAdmin):
             'fields': ('notes',)
         }),
     )
+
+
+@admin.register(GroupBooking)
+class GroupBookingAdmin(admin.ModelAdmin):
+    list_display = ['group_number', 'name', 'organizer', 'lead_guest', 'check_in_date', 'check_out_date', 'status']
+    list_filter = ['status', 'check_in_date']
+    search_fields = ['group_number', 'name', 'organizer', 'lead_guest__first_name', 'lead_guest__last_name']
+    readonly_fields = ['group_number', 'created_at', 'updated_at']
+    ordering = ['-check_in_date']
+    
+    fieldsets = (
+        ('Group Information', {
+            'fields': ('group_number', 'name', 'organizer', 'lead_guest', 'status')
+        }),
+        ('Dates', {
+            'fields': ('check_in_date', 'check_out_date')
+        }),
+        ('Notes', {
+            'fields': ('notes',)
+        }),
+        ('Timestamps', {
+            'fields': ('created_by', 'created_at', 'updated_at'),
+            'classes': ('collapse',)
+        }),
+    )
+
+
+@admin.register(GroupPayment)
+class GroupPaymentAdmin(admin.ModelAdmin):
+    list_display = ['group', 'amount', 'payment_method', 'status', 'payment_date', 'processed_by']
+    list_filter = ['payment_method', 'status', 'payment_date']
+    search_fields = ['group__group_number', 'group__name', 'reference_number']
+    readonly_fields = ['payment_date', 'processed_by']
+    ordering = ['-payment_date']
@@ -0,0 +1,293 @@
+"""
+Automatic room assignment for arrivals.
+
+Bookings arriving in a date range that are not checked in and not pinned to a
+room (``Booking.room_locked``) are re-matched to rooms in one pass per arrival
+day. Each day is a min-cost bipartite matching between its arrivals and the
+rooms that are free for their stays, solved with the Hungarian algorithm. The
+cost of a booking/room pair adds up:
+
+* moving the booking away from the room it already holds,
+* changing room type (upgrades only; downgrades are never proposed),
+* missing the guest's preferred room type, floor or smoking preference,
+* leaving short unsellable gaps before or after the stay in that room.
+
+Preference costs are multiplied by the guest's VIP tier so higher tiers win
+contested rooms. Days are solved in order and each day's result is treated as
+fixed occupancy for the next, so a multi-day range never double-books a room.
+"""
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from simple_history.utils import bulk_update_with_history
+
+from apps.rooms.models import Room
+from .models import Booking
+
+
+MOVE_COST = 10
+UPGRADE_COST = 40
+VIP_UPGRADE_COST = 5
+ROOM_TYPE_MISS_COST = 15
+FLOOR_DISTANCE_COST = 3
+SMOKING_MISMATCH_COST = 25
+ORPHAN_GAP_COST = 8
+ORPHAN_GAP_NIGHTS = 2
+
+UNASSIGNED_COST = 10 ** 6
+FORBIDDEN_COST = 10 ** 9
+
+VIP_WEIGHTS = {'regular': 1, 'silver': 2, 'gold': 3, 'platinum': 4}
+UPGRADE_TIERS = ('gold', 'platinum')
+
+HOLDING_STATUSES = ['pending', 'confirmed', 'active']
+UNAVAILABLE_ROOM_STATUSES = ['maintenance', 'out_of_order']
+
+Assignment = namedtuple('Assignment', 'booking from_room to_room cost')
+
+
+class AssignmentConflict(Exception):
+    """Raised when a proposed assignment no longer fits the current bookings"""
+
+
+def movable_bookings(start_date, end_date):
+    """Bookings arriving between start_date and end_date (inclusive) that may be moved"""
+    return (
+        Booking.objects
+        .filter(
+            status__in=['pending', 'confirmed'],
+            check_in_date__range=[start_date, end_date],
+            room_locked=False,
+            check_in__isnull=True,
+        )
+        .select_related('guest', 'guest__preferences', 'room', 'room__room_type')
+        .order_by('check_in_date', 'pk')
+    )
+
+
+def plan_assignments(start_date, end_date):
+    """Propose a room for every movable arrival in the range.
+
+    Returns (assignments, unassigned): one Assignment per booking that could be
+    placed (including bookings that stay in their current room), and the
+    bookings for which no suitable room is free.
+    """
+    bookings = list(movable_bookings(start_date, end_date))
+    if not bookings:
+        return [], []
+
+    horizon_end = max(booking.check_out_date for booking in bookings)
+    rooms = list(
+        Room.objects
+        .filter(is_active=True)
+        .exclude(status__in=UNAVAILABLE_ROOM_STATUSES)
+        .select_related('room_type')
+    )
+
+    # Occupancy held by everything we are not re-assigning, as sorted intervals per room
+    moving_ids = [booking.pk for booking in bookings]
+    occupancy = defaultdict(list)
+    held = (
+        Booking.objects
+        .filter(
+            status__in=HOLDING_STATUSES,
+            check_in_date__lt=horizon_end,
+            check_out_date__gt=start_date - timedelta(days=ORPHAN_GAP_NIGHTS + 1),
+        )
+        .exclude(pk__in=moving_ids)
+        .values_list('room_id', 'check_in_date', 'check_out_date')
+    )
+    for room_id, check_in, check_out in held:
+        occupancy[room_id].append((check_in, check_out))
+    for intervals in occupancy.values():
+        intervals.sort()
+
+    assignments, unassigned = [], []
+    by_day = defaultdict(list)
+    for booking in bookings:
+        by_day[booking.check_in_date].append(booking)
+
+    for day in sorted(by_day):
+        day_bookings = by_day[day]
+        candidates = [
+            room for room in rooms
+            if any(_is_free(occupancy[room.pk], b.check_in_date, b.check_out_date) for b in day_bookings)
+        ]
+        cost = [
+            [_pair_cost(booking, room, occupancy[room.pk]) for room in candidates]
+            + [UNASSIGNED_COST] * len(day_bookings)
+            for booking in day_bookings
+        ]
+        for row, column in enumerate(_hungarian(cost)):
+            booking = day_bookings[row]
+            if column >= len(candidates) or cost[row][column] >= FORBIDDEN_COST:
+                unassigned.append(booking)
+                continue
+            room = candidates[column]
+            assignments.append(Assignment(booking, booking.room, room, cost[row][column]))
+            stay = (booking.check_in_date, booking.check_out_date)
+            intervals = occupancy[room.pk]
+            intervals.insert(bisect_left(intervals, stay), stay)
+
+    return assignments, unassigned
+
+
+def apply_assignments(pairs, user=None):
+    """Write (booking_id, room_id) pairs in one transaction.
+
+    Bookings are locked, the target rooms are re-checked against current
+    bookings with a single query and all room changes are saved with one bulk
+    update plus one bulk history insert. Returns the number of bookings moved.
+    """
+    pairs = {int(booking_id): int(room_id) for booking_id, room_id in pairs}
+    if not pairs:
+        return 0
+
+    with transaction.atomic():
+        bookings = list(
+            Booking.objects.select_for_update()
+            .filter(pk__in=pairs, check_in__isnull=True, room_locked=False, status__in=['pending', 'confirmed'])
+        )
+        if len(bookings) != len(pairs):
+            raise AssignmentConflict('Some bookings were checked in, locked or changed since the plan was made.')
+
+        moving = [booking for booking in bookings if booking.room_id != pairs[booking.pk]]
+        if not moving:
+            return 0
+
+        start = min(booking.check_in_date for booking in moving)
+        end = max(booking.check_out_date for booking in moving)
+        others = defaultdict(list)
+        for room_id, check_in, check_out in (
+            Booking.objects
+            .filter(
+                room_id__in={pairs[booking.pk] for booking in moving},
+                status__in=HOLDING_STATUSES,
+                check_in_date__lt=end,
+                check_out_date__gt=start,
+            )
+            .exclude(pk__in=[booking.pk for booking in moving])
+            .values_list('room_id', 'check_in_date', 'check_out_date')
+        ):
+            others[room_id].append((check_in, check_out))
+
+        now = timezone.now()
+        for booking in moving:
+            booking.room_id = pairs[booking.pk]
+            booking.updated_at = now
+            if not _is_free(sorted(others[booking.room_id]), booking.check_in_date, booking.check_out_date):
+                raise AssignmentConflict(f'Room for booking {booking.booking_number} is no longer free.')
+            others[booking.room_id].append((booking.check_in_date, booking.check_out_date))
+
+        bulk_update_with_history(
+            moving, Booking, ['room', 'updated_at'],
+            default_user=user,
+            default_change_reason='Automatic room assignment',
+        )
+    return len(moving)
+
+
+def _is_free(intervals, check_in, check_out):
+    """True if [check_in, check_out) overlaps none of the intervals (sorted by start)"""
+    starting_before = bisect_left(intervals, (check_out,))
+    return all(existing_out <= check_in for _, existing_out in intervals[:starting_before])
+
+
+def _pair_cost(booking, room, intervals):
+    """Cost of placing a booking in a room, or FORBIDDEN_COST if it cannot go there"""
+    if room.room_type.capacity < booking.number_of_guests:
+        return FORBIDDEN_COST
+    if not _is_free(intervals, booking.check_in_date, booking.check_out_date):
+        return FORBIDDEN_COST
+
+    booked_type = booking.room.room_type
+    if room.room_type.base_price < booked_type.base_price:
+        return FORBIDDEN_COST
+
+    guest = booking.guest
+    weight = VIP_WEIGHTS.get(guest.vip_status, 1)
+    cost = 0
+
+    if room.pk != booking.room_id:
+        cost += MOVE_COST
+    if room.room_type_id != booked_type.pk:
+        cost += VIP_UPGRADE_COST if guest.vip_status in UPGRADE_TIERS else UPGRADE_COST
+
+    preference = getattr(guest, 'preferences', None)
+    if preference is not None:
+        if preference.preferred_room_type_id and preference.preferred_room_type_id != room.room_type_id:
+            cost += ROOM_TYPE_MISS_COST * weight
+        if preference.preferred_floor:
+            cost += abs(room.floor - preference.preferred_floor) * FLOOR_DISTANCE_COST * weight
+        if preference.smoking_preference != room.is_smoking:
+            cost += SMOKING_MISMATCH_COST * weight
+
+    # Short gaps next to the stay are nights nobody can buy
+    index = bisect_left(intervals, (booking.check_in_date,))
+    if index:
+        gap = (booking.check_in_date - intervals[index - 1][1]).days
+        if 0 < gap <= ORPHAN_GAP_NIGHTS:
+            cost += ORPHAN_GAP_COST
+    if index < len(intervals):
+        gap = (intervals[index][0] - booking.check_out_date).days
+        if 0 < gap <= ORPHAN_GAP_NIGHTS:
+            cost += ORPHAN_GAP_COST
+
+    return cost
+
+
+def _hungarian(cost):
+    """Minimum-cost assignment of every row to a distinct column (rows <= columns).
+
+    Returns the chosen column index for each row.
+    """
+    rows, cols = len(cost), len(cost[0])
+    u = [0] * (rows + 1)
+    v = [0] * (cols + 1)
+    match = [0] * (cols + 1)
+    way = [0] * (cols + 1)
+
+    for row in range(1, rows + 1):
+        match[0] = row
+        col0 = 0
+        minv = [float('inf')] * (cols + 1)
+        used = [False] * (cols + 1)
+        while True:
+            used[col0] = True
+            row0 = match[col0]
+            line = cost[row0 - 1]
+            offset = u[row0]
+            delta = float('inf')
+            col1 = 0
+            for col in range(1, cols + 1):
+                if used[col]:
+                    continue
+                reduced = line[col - 1] - offset - v[col]
+                if reduced < minv[col]:
+                    minv[col] = reduced
+                    way[col] = col0
+                if minv[col] < delta:
+                    delta = minv[col]
+                    col1 = col
+            for col in range(cols + 1):
+                if used[col]:
+                    u[match[col]] += delta
+                    v[col] -= delta
+                else:
+                    minv[col] -= delta
+            col0 = col1
+            if match[col0] == 0:
+                break
+        while col0:
+            col1 = way[col0]
+            match[col0] = match[col1]
+            col0 = col1
+
+    result = [0] * rows
+    for col in range(1, cols + 1):
+        if match[col]:
+            result[match[col] - 1] = col - 1
+    return result
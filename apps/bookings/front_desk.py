@@ -0,0 +1,223 @@
+"""
+Check-in and check-out transitions.
+
+Each transition runs in one transaction and touches every table once,
+however many bookings are processed: the bookings are locked and loaded in a
+single query, the CheckIn/CheckOut rows are bulk inserted, bookings and rooms
+are moved to their new status with one UPDATE each limited to the changed
+columns, and the history rows for all three models are written with one bulk
+insert per model. Processing the whole 11:00 departure list costs the same
+handful of statements as a single guest.
+
+Check-in opens each stay's folio with its room charge; check-out posts the
+restaurant orders still waiting to be charged to the rooms and any additional
+charges to the folio, then closes it.
+
+Both transitions return the resulting room board entries so callers can
+refresh the desk view without re-reading the rooms.
+"""
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+from simple_history.utils import bulk_create_with_history
+
+from apps.billing.folio import close_folios, open_folios
+from apps.billing.room_charges import post_room_charges
+from apps.guests.models import GuestProfileSummary
+from apps.rooms.models import Room
+from .models import Booking, CheckIn, CheckOut
+
+
+RoomBoardEntry = namedtuple(
+    'RoomBoardEntry',
+    'room_id room_number room_type floor status booking_number current_guest next_available_date',
+)
+
+
+class TransitionError(Exception):
+    """Raised when a booking is not in a state that allows the transition"""
+
+
+def check_in_bookings(booking_ids, user, actual_rooms=None, **details):
+    """Check in several bookings at once.
+
+    ``actual_rooms`` optionally maps booking id to the Room the guest really
+    gets; ``details`` are passed to every CheckIn. Returns one RoomBoardEntry
+    per booking.
+    """
+    booking_ids = _unique_ids(booking_ids)
+    actual_rooms = actual_rooms or {}
+    now = timezone.now()
+
+    with transaction.atomic():
+        bookings = _lock(
+            booking_ids,
+            status__in=['pending', 'confirmed'],
+            check_in__isnull=True,
+        )
+        if len(bookings) != len(booking_ids):
+            raise TransitionError('One or more bookings are already checked in or are not pending/confirmed.')
+
+        check_ins, rooms = [], []
+        for booking in bookings:
+            room = actual_rooms.get(booking.pk) or booking.room
+            check_ins.append(CheckIn(
+                booking=booking,
+                checked_in_by=user,
+                actual_room=actual_rooms.get(booking.pk),
+                **details
+            ))
+            booking.status = 'active'
+            room.status = 'occupied'
+            rooms.append(room)
+
+        bulk_create_with_history(
+            check_ins, CheckIn,
+            default_user=user,
+            default_change_reason='Check-in',
+        )
+        _update(Booking, bookings, now, user, 'Check-in', status='active')
+        _update(Room, rooms, now, user, 'Check-in', status='occupied')
+        open_folios(bookings, user)
+
+    return [
+        _board_entry(room, booking.booking_number, booking.guest.full_name, booking.check_out_date)
+        for booking, room in zip(bookings, rooms)
+    ]
+
+
+def check_out_bookings(booking_ids, user, additional_charges=None, **details):
+    """Check out several bookings at once.
+
+    ``additional_charges`` optionally maps booking id to an extra amount for
+    that stay; ``details`` are passed to every CheckOut. Returns one
+    RoomBoardEntry per booking.
+    """
+    booking_ids = _unique_ids(booking_ids)
+    additional_charges = additional_charges or {}
+    now = timezone.now()
+
+    with transaction.atomic():
+        bookings = _lock(
+            booking_ids,
+            check_in__isnull=False,
+            check_out__isnull=True,
+        )
+        if len(bookings) != len(booking_ids):
+            raise TransitionError('One or more bookings are not checked in or are already checked out.')
+
+        check_outs, rooms = [], []
+        for booking in bookings:
+            room = booking.check_in.actual_room or booking.room
+            check_outs.append(CheckOut(
+                booking=booking,
+                checked_out_by=user,
+                additional_charges=additional_charges.get(booking.pk, Decimal('0.00')),
+                **details
+            ))
+            booking.status = 'completed'
+            room.status = 'cleaning'
+            rooms.append(room)
+
+        bulk_create_with_history(
+            check_outs, CheckOut,
+            default_user=user,
+            default_change_reason='Check-out',
+        )
+        # Restaurant charges waiting for these rooms go to the folios while the stays are still active,
+        # which is how folios_for_rooms finds them
+        post_room_charges(user=user, room_ids=[room.pk for room in rooms])
+        _update(Booking, bookings, now, user, 'Check-out', status='completed')
+        _update(Room, rooms, now, user, 'Check-out', status='cleaning')
+        close_folios(bookings, user, additional_charges)
+        refresh_guest_summaries({booking.guest_id for booking in bookings})
+
+    return [_board_entry(room) for room in rooms]
+
+
+def check_in_booking(booking, user, actual_room=None, **details):
+    """Check in one booking and return its RoomBoardEntry"""
+    actual_rooms = {booking.pk: actual_room} if actual_room else None
+    return check_in_bookings([booking.pk], user, actual_rooms=actual_rooms, **details)[0]
+
+
+def check_out_booking(booking, user, additional_charges=Decimal('0.00'), **details):
+    """Check out one booking and return its RoomBoardEntry"""
+    return check_out_bookings([booking.pk], user, {booking.pk: additional_charges}, **details)[0]
+
+
+def _unique_ids(booking_ids):
+    return list(dict.fromkeys(int(pk) for pk in booking_ids))
+
+
+def _lock(booking_ids, **filters):
+    """Lock and load the bookings with everything a transition reads"""
+    return list(
+        Booking.objects
+        .select_for_update(of=('self',))
+        .select_related('guest', 'room', 'room__room_type', 'check_in__actual_room__room_type')
+        .filter(pk__in=booking_ids, **filters)
+        .order_by('pk')
+    )
+
+
+def _update(model, objs, now, user, reason, **changes):
+    """One UPDATE of the changed columns and one bulk history insert for objs"""
+    for obj in objs:
+        obj.updated_at = now
+    model.objects.filter(pk__in=[obj.pk for obj in objs]).update(updated_at=now, **changes)
+    model.history.bulk_history_create(
+        objs,
+        update=True,
+        default_user=user,
+        default_change_reason=reason,
+        default_date=now,
+    )
+
+
+def refresh_guest_summaries(guest_ids):
+    """Recompute GuestProfileSummary counters for the guests from one bookings query.
+
+    Used by bulk paths, which bypass the post_save signal that normally keeps
+    the summaries current.
+    """
+    totals = defaultdict(lambda: {'total': 0, 'completed': 0, 'nights': 0, 'spent': Decimal('0.00')})
+    for guest_id, status, amount, check_in, check_out in (
+        Booking.objects
+        .filter(guest_id__in=guest_ids)
+        .values_list('guest_id', 'status', 'total_amount', 'check_in_date', 'check_out_date')
+    ):
+        row = totals[guest_id]
+        row['total'] += 1
+        row['nights'] += max(0, (check_out - check_in).days)
+        if status == 'completed':
+            row['completed'] += 1
+            row['spent'] += amount
+
+    now = timezone.now()
+    summaries = list(GuestProfileSummary.objects.filter(guest_id__in=guest_ids))
+    for summary in summaries:
+        row = totals[summary.guest_id]
+        summary.total_bookings = row['total']
+        summary.completed_bookings = row['completed']
+        summary.total_nights = row['nights']
+        summary.total_spent = row['spent']
+        summary.updated_at = now
+    GuestProfileSummary.objects.bulk_update(
+        summaries, ['total_bookings', 'completed_bookings', 'total_nights', 'total_spent', 'updated_at']
+    )
+
+
+def _board_entry(room, booking_number=None, current_guest=None, next_available_date=None):
+    return RoomBoardEntry(
+        room_id=room.pk,
+        room_number=room.room_number,
+        room_type=room.room_type.name,
+        floor=room.floor,
+        status=room.status,
+        booking_number=booking_number,
+        current_guest=current_guest,
+        next_available_date=next_available_date,
+    )
@@ -0,0 +1,324 @@
+"""
+Group (block) bookings.
+
+A group reserves many rooms for the same dates in one step. Availability for
+every requested room type is computed with a single query, prices come from
+one rate calendar and the bookings are inserted with one bulk insert plus one
+bulk history insert. Until a rooming list is uploaded every room is held in
+the lead guest's name; the rooming list then swaps in the real occupants.
+"""
+import csv
+import io
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from simple_history.utils import bulk_create_with_history, bulk_update_with_history
+
+from apps.billing.folio import Posting, post_entries
+from apps.billing.models import Folio
+from apps.guests.models import Guest, GuestProfileSummary
+from apps.rooms.models import Room, RoomType
+from apps.rooms.pricing import RateCalendar
+from .assignment import HOLDING_STATUSES, UNAVAILABLE_ROOM_STATUSES
+from .front_desk import refresh_guest_summaries
+from .models import Booking, BookingPayment, GroupBooking
+
+
+ROOMING_LIST_COLUMNS = ['first_name', 'last_name', 'email', 'phone', 'room_type', 'room_number', 'number_of_guests']
+
+
+class GroupAvailabilityError(Exception):
+    """Raised when not enough rooms are free for a group request"""
+
+
+class RoomingListError(Exception):
+    """Raised when a rooming list cannot be applied; ``errors`` lists the bad rows"""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+def available_rooms_by_type(check_in, check_out, room_type_ids, lock=False):
+    """Rooms free for the whole stay, grouped by room type, in one query"""
+    booked = Booking.objects.filter(
+        status__in=HOLDING_STATUSES,
+        check_in_date__lt=check_out,
+        check_out_date__gt=check_in,
+    ).values('room_id')
+    rooms = (
+        Room.objects
+        .filter(is_active=True, room_type_id__in=room_type_ids)
+        .exclude(status__in=UNAVAILABLE_ROOM_STATUSES)
+        .exclude(pk__in=booked)
+        .select_related('room_type')
+        .order_by('floor', 'room_number')
+    )
+    if lock:
+        rooms = rooms.select_for_update(of=('self',))
+
+    by_type = defaultdict(list)
+    for room in rooms:
+        by_type[room.room_type_id].append(room)
+    return by_type
+
+
+def create_group_booking(name, lead_guest, check_in, check_out, room_counts, user=None, **fields):
+    """Reserve rooms for a group.
+
+    ``room_counts`` maps room type id to the number of rooms wanted. Rooms of
+    a type are taken floor by floor so the group stays together. Raises
+    GroupAvailabilityError without writing anything if any type is short.
+    """
+    room_counts = {int(type_id): int(count) for type_id, count in room_counts.items() if int(count) > 0}
+    if not room_counts:
+        raise GroupAvailabilityError('Request at least one room.')
+    if check_out <= check_in:
+        raise GroupAvailabilityError('Check-out date must be after check-in date.')
+
+    with transaction.atomic():
+        free = available_rooms_by_type(check_in, check_out, list(room_counts), lock=True)
+        shortages = []
+        for room_type in RoomType.objects.filter(pk__in=room_counts):
+            wanted, found = room_counts[room_type.pk], len(free[room_type.pk])
+            if found < wanted:
+                shortages.append(f'{room_type.name}: {found} free, {wanted} requested')
+        if shortages:
+            raise GroupAvailabilityError('Not enough rooms available. ' + '; '.join(shortages))
+
+        group = GroupBooking.objects.create(
+            name=name,
+            lead_guest=lead_guest,
+            check_in_date=check_in,
+            check_out_date=check_out,
+            created_by=user,
+            **fields
+        )
+
+        rooms = [room for type_id, count in room_counts.items() for room in free[type_id][:count]]
+        calendar = RateCalendar(check_in, check_out, room_types=[room.room_type for room in rooms])
+        totals = calendar.quote_rooms(rooms, check_in, check_out)
+        nights = (check_out - check_in).days
+        status = 'confirmed' if group.status == 'confirmed' else 'pending'
+
+        bookings = [
+            Booking(
+                guest=lead_guest,
+                room=room,
+                group=group,
+                check_in_date=check_in,
+                check_out_date=check_out,
+                room_rate=(totals[room.pk] / nights).quantize(Decimal('0.01')),
+                total_amount=totals[room.pk],
+                balance_amount=totals[room.pk],
+                status=status,
+                source='travel_agent' if group.organizer else 'direct',
+            )
+            for room in rooms
+        ]
+        bulk_create_with_history(
+            bookings, Booking,
+            default_user=user,
+            default_change_reason=f'Group booking {group.group_number}',
+        )
+        refresh_guest_summaries({lead_guest.pk})
+    return group
+
+
+def apply_rooming_list(group, csv_file, user=None):
+    """Assign the occupants listed in a CSV file to the group's rooms.
+
+    Rows are matched to rooms by ``room_number`` when given, otherwise to the
+    next room of ``room_type`` (or any room) still held by the lead guest.
+    Guests are matched by email; unknown guests are created. Every row is
+    validated before anything is written. Returns the number of rooms updated.
+    """
+    try:
+        text = csv_file.read().decode('utf-8-sig') if hasattr(csv_file, 'read') else csv_file
+    except UnicodeDecodeError:
+        raise RoomingListError(['The file must be a UTF-8 encoded CSV.'])
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or not {'first_name', 'last_name'} <= {f.strip() for f in reader.fieldnames}:
+        raise RoomingListError(['The CSV needs at least first_name and last_name columns.'])
+    rows = [{key.strip(): (value or '').strip() for key, value in row.items() if key} for row in reader]
+
+    with transaction.atomic():
+        bookings = list(
+            group.bookings
+            .select_for_update(of=('self',))
+            .exclude(status__in=['cancelled', 'completed', 'no_show'])
+            .select_related('room', 'room__room_type')
+            .order_by('room__floor', 'room__room_number')
+        )
+        by_number = {booking.room.room_number: booking for booking in bookings}
+        open_bookings = [booking for booking in bookings if booking.guest_id == group.lead_guest_id]
+
+        emails = {row['email'].lower() for row in rows if row.get('email')}
+        guests_by_email = {
+            guest.email.lower(): guest
+            # Lower() on both sides: a plain email__in is case-sensitive on PostgreSQL
+            for guest in Guest.objects.annotate(email_lower=Lower('email')).filter(email_lower__in=emails)
+        } if emails else {}
+
+        errors, matches, new_guests, taken = [], [], {}, set()
+        for line, row in enumerate(rows, start=2):
+            if not row.get('first_name') or not row.get('last_name'):
+                errors.append(f'Line {line}: first_name and last_name are required.')
+                continue
+
+            booking = _match_booking(row, by_number, open_bookings)
+            if booking is None or booking.pk in taken:
+                errors.append(f'Line {line}: no matching room left in this group.')
+                continue
+            taken.add(booking.pk)
+
+            try:
+                number_of_guests = int(row.get('number_of_guests') or 1)
+            except ValueError:
+                errors.append(f'Line {line}: number_of_guests must be a whole number.')
+                continue
+            if number_of_guests > booking.room.room_type.capacity:
+                errors.append(f'Line {line}: room {booking.room.room_number} holds {booking.room.room_type.capacity} guests.')
+                continue
+
+            email = row.get('email', '').lower()
+            guest = (guests_by_email.get(email) or new_guests.get(email)) if email else None
+            if guest is None:
+                guest = Guest(
+                    first_name=row['first_name'],
+                    last_name=row['last_name'],
+                    email=email or None,
+                    phone=row.get('phone') or group.lead_guest.phone,
+                    company=group.organizer,
+                    guest_source=group.organizer or group.name,
+                )
+                if email:
+                    new_guests[email] = guest
+                else:
+                    new_guests[f'__line{line}'] = guest
+            matches.append((booking, guest, number_of_guests, f"{row['first_name']} {row['last_name']}"))
+
+        if errors:
+            raise RoomingListError(errors)
+
+        created = bulk_create_with_history(
+            list(new_guests.values()), Guest,
+            default_user=user,
+            default_change_reason=f'Rooming list for {group.group_number}',
+        )
+        GuestProfileSummary.objects.bulk_create([
+            GuestProfileSummary(guest=guest, country=guest.country or '', city=guest.city or '', nationality=guest.nationality or '')
+            for guest in created
+        ])
+
+        now = timezone.now()
+        previous_guests = {booking.guest_id for booking, *_ in matches}
+        for booking, guest, number_of_guests, names in matches:
+            booking.guest = guest
+            booking.number_of_guests = number_of_guests
+            booking.guest_names = names
+            booking.updated_at = now
+        bulk_update_with_history(
+            [booking for booking, *_ in matches], Booking,
+            ['guest', 'number_of_guests', 'guest_names', 'updated_at'],
+            default_user=user,
+            default_change_reason=f'Rooming list for {group.group_number}',
+        )
+        refresh_guest_summaries(previous_guests | {guest.pk for _, guest, *_ in matches})
+    return len(matches)
+
+
+def _match_booking(row, by_number, open_bookings):
+    """Pick the booking a rooming list row goes into and take it off the open list"""
+    room_number = row.get('room_number')
+    if room_number:
+        booking = by_number.get(room_number)
+        if booking in open_bookings:
+            open_bookings.remove(booking)
+        return booking
+
+    room_type = row.get('room_type', '').lower()
+    for booking in open_bookings:
+        if not room_type or booking.room.room_type.name.lower() == room_type:
+            open_bookings.remove(booking)
+            return booking
+    return None
+
+
+def payable_balance(group):
+    """What a group payment can still be spread over: the unpaid balances of its live bookings.
+
+    The bookings stay locked until the caller's transaction ends, so a payment
+    checked against this amount is allocated in full.
+    """
+    balances = (
+        group.bookings
+        .select_for_update()
+        .exclude(status='cancelled')
+        .filter(balance_amount__gt=0)
+        .values_list('balance_amount', flat=True)
+    )
+    return sum(balances, Decimal('0.00'))
+
+
+def allocate_group_payment(payment):
+    """Spread a completed group payment over the group's unpaid bookings, earliest first.
+
+    The bookings are locked, then one completed BookingPayment per booking it
+    reaches is bulk inserted and their running balances are written with one
+    bulk update; shares for checked-in rooms are posted to their folios in
+    one batch. Returns the amount left over once every booking is paid.
+    """
+    group = payment.group
+    bookings = list(
+        group.bookings
+        .select_for_update()
+        .exclude(status='cancelled')
+        .filter(balance_amount__gt=0)
+        .order_by('check_in_date', 'room__room_number', 'pk')
+    )
+
+    now = timezone.now()
+    remaining = payment.amount
+    booking_payments, updated = [], []
+    for booking in bookings:
+        if remaining <= 0:
+            break
+        share = min(booking.balance_amount, remaining)
+        remaining -= share
+        booking_payments.append(BookingPayment(
+            booking=booking,
+            amount=share,
+            payment_method=payment.payment_method,
+            reference_number=payment.reference_number or group.group_number,
+            status='completed',
+            processed_by=payment.processed_by,
+            notes=f'Share of group payment for {group.group_number}',
+        ))
+        booking.paid_amount += share
+        booking.balance_amount -= share
+        booking.payment_status = 'paid' if booking.balance_amount <= 0 else 'partial'
+        booking.last_payment_at = now
+        booking.updated_at = now
+        updated.append(booking)
+
+    reason = f'Group payment {group.group_number}'
+    bulk_create_with_history(booking_payments, BookingPayment, default_user=payment.processed_by, default_change_reason=reason)
+    bulk_update_with_history(
+        updated, Booking,
+        ['paid_amount', 'balance_amount', 'payment_status', 'last_payment_at', 'updated_at'],
+        default_user=payment.processed_by,
+        default_change_reason=reason,
+    )
+
+    folio_ids = dict(Folio.objects.filter(booking__in=updated).values_list('booking_id', 'pk'))
+    post_entries([
+        Posting(folio_ids[booking_payment.booking_id], 'payment', 'billing', booking_payment.amount,
+                f'Share of group payment {group.group_number}', None, payment.reference_number or group.group_number)
+        for booking_payment in booking_payments
+        if booking_payment.booking_id in folio_ids
+    ], payment.processed_by)
+    return remaining
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.bookings.assignment import plan_assignments, apply_assignments, AssignmentConflict
+
+
+class Command(BaseCommand):
+    help = "Plan (and optionally apply) optimized room assignments for upcoming arrivals"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            help="First arrival date (YYYY-MM-DD); defaults to tomorrow",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=1,
+            help="Number of arrival days to plan",
+        )
+        parser.add_argument(
+            "--apply",
+            action="store_true",
+            help="Write the proposed room moves instead of only printing them",
+        )
+
+    def handle(self, *args, **options):
+        if options["date"]:
+            try:
+                start_date = datetime.strptime(options["date"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--date must be in YYYY-MM-DD format")
+        else:
+            start_date = timezone.now().date() + timedelta(days=1)
+        end_date = start_date + timedelta(days=max(1, options["days"]) - 1)
+
+        assignments, unassigned = plan_assignments(start_date, end_date)
+        moves = [a for a in assignments if a.from_room.pk != a.to_room.pk]
+
+        for assignment in moves:
+            self.stdout.write(
+                f"{assignment.booking.booking_number}: room {assignment.from_room.room_number} "
+                f"-> {assignment.to_room.room_number} (cost {assignment.cost})"
+            )
+        for booking in unassigned:
+            self.stdout.write(self.style.WARNING(f"{booking.booking_number}: no suitable room free"))
+
+        if options["apply"] and moves:
+            try:
+                moved = apply_assignments((a.booking.pk, a.to_room.pk) for a in moves)
+            except AssignmentConflict as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f"Moved {moved} booking(s)."))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{len(assignments)} arrival(s) placed, {len(moves)} move(s) proposed, {len(unassigned)} unassigned."
+            ))
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='room_locked',
+            field=models.BooleanField(default=False, help_text='Guest asked for this exact room; automatic assignment will not move it'),
+        ),
+        migrations.AddField(
+            model_name='historicalbooking',
+            name='room_locked',
+            field=models.BooleanField(default=False, help_text='Guest asked for this exact room; automatic assignment will not move it'),
+        ),
+    ]
@@ -0,0 +1,126 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:15
+
+import apps.bookings.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import simple_history.models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guests', '0007_guestprofilesummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bookings', '0003_booking_room_locked_historicalbooking_room_locked'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group_number', models.CharField(default=apps.bookings.models.generate_group_number, max_length=20, unique=True)),
+                ('name', models.CharField(max_length=200)),
+                ('organizer', models.CharField(blank=True, help_text='Tour operator, agency or organising company', max_length=200)),
+                ('check_in_date', models.DateField()),
+                ('check_out_date', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled')], default='pending', max_length=20)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='group_bookings_created', to=settings.AUTH_USER_MODEL)),
+                ('lead_guest', models.ForeignKey(help_text='Contact person; holds every room until the rooming list is uploaded', on_delete=django.db.models.deletion.CASCADE, related_name='group_bookings', to='guests.guest')),
+            ],
+            options={
+                'verbose_name': 'Group Booking',
+                'verbose_name_plural': 'Group Bookings',
+                'ordering': ['-check_in_date', '-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='HistoricalGroupPayment',
+            fields=[
+                ('id', models.BigIntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('payment_method', models.CharField(choices=[('cash', 'Cash'), ('credit_card', 'Credit Card'), ('debit_card', 'Debit Card'), ('bank_transfer', 'Bank Transfer'), ('online', 'Online Payment'), ('check', 'Check'), ('other', 'Other')], max_length=20)),
+                ('payment_date', models.DateTimeField(blank=True, editable=False)),
+                ('reference_number', models.CharField(blank=True, max_length=100)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed'), ('refunded', 'Refunded')], default='pending', max_length=20)),
+                ('notes', models.TextField(blank=True)),
+                ('history_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField(db_index=True)),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('group', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='bookings.groupbooking')),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('processed_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'historical Group Payment',
+                'verbose_name_plural': 'historical Group Payments',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': ('history_date', 'history_id'),
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.CreateModel(
+            name='HistoricalGroupBooking',
+            fields=[
+                ('id', models.BigIntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('group_number', models.CharField(db_index=True, default=apps.bookings.models.generate_group_number, max_length=20)),
+                ('name', models.CharField(max_length=200)),
+                ('organizer', models.CharField(blank=True, help_text='Tour operator, agency or organising company', max_length=200)),
+                ('check_in_date', models.DateField()),
+                ('check_out_date', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled')], default='pending', max_length=20)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(blank=True, editable=False)),
+                ('updated_at', models.DateTimeField(blank=True, editable=False)),
+                ('history_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField(db_index=True)),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('created_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('lead_guest', models.ForeignKey(blank=True, db_constraint=False, help_text='Contact person; holds every room until the rooming list is uploaded', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='guests.guest')),
+            ],
+            options={
+                'verbose_name': 'historical Group Booking',
+                'verbose_name_plural': 'historical Group Bookings',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': ('history_date', 'history_id'),
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.CreateModel(
+            name='GroupPayment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('payment_method', models.CharField(choices=[('cash', 'Cash'), ('credit_card', 'Credit Card'), ('debit_card', 'Debit Card'), ('bank_transfer', 'Bank Transfer'), ('online', 'Online Payment'), ('check', 'Check'), ('other', 'Other')], max_length=20)),
+                ('payment_date', models.DateTimeField(auto_now_add=True)),
+                ('reference_number', models.CharField(blank=True, max_length=100)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed'), ('refunded', 'Refunded')], default='pending', max_length=20)),
+                ('notes', models.TextField(blank=True)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='bookings.groupbooking')),
+                ('processed_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='group_payments_processed', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Group Payment',
+                'verbose_name_plural': 'Group Payments',
+                'ordering': ['-payment_date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='group',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to='bookings.groupbooking'),
+        ),
+        migrations.AddField(
+            model_name='historicalbooking',
+            name='group',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='bookings.groupbooking'),
+        ),
+    ]
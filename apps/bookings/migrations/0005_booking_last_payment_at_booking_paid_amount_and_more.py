@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:18
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_running_balances(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    BookingPayment = apps.get_model('bookings', 'BookingPayment')
+    completed = BookingPayment.objects.filter(booking=OuterRef('pk'), status='completed').order_by().values('booking')
+    Booking.objects.update(
+        paid_amount=Coalesce(
+            Subquery(completed.annotate(total=Sum('amount')).values('total')),
+            Value(Decimal('0.00')),
+            output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        ),
+        last_payment_at=Subquery(completed.annotate(last=Max('payment_date')).values('last')),
+    )
+    Booking.objects.update(balance_amount=F('total_amount') - F('paid_amount'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_groupbooking_historicalgrouppayment_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='last_payment_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='paid_amount',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Sum of completed payments, maintained by record_payment', max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='historicalbooking',
+            name='last_payment_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalbooking',
+            name='paid_amount',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Sum of completed payments, maintained by record_payment', max_digits=10),
+        ),
+        migrations.RunPython(backfill_running_balances, migrations.RunPython.noop),
+    ]
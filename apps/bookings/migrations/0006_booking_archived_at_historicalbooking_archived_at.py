@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_booking_last_payment_at_booking_paid_amount_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Set by the archiver once the stay is over and fully settled', null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalbooking',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Set by the archiver once the stay is over and fully settled', null=True),
+        ),
+    ]
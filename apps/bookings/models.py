@@ -1,13 +1,21 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
 from simple_history.models import HistoricalRecords
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
-import uuid
 
 
 def generate_booking_number():
     """Generate a unique booking number"""
-    return f"BK{uuid.uuid4().hex[:8].upper()}"
+    from apps.billing.numbering import next_number
+    return next_number('BK')
+
+
+def generate_group_number():
+    """Generate a unique group booking number"""
+    from apps.billing.numbering import next_number
+    return next_number('GRP')
 
 
 class Booking(models.Model):
@@ -32,6 +40,7 @@ class Booking(models.Model):
     booking_number = models.CharField(max_length=20, unique=True, default=generate_booking_number)
     guest = models.ForeignKey('guests.Guest', on_delete=models.CASCADE, related_name='bookings')
     room = models.ForeignKey('rooms.Room', on_delete=models.CASCADE, related_name='bookings')
+    group = models.ForeignKey('GroupBooking', on_delete=models.SET_NULL, null=True, blank=True, related_name='bookings')
     
     # Dates and Duration
     check_in_date = models.DateField()
@@ -47,7 +56,9 @@ class Booking(models.Model):
     room_rate = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     deposit_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    paid_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Sum of completed payments, maintained by record_payment")
     balance_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    last_payment_at = models.DateTimeField(null=True, blank=True)
     
     # Status and Tracking
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -57,6 +68,7 @@ class Booking(models.Model):
     special_requests = models.TextField(blank=True)
     dietary_restrictions = models.TextField(blank=True)
     room_preferences = models.TextField(blank=True)
+    room_locked = models.BooleanField(default=False, help_text="Guest asked for this exact room; automatic assignment will not move it")
     
     # Booking Details
     source = models.CharField(max_length=50, choices=[
@@ -73,6 +85,8 @@ class Booking(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     confirmed_at = models.DateTimeField(null=True, blank=True)
     cancelled_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(null=True, blank=True, db_index=True,
+                                       help_text="Set by the archiver once the stay is over and fully settled")
     history = HistoricalRecords()
 
     class Meta:
@@ -108,13 +122,18 @@ class Booking(models.Model):
 
     @property
     def remaining_balance(self):
-        """Calculate remaining balance"""
-        return self.total_amount - self.deposit_amount
+        """Amount still owed after completed payments"""
+        return self.balance_amount
 
     def calculate_total_amount(self):
         """Calculate total amount based on duration and rate"""
-        self.total_amount = self.room_rate * self.duration
-        self.balance_amount = self.total_amount - self.deposit_amount
+        if self.room_rate:
+            self.total_amount = self.room_rate * self.duration
+        else:
+            # No negotiated rate: price each night from the rate calendar
+            from apps.rooms.pricing import quote_stay
+            self.total_amount = quote_stay(self.room, self.check_in_date, self.check_out_date)
+        self.balance_amount = self.total_amount - self.paid_amount
         return self.total_amount
 
     def check_availability(self):
@@ -147,8 +166,39 @@ class Booking(models.Model):
         """Override save to calculate amounts"""
         if not self.total_amount:
             self.calculate_total_amount()
+        self.balance_amount = self.total_amount - self.paid_amount
         super().save(*args, **kwargs)
 
+    def record_payment(self, amount, user=None):
+        """Add a completed payment to the running totals with one UPDATE.
+
+        Call inside the transaction that stores the payment row. The new
+        totals are computed by the database from the current row, so
+        concurrent payments cannot overwrite each other. The payment is also
+        posted to the stay's folio once the guest has checked in.
+        """
+        now = timezone.now()
+        paid = F('paid_amount') + amount
+        Booking.objects.filter(pk=self.pk).update(
+            paid_amount=paid,
+            balance_amount=F('total_amount') - paid,
+            payment_status=Case(
+                When(total_amount__lte=paid, then=Value('paid')),
+                When(paid_amount__lte=-amount, then=Value('pending')),
+                default=Value('partial'),
+            ),
+            last_payment_at=now,
+            updated_at=now,
+        )
+        self.refresh_from_db(fields=['paid_amount', 'balance_amount', 'payment_status', 'last_payment_at', 'updated_at'])
+        Booking.history.bulk_history_create(
+            [self], update=True, default_user=user,
+            default_change_reason='Payment received', default_date=now,
+        )
+
+        from apps.billing.folio import record_booking_payment
+        record_booking_payment(self, amount, user=user, reference=self.booking_number)
+
 
 class CheckIn(models.Model):
     """Check-in process and details"""
@@ -269,6 +319,8 @@ class BookingPayment(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     processed_by = models.ForeignKey('users.User', on_delete=models.SET_NULL, null=True, related_name='payments_processed')
     notes = models.TextField(blank=True)
+    reconciled_at = models.DateTimeField(null=True, blank=True, db_index=True,
+                                         help_text="Set when the payment is matched to a bank or card statement line")
     history = HistoricalRecords()
 
     class Meta:
@@ -282,19 +334,94 @@ class BookingPayment(models.Model):
     def process_payment(self):
         """Process the payment"""
         if self.status == 'pending':
-            self.status = 'completed'
-            self.save()
-            
-            # Update booking payment status
-            total_paid = self.booking.payments.filter(status='completed').aggregate(
-                total=models.Sum('amount')
-            )['total'] or 0
-            
-            if total_paid >= self.booking.total_amount:
-                self.booking.payment_status = 'paid'
-            else:
-                self.booking.payment_status = 'partial'
-            
-            self.booking.save()
+            with transaction.atomic():
+                self.status = 'completed'
+                self.save()
+                
+                # Update the booking's running balance
+                self.booking.record_payment(self.amount, user=self.processed_by)
             return True
         return False
+
+
+class GroupBooking(models.Model):
+    """Block of rooms booked together for a tour group, wedding or event"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('confirmed', 'Confirmed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    group_number = models.CharField(max_length=20, unique=True, default=generate_group_number)
+    name = models.CharField(max_length=200)
+    organizer = models.CharField(max_length=200, blank=True, help_text="Tour operator, agency or organising company")
+    lead_guest = models.ForeignKey('guests.Guest', on_delete=models.CASCADE, related_name='group_bookings',
+                                   help_text="Contact person; holds every room until the rooming list is uploaded")
+    check_in_date = models.DateField()
+    check_out_date = models.DateField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    notes = models.TextField(blank=True)
+    created_by = models.ForeignKey('users.User', on_delete=models.SET_NULL, null=True, related_name='group_bookings_created')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    history = HistoricalRecords()
+
+    class Meta:
+        verbose_name = 'Group Booking'
+        verbose_name_plural = 'Group Bookings'
+        ordering = ['-check_in_date', '-created_at']
+
+    def __str__(self):
+        return f"Group {self.group_number} - {self.name}"
+
+    @property
+    def total_amount(self):
+        """Total of all non-cancelled bookings in the group"""
+        return self.bookings.exclude(status='cancelled').aggregate(
+            total=models.Sum('total_amount')
+        )['total'] or Decimal('0.00')
+
+    @property
+    def paid_amount(self):
+        """Total paid across the group's bookings, from their running balances"""
+        return self.bookings.exclude(status='cancelled').aggregate(
+            total=models.Sum('paid_amount')
+        )['total'] or Decimal('0.00')
+
+    @property
+    def balance_amount(self):
+        return self.bookings.exclude(status='cancelled').aggregate(
+            total=models.Sum('balance_amount')
+        )['total'] or Decimal('0.00')
+
+
+class GroupPayment(models.Model):
+    """Payment made once for a whole group and spread over its bookings"""
+    group = models.ForeignKey(GroupBooking, on_delete=models.CASCADE, related_name='payments')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    payment_method = models.CharField(max_length=20, choices=BookingPayment.PAYMENT_METHOD_CHOICES)
+    payment_date = models.DateTimeField(auto_now_add=True)
+    reference_number = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=20, choices=BookingPayment.STATUS_CHOICES, default='pending')
+    processed_by = models.ForeignKey('users.User', on_delete=models.SET_NULL, null=True, related_name='group_payments_processed')
+    notes = models.TextField(blank=True)
+    history = HistoricalRecords()
+
+    class Meta:
+        verbose_name = 'Group Payment'
+        verbose_name_plural = 'Group Payments'
+        ordering = ['-payment_date']
+
+    def __str__(self):
+        return f"Payment {self.reference_number} - {self.group.name}"
+
+    def process_payment(self):
+        """Complete the payment and allocate it to the group's unpaid bookings"""
+        if self.status != 'pending':
+            return False
+        from .groups import allocate_group_payment
+        with transaction.atomic():
+            self.status = 'completed'
+            self.save()
+            allocate_group_payment(self)
+        return True
@@ -5,6 +5,13 @@ urlpatterns = [
     path('', views.booking_list, name='booking_list'),
     path('create/', views.booking_create, name='booking_create'),
     path('availability/', views.availability_check, name='availability_check'),
+    path('room-assignment/', views.room_assignment, name='room_assignment'),
+    path('check-out/batch/', views.check_out_batch, name='check_out_batch'),
+    path('groups/', views.group_list, name='group_list'),
+    path('groups/create/', views.group_create, name='group_create'),
+    path('groups/<int:pk>/', views.group_detail, name='group_detail'),
+    path('groups/<int:pk>/rooming-list/', views.group_rooming_list, name='group_rooming_list'),
+    path('groups/<int:pk>/payment/', views.group_payment_create, name='group_payment_create'),
     path('<int:pk>/', views.booking_detail, name='booking_detail'),
     path('<int:pk>/edit/', views.booking_edit, name='booking_edit'),
     path('<int:pk>/delete/', views.booking_delete, name='booking_delete'),
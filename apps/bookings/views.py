@@ -3,12 +3,18 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from apps.users.decorators import receptionist_required
 from django.http import JsonResponse
-from django.db.models import Q, Sum
+from django.db import transaction
+from django.db.models import Q, Sum, Count, ProtectedError
 from django.utils import timezone
 from datetime import datetime, timedelta
-from .models import Booking, CheckIn, CheckOut, BookingPayment
+from .models import Booking, CheckIn, CheckOut, BookingPayment, GroupBooking, GroupPayment
+from .assignment import plan_assignments, apply_assignments, AssignmentConflict
+from .front_desk import check_in_booking, check_out_booking, check_out_bookings, TransitionError
+from .groups import create_group_booking, apply_rooming_list, payable_balance, GroupAvailabilityError, RoomingListError, ROOMING_LIST_COLUMNS
+from apps.billing.models import Folio
 from apps.guests.models import Guest
 from apps.rooms.models import Room, RoomType
+from apps.rooms.pricing import RateCalendar
 from decimal import Decimal
 
 
@@ -19,9 +25,12 @@ def booking_list(request):
     status_filter = request.GET.get('status', '')
     date_filter = request.GET.get('date_filter', '')
     guest_search = request.GET.get('guest_search', '')
+    archived = request.GET.get('archived', '')
     
-    # Base queryset
-    bookings = Booking.objects.select_related('guest', 'room', 'room__room_type')
+    # Base queryset; settled bookings are archived and listed separately
+    bookings = Booking.objects.select_related('guest', 'room', 'room__room_type').filter(
+        archived_at__isnull=(archived != '1')
+    )
     
     # Apply filters
     if status_filter:
@@ -65,6 +74,7 @@ def booking_list(request):
         'status_filter': status_filter,
         'date_filter': date_filter,
         'guest_search': guest_search,
+        'archived': archived,
         'stats': {
             'total': total_bookings,
             'active': active_bookings,
@@ -171,19 +181,22 @@ def booking_detail(request, pk):
     except CheckOut.DoesNotExist:
         check_out = None
     
-    # Get payment information
+    # Get payment information; totals come from the booking's running balance
     payments = booking.payments.all().order_by('-payment_date')
-    total_paid = payments.filter(status='completed').aggregate(
-        total=Sum('amount')
-    )['total'] or 0
+    
+    # Guest folio for the stay, with its entries in posting order
+    folio = Folio.objects.filter(booking=booking).first()
+    folio_entries = folio.entries.select_related('posted_by') if folio else []
     
     context = {
         'booking': booking,
         'check_in': check_in,
         'check_out': check_out,
         'payments': payments,
-        'total_paid': total_paid,
-        'remaining_balance': booking.total_amount - total_paid,
+        'folio': folio,
+        'folio_entries': folio_entries,
+        'total_paid': booking.paid_amount,
+        'remaining_balance': booking.balance_amount,
     }
     return render(request, 'bookings/booking_detail.html', context)
 
@@ -286,7 +299,11 @@ def booking_delete(request, pk):
     
     if request.method == 'POST':
         booking_number = booking.booking_number
-        booking.delete()
+        try:
+            booking.delete()
+        except ProtectedError:
+            messages.error(request, f'Booking {booking_number} has a guest folio with posted entries and cannot be deleted.')
+            return redirect('booking_detail', pk=booking.pk)
         messages.success(request, f'Booking {booking_number} deleted successfully.')
         return redirect('booking_list')
     
@@ -296,7 +313,7 @@ def booking_delete(request, pk):
 @receptionist_required
 def check_in_create(request, pk):
     """Create check-in for a booking - simplified one-click process"""
-    booking = get_object_or_404(Booking, pk=pk)
+    booking = get_object_or_404(Booking.objects.select_related('guest', 'check_in', 'check_out'), pk=pk)
     
     # Check if already checked in
     if hasattr(booking, 'check_in'):
@@ -308,20 +325,20 @@ def check_in_create(request, pk):
         messages.error(request, 'Booking must be confirmed or pending to check in.')
         return redirect('booking_detail', pk=booking.pk)
     
-    # Create check-in with default values (simplified process)
-    check_in = CheckIn.objects.create(
-        booking=booking,
-        checked_in_by=request.user,
-        id_verified=True,  # Assume verified for simplified process
-        payment_verified=True,  # Assume verified for simplified process
-        room_inspected=True,  # Assume inspected for simplified process
-        room_key_issued=True,  # Assume issued for simplified process
-        special_instructions='',
-        notes='Check-in completed via simplified process',
-    )
-    
-    # Complete check-in
-    check_in.complete_check_in()
+    # Check in with default values (simplified process)
+    try:
+        check_in_booking(
+            booking,
+            request.user,
+            id_verified=True,  # Assume verified for simplified process
+            payment_verified=True,  # Assume verified for simplified process
+            room_inspected=True,  # Assume inspected for simplified process
+            room_key_issued=True,  # Assume issued for simplified process
+            notes='Check-in completed via simplified process',
+        )
+    except TransitionError as e:
+        messages.error(request, str(e))
+        return redirect('booking_detail', pk=booking.pk)
     
     messages.success(request, f'Check-in completed for {booking.guest.full_name}. Guest is now checked in.')
     return redirect('booking_detail', pk=booking.pk)
@@ -330,7 +347,7 @@ def check_in_create(request, pk):
 @receptionist_required
 def check_out_create(request, pk):
     """Create check-out for a booking - simplified one-click process"""
-    booking = get_object_or_404(Booking, pk=pk)
+    booking = get_object_or_404(Booking.objects.select_related('guest', 'check_in', 'check_out'), pk=pk)
     
     # Check if already checked out
     if hasattr(booking, 'check_out'):
@@ -342,28 +359,57 @@ def check_out_create(request, pk):
         messages.error(request, 'Guest must be checked in before check-out.')
         return redirect('booking_detail', pk=booking.pk)
     
-    # Create check-out with default values (simplified process)
-    check_out = CheckOut.objects.create(
-        booking=booking,
-        checked_out_by=request.user,
-        room_inspected=True,  # Assume inspected for simplified process
-        keys_returned=True,  # Assume returned for simplified process
-        payment_completed=True,  # Assume completed for simplified process
-        additional_charges=Decimal('0.00'),  # No additional charges by default
-        late_checkout=False,
-        late_checkout_hours=0,
-        guest_satisfaction=None,  # Optional
-        feedback='',
-        notes='Check-out completed via simplified process',
-    )
-    
-    # Complete check-out
-    final_amount = check_out.complete_check_out()
+    # Check out with default values (simplified process)
+    additional_charges = Decimal('0.00')  # No additional charges by default
+    try:
+        check_out_booking(
+            booking,
+            request.user,
+            additional_charges,
+            room_inspected=True,  # Assume inspected for simplified process
+            keys_returned=True,  # Assume returned for simplified process
+            payment_completed=True,  # Assume completed for simplified process
+            notes='Check-out completed via simplified process',
+        )
+    except TransitionError as e:
+        messages.error(request, str(e))
+        return redirect('booking_detail', pk=booking.pk)
+    folio = Folio.objects.filter(booking=booking).only('balance').first()
+    final_amount = folio.balance if folio else booking.balance_amount + additional_charges
     
-    messages.success(request, f'Check-out completed for {booking.guest.full_name}. Final amount: ${final_amount}')
+    messages.success(request, f'Check-out completed for {booking.guest.full_name}. Balance due: ${final_amount}')
     return redirect('booking_detail', pk=booking.pk)
 
 
+@receptionist_required
+def check_out_batch(request):
+    """Check out several departures at once (AJAX)"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required.'}, status=405)
+    
+    booking_ids = request.POST.getlist('booking_ids')
+    if not booking_ids:
+        return JsonResponse({'error': 'No bookings selected.'}, status=400)
+    
+    try:
+        entries = check_out_bookings(
+            booking_ids,
+            request.user,
+            room_inspected=True,
+            keys_returned=True,
+            payment_completed=True,
+            notes='Check-out completed via batch departures',
+        )
+    except (TransitionError, ValueError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'checked_out': len(entries),
+        'rooms': [entry._asdict() for entry in entries],
+    })
+
+
 @receptionist_required
 def booking_payment_create(request, pk):
     """Create payment for a booking"""
@@ -407,27 +453,237 @@ def availability_check(request):
         if check_in_date and check_out_date:
             check_in = datetime.strptime(check_in_date, '%Y-%m-%d').date()
             check_out = datetime.strptime(check_out_date, '%Y-%m-%d').date()
+            if check_out <= check_in:
+                return JsonResponse({'error': 'Check-out date must be after check-in date.'}, status=400)
             
-            # Get available rooms
-            available_rooms = []
-            rooms = Room.objects.filter(is_active=True, room_type__capacity__gte=guests)
+            # Get available rooms in one query instead of one availability check per room
+            booked_room_ids = Booking.objects.filter(
+                status__in=['confirmed', 'active'],
+                check_in_date__lt=check_out,
+                check_out_date__gt=check_in
+            ).values_list('room_id', flat=True)
+            rooms = list(
+                Room.objects.filter(is_active=True, room_type__capacity__gte=guests)
+                .exclude(id__in=booked_room_ids)
+                .select_related('room_type')
+            )
             
-            for room in rooms:
-                if check_room_availability(room, check_in, check_out):
-                    available_rooms.append({
-                        'id': room.id,
-                        'room_number': room.room_number,
-                        'room_type': room.room_type.name,
-                        'capacity': room.room_type.capacity,
-                        'price': float(room.effective_price),
-                        'floor': room.get_floor_display(),
-                    })
+            # Price all rooms for the stay from a single rate calendar
+            calendar = RateCalendar(check_in, check_out, room_types={room.room_type for room in rooms})
+            totals = calendar.quote_rooms(rooms, check_in, check_out)
+            available_rooms = [
+                {
+                    'id': room.id,
+                    'room_number': room.room_number,
+                    'room_type': room.room_type.name,
+                    'capacity': room.room_type.capacity,
+                    'price': float(round(totals[room.id] / calendar.nights, 2)),
+                    'total_amount': float(totals[room.id]),
+                    'floor': room.get_floor_display(),
+                }
+                for room in rooms
+            ]
             
             return JsonResponse({
                 'available_rooms': available_rooms,
                 'check_in': check_in_date,
                 'check_out': check_out_date,
                 'guests': guests,
+                'nights': calendar.nights,
             })
     
     return render(request, 'bookings/availability_check.html')
+
+
+@receptionist_required
+def room_assignment(request):
+    """Propose and apply optimized room assignments for upcoming arrivals"""
+    tomorrow = timezone.now().date() + timedelta(days=1)
+    try:
+        start_date = datetime.strptime(request.GET.get('start_date', ''), '%Y-%m-%d').date()
+    except ValueError:
+        start_date = tomorrow
+    try:
+        days = max(1, min(int(request.GET.get('days', 1)), 14))
+    except ValueError:
+        days = 1
+    end_date = start_date + timedelta(days=days - 1)
+    
+    if request.method == 'POST':
+        pairs = []
+        for value in request.POST.getlist('assignments'):
+            booking_id, _, room_id = value.partition(':')
+            if booking_id.isdigit() and room_id.isdigit():
+                pairs.append((booking_id, room_id))
+        try:
+            moved = apply_assignments(pairs, user=request.user)
+            messages.success(request, f'{moved} booking(s) moved to their assigned rooms.')
+        except AssignmentConflict as e:
+            messages.error(request, f'Assignments were not applied: {e} Please review the new plan.')
+        return redirect(f"{request.path}?start_date={start_date:%Y-%m-%d}&days={days}")
+    
+    assignments, unassigned = plan_assignments(start_date, end_date)
+    context = {
+        'start_date': start_date,
+        'end_date': end_date,
+        'days': days,
+        'assignments': assignments,
+        'moves': [a for a in assignments if a.from_room.pk != a.to_room.pk],
+        'unassigned': unassigned,
+    }
+    return render(request, 'bookings/room_assignment.html', context)
+
+
+@receptionist_required
+def group_list(request):
+    """List group bookings with room counts and totals"""
+    groups = (
+        GroupBooking.objects
+        .select_related('lead_guest')
+        .annotate(
+            room_count=Count('bookings', filter=~Q(bookings__status='cancelled')),
+            total=Sum('bookings__total_amount', filter=~Q(bookings__status='cancelled')),
+        )
+    )
+    status_filter = request.GET.get('status', '')
+    if status_filter:
+        groups = groups.filter(status=status_filter)
+    
+    return render(request, 'bookings/group_list.html', {
+        'groups': groups,
+        'status_filter': status_filter,
+    })
+
+
+@receptionist_required
+def group_create(request):
+    """Reserve a block of rooms for a group in one step"""
+    room_types = RoomType.objects.filter(is_active=True).order_by('base_price')
+    guests = Guest.objects.filter(is_active=True).order_by('first_name', 'last_name')
+    context = {'room_types': room_types, 'guests': guests, 'form': request.POST}
+    
+    if request.method == 'POST':
+        try:
+            lead_guest = Guest.objects.get(pk=request.POST.get('lead_guest'))
+            check_in = datetime.strptime(request.POST.get('check_in_date', ''), '%Y-%m-%d').date()
+            check_out = datetime.strptime(request.POST.get('check_out_date', ''), '%Y-%m-%d').date()
+            room_counts = {
+                room_type.pk: int(request.POST.get(f'rooms_{room_type.pk}') or 0)
+                for room_type in room_types
+            }
+        except Guest.DoesNotExist:
+            messages.error(request, 'Please select a lead guest.')
+            return render(request, 'bookings/group_form.html', context)
+        except ValueError:
+            messages.error(request, 'Please enter valid dates and room counts.')
+            return render(request, 'bookings/group_form.html', context)
+        
+        if not request.POST.get('name'):
+            messages.error(request, 'Please enter a group name.')
+            return render(request, 'bookings/group_form.html', context)
+        if check_in < timezone.now().date():
+            messages.error(request, 'Check-in date cannot be in the past.')
+            return render(request, 'bookings/group_form.html', context)
+        
+        try:
+            group = create_group_booking(
+                request.POST['name'],
+                lead_guest,
+                check_in,
+                check_out,
+                room_counts,
+                user=request.user,
+                organizer=request.POST.get('organizer', ''),
+                status=request.POST.get('status') if request.POST.get('status') in dict(GroupBooking.STATUS_CHOICES) else 'pending',
+                notes=request.POST.get('notes', ''),
+            )
+        except GroupAvailabilityError as e:
+            messages.error(request, str(e))
+            return render(request, 'bookings/group_form.html', context)
+        
+        messages.success(request, f'Group {group.group_number} created with {sum(room_counts.values())} rooms.')
+        return redirect('group_detail', pk=group.pk)
+    
+    return render(request, 'bookings/group_form.html', context)
+
+
+@receptionist_required
+def group_detail(request, pk):
+    """Group overview with its rooms, rooming list upload and payments"""
+    group = get_object_or_404(GroupBooking.objects.select_related('lead_guest'), pk=pk)
+    bookings = group.bookings.select_related('guest', 'room', 'room__room_type').order_by('room__floor', 'room__room_number')
+    payments = group.payments.select_related('processed_by')
+    totals = bookings.exclude(status='cancelled').aggregate(
+        rooms=Count('pk'),
+        total=Sum('total_amount'),
+        paid=Sum('paid_amount'),
+        balance=Sum('balance_amount'),
+    )
+    
+    return render(request, 'bookings/group_detail.html', {
+        'group': group,
+        'bookings': bookings,
+        'payments': payments,
+        'room_count': totals['rooms'],
+        'total_amount': totals['total'] or Decimal('0.00'),
+        'paid_amount': totals['paid'] or Decimal('0.00'),
+        'balance_amount': totals['balance'] or Decimal('0.00'),
+        'rooming_list_columns': ROOMING_LIST_COLUMNS,
+        'payment_methods': BookingPayment.PAYMENT_METHOD_CHOICES,
+    })
+
+
+@receptionist_required
+def group_rooming_list(request, pk):
+    """Upload a CSV rooming list that names the occupant of each room"""
+    group = get_object_or_404(GroupBooking.objects.select_related('lead_guest'), pk=pk)
+    if request.method == 'POST':
+        csv_file = request.FILES.get('rooming_list')
+        if not csv_file:
+            messages.error(request, 'Please choose a CSV file.')
+            return redirect('group_detail', pk=group.pk)
+        try:
+            updated = apply_rooming_list(group, csv_file, user=request.user)
+        except RoomingListError as e:
+            for error in e.errors[:10]:
+                messages.error(request, error)
+            if len(e.errors) > 10:
+                messages.error(request, f'...and {len(e.errors) - 10} more problems. Nothing was changed.')
+            return redirect('group_detail', pk=group.pk)
+        messages.success(request, f'Rooming list applied to {updated} room(s).')
+    return redirect('group_detail', pk=group.pk)
+
+
+@receptionist_required
+def group_payment_create(request, pk):
+    """Record a payment for the whole group"""
+    group = get_object_or_404(GroupBooking, pk=pk)
+    if request.method == 'POST':
+        amount = request.POST.get('amount')
+        payment_method = request.POST.get('payment_method')
+        try:
+            amount = Decimal(amount)
+        except (TypeError, ArithmeticError):
+            amount = None
+        if (amount is None or not amount.is_finite() or amount <= 0
+                or payment_method not in dict(BookingPayment.PAYMENT_METHOD_CHOICES)):
+            messages.error(request, 'Please enter a positive amount and a payment method.')
+            return redirect('group_detail', pk=group.pk)
+
+        with transaction.atomic():
+            # Anything above the unpaid balances could not be allocated to a booking
+            payable = payable_balance(group)
+            if amount > payable:
+                messages.error(request, f'{group.name} owes ${payable}; a group payment cannot exceed that.')
+                return redirect('group_detail', pk=group.pk)
+            payment = GroupPayment.objects.create(
+                group=group,
+                amount=amount,
+                payment_method=payment_method,
+                reference_number=request.POST.get('reference_number', ''),
+                processed_by=request.user,
+                notes=request.POST.get('notes', ''),
+            )
+            payment.process_payment()
+        messages.success(request, f'Payment of ${payment.amount} recorded for {group.name}.')
+    return redirect('group_detail', pk=group.pk)
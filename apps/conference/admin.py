@@ -1,6 +1,11 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
 from django.utils.html import format_html
-from .models import ConferenceRoom, ConferenceEquipment, ConferenceBooking, ConferenceEvent, ConferencePayment
+from . import equipment, scheduling
+from .models import (
+    ConferenceRoom, ConferenceEquipment, ConferenceBooking, ConferenceEvent, ConferencePayment,
+    EquipmentRequirement, EquipmentReservation,
+)
 
 
 @admin.register(ConferenceRoom)
@@ -55,8 +60,77 @@ class ConferenceEquipmentAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at',)
 
 
+class ConferenceBookingAdminForm(forms.ModelForm):
+    """Refuse bookings that overlap another live booking of the room, setup and cleanup included"""
+
+    class Meta:
+        model = ConferenceBooking
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        room = cleaned_data.get('room')
+        start = cleaned_data.get('start_datetime')
+        end = cleaned_data.get('end_datetime')
+        if room and start and end and cleaned_data.get('status') in scheduling.HOLDING_STATUSES:
+            event = getattr(self.instance, 'event', None)
+            try:
+                scheduling.check_room(
+                    room.pk, start, end,
+                    event.setup_time_required if event else 0,
+                    event.cleanup_time_required if event else 0,
+                    exclude=self.instance.pk,
+                )
+            except scheduling.ScheduleConflict as e:
+                raise forms.ValidationError(f'{room.name} is already booked for this time: {e}')
+        return cleaned_data
+
+
+class ConferenceEventAdminForm(forms.ModelForm):
+    """Refuse setup or cleanup times that would make the booking overlap another one"""
+
+    class Meta:
+        model = ConferenceEvent
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        booking = cleaned_data.get('booking')
+        if booking and booking.status in scheduling.HOLDING_STATUSES:
+            try:
+                scheduling.check_room(
+                    booking.room_id, booking.start_datetime, booking.end_datetime,
+                    cleaned_data.get('setup_time_required') or 0,
+                    cleaned_data.get('cleanup_time_required') or 0,
+                    exclude=booking.pk,
+                )
+            except scheduling.ScheduleConflict as e:
+                raise forms.ValidationError(f'With this setup and cleanup time the room would overlap: {e}')
+        return cleaned_data
+
+
+class EquipmentRequirementInline(admin.TabularInline):
+    model = EquipmentRequirement
+    fields = ('equipment_type', 'quantity')
+    extra = 0
+
+
+class EquipmentReservationInline(admin.TabularInline):
+    """Reservations are made by the allocator; deleting one releases the unit"""
+    model = EquipmentReservation
+    fields = ('equipment', 'reserved_from', 'reserved_until', 'created_by', 'created_at')
+    readonly_fields = fields
+    extra = 0
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(ConferenceBooking)
 class ConferenceBookingAdmin(admin.ModelAdmin):
+    form = ConferenceBookingAdminForm
+    inlines = [EquipmentRequirementInline, EquipmentReservationInline]
+    actions = ['allocate_equipment']
     list_display = ('booking_number', 'room', 'client_name', 'event_title', 'start_datetime', 'status', 'payment_status', 'total_amount')
     list_filter = ('status', 'payment_status', 'start_datetime', 'created_at')
     search_fields = ('booking_number', 'client_name', 'client_email', 'event_title', 'room__name')
@@ -67,10 +141,10 @@ class ConferenceBookingAdmin(admin.ModelAdmin):
             'fields': ('booking_number', 'room', 'client_name', 'client_email', 'client_phone')
         }),
         ('Event Details', {
-            'fields': ('event_title', 'event_description', 'start_datetime', 'end_datetime', 'attendees_count')
+            'fields': ('event_title', 'event_description', 'start_datetime', 'end_datetime', 'blocked_from', 'blocked_until', 'attendees_count')
         }),
         ('Financial Information', {
-            'fields': ('total_amount', 'paid_amount', 'payment_status')
+            'fields': ('total_amount', 'paid_amount', 'balance_amount', 'last_payment_at', 'payment_status')
         }),
         ('Status & Requirements', {
             'fields': ('status', 'special_requirements')
@@ -84,11 +158,23 @@ class ConferenceBookingAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('balance_amount', 'last_payment_at', 'blocked_from', 'blocked_until', 'created_at', 'updated_at')
+
+    @admin.action(description='Reserve equipment for the selected bookings')
+    def allocate_equipment(self, request, queryset):
+        short = 0
+        for booking in queryset:
+            if equipment.allocate(booking, request.user):
+                short += 1
+        if short:
+            self.message_user(request, f'{short} booking(s) could not get all their equipment; see the setup list.', messages.WARNING)
+        else:
+            self.message_user(request, 'Equipment reserved for the selected bookings.')
 
 
 @admin.register(ConferenceEvent)
 class ConferenceEventAdmin(admin.ModelAdmin):
+    form = ConferenceEventAdminForm
     list_display = ('booking', 'event_type', 'organizer_name', 'catering_required', 'technical_support_required')
     list_filter = ('event_type', 'catering_required', 'technical_support_required', 'created_at')
     search_fields = ('booking__event_title', 'organizer_name', 'organizer_phone')
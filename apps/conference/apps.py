@@ -5,3 +5,17 @@ class ConferenceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.conference'
     verbose_name = 'Conference'
+
+    def ready(self):
+        from django.db.models.signals import post_save, post_delete
+        from .equipment import follow_booking
+        from .feeds import invalidate_calendar
+        from .models import ConferenceBooking, ConferenceEvent, ConferenceRoom
+
+        # Calendar windows and iCal feeds are re-rendered after any change that shows in them
+        for model in (ConferenceBooking, ConferenceEvent, ConferenceRoom):
+            name = model._meta.model_name
+            post_save.connect(invalidate_calendar, sender=model, dispatch_uid=f'conference_calendar_{name}_saved')
+            post_delete.connect(invalidate_calendar, sender=model, dispatch_uid=f'conference_calendar_{name}_deleted')
+
+        post_save.connect(follow_booking, sender=ConferenceBooking, dispatch_uid='conference_equipment_follow_booking')
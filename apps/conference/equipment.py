@@ -0,0 +1,238 @@
+"""
+Conference equipment allocation.
+
+``ConferenceEquipment.is_available`` only says whether a unit can be handed
+out at all; who has it when is recorded by ``EquipmentReservation`` rows.
+A booking states what it needs as ``EquipmentRequirement`` rows (a type and
+a quantity), and ``allocate`` reserves individual units for the time the
+booking holds its room (``blocked_from``/``blocked_until``, setup and
+cleanup included; see ``conference.scheduling``).
+
+Each reservation copies that range into ``reserved_from``/``reserved_until``,
+so the units busy for an interval are found on the
+``(equipment, reserved_from, reserved_until)`` index without joining the
+bookings' times. Only reservations of pending or confirmed bookings hold a
+unit; cancelling or completing a booking frees its equipment. When a
+booking moves, its reservations follow it (``follow_booking``, connected to
+``post_save``) and any unit another booking already holds for the new time
+is released, which puts the booking back on the shortage report.
+
+``allocate`` locks every in-service unit of the types it needs before
+looking at their reservations, so two allocations of the same type run one
+after the other and cannot both promise the same unit. ``shortages`` lists
+the requirements not yet fully reserved for the bookings starting in a
+window, from one query, and ``setup_list`` gathers what has to be set up on
+a given day.
+"""
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, IntegerField, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from simple_history.utils import bulk_create_with_history
+
+from .models import ConferenceBooking, ConferenceEquipment, EquipmentRequirement, EquipmentReservation
+from .scheduling import HOLDING_STATUSES
+
+
+CHANGE_REASON = 'Equipment allocated'
+# How far ahead the setup list looks for bookings still missing equipment
+UPCOMING_DAYS = 7
+
+Shortage = namedtuple('Shortage', 'booking requirement reserved missing')
+SetupList = namedtuple('SetupList', 'day bookings shortages')
+
+
+def held_range(booking):
+    """The time a booking holds its room and equipment.
+
+    Bookings that already overlapped when the room constraint was added were
+    left with empty blocked columns (see ``conference.scheduling``); their
+    range is worked out from the booking and its event instead.
+    """
+    if booking.blocked_from is None or booking.blocked_until is None:
+        return booking.blocked_range()
+    return booking.blocked_from, booking.blocked_until
+
+
+def _overlapping(start, end):
+    return Q(booking__status__in=HOLDING_STATUSES, reserved_from__lt=end, reserved_until__gt=start)
+
+
+def in_service(start, end):
+    """Equipment that can be handed out for [start, end): available and not due for maintenance then"""
+    return ConferenceEquipment.objects.filter(is_available=True).exclude(
+        maintenance_date__range=(timezone.localdate(start), timezone.localdate(end))
+    )
+
+
+def free_equipment(equipment_type, start, end, exclude_booking=None):
+    """Units of a type that no live booking holds for any part of [start, end)
+
+    For a booking's own time pass ``held_range(booking)``, which also covers
+    bookings whose blocked columns are empty.
+    """
+    if start is None or end is None:
+        raise ValueError('free_equipment needs both a start and an end')
+    busy = EquipmentReservation.objects.filter(_overlapping(start, end))
+    if exclude_booking is not None:
+        busy = busy.exclude(booking_id=exclude_booking)
+    return (
+        in_service(start, end)
+        .filter(equipment_type=equipment_type)
+        .exclude(pk__in=busy.values('equipment_id'))
+        .order_by('name', 'pk')
+    )
+
+
+def with_reserved(requirements):
+    """Annotate each requirement with the units of its type reserved for its booking"""
+    reserved = (
+        EquipmentReservation.objects
+        .filter(booking_id=OuterRef('booking_id'), equipment__equipment_type=OuterRef('equipment_type'))
+        .values('booking_id')
+        .annotate(units=Count('pk'))
+        .values('units')
+    )
+    return requirements.annotate(reserved=Coalesce(Subquery(reserved, output_field=IntegerField()), 0))
+
+
+def missing(booking):
+    """{equipment_type: units still to reserve} for one booking"""
+    return {
+        equipment_type: quantity - reserved
+        for equipment_type, quantity, reserved in (
+            with_reserved(booking.equipment_requirements.all())
+            .filter(reserved__lt=F('quantity'))
+            .values_list('equipment_type', 'quantity', 'reserved')
+        )
+    }
+
+
+def allocate(booking, user=None):
+    """Reserve free units for whatever the booking's requirements still lack.
+
+    Reserves what it can and returns {equipment_type: units still missing};
+    an empty dict means the booking is fully equipped.
+    """
+    if booking.status not in HOLDING_STATUSES:
+        return {}
+    start, end = held_range(booking)
+    with transaction.atomic():
+        needs = missing(booking)
+        if not needs:
+            return {}
+        # Every unit of the needed types is locked first, so concurrent allocations queue here
+        units = list(
+            in_service(start, end)
+            .filter(equipment_type__in=needs)
+            .select_for_update(of=('self',))
+            .order_by('pk')
+        )
+        taken = set(
+            EquipmentReservation.objects
+            .filter(equipment__in=units)
+            .filter(_overlapping(start, end) | Q(booking=booking))
+            .values_list('equipment_id', flat=True)
+        )
+        reservations = []
+        for unit in sorted(units, key=lambda unit: (unit.name, unit.pk)):
+            if unit.pk in taken or not needs[unit.equipment_type]:
+                continue
+            needs[unit.equipment_type] -= 1
+            reservations.append(EquipmentReservation(
+                booking=booking,
+                equipment=unit,
+                reserved_from=start,
+                reserved_until=end,
+                created_by=user,
+            ))
+        if reservations:
+            bulk_create_with_history(
+                reservations, EquipmentReservation, default_user=user, default_change_reason=CHANGE_REASON,
+            )
+    return {equipment_type: count for equipment_type, count in needs.items() if count}
+
+
+def shortages(start, end):
+    """Requirements of live bookings starting in [start, end) that are not fully reserved, from one query"""
+    requirements = (
+        with_reserved(EquipmentRequirement.objects.filter(
+            booking__status__in=HOLDING_STATUSES,
+            booking__start_datetime__gte=start,
+            booking__start_datetime__lt=end,
+        ))
+        .filter(reserved__lt=F('quantity'))
+        .select_related('booking__room')
+        .order_by('booking__start_datetime', 'booking_id', 'equipment_type')
+    )
+    return [
+        Shortage(requirement.booking, requirement, requirement.reserved, requirement.quantity - requirement.reserved)
+        for requirement in requirements
+    ]
+
+
+def day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def setup_list(day):
+    """The live bookings starting on day with the equipment reserved for them, and what is still missing"""
+    start, end = day_bounds(day)
+    bookings = (
+        ConferenceBooking.objects
+        .filter(status__in=HOLDING_STATUSES, start_datetime__gte=start, start_datetime__lt=end)
+        .select_related('room', 'event')
+        .prefetch_related(Prefetch(
+            'equipment_reservations',
+            queryset=EquipmentReservation.objects.select_related('equipment').order_by(
+                'equipment__equipment_type', 'equipment__name'
+            ),
+        ))
+        .order_by('blocked_from', 'start_datetime')
+    )
+    return SetupList(day, list(bookings), shortages(start, end))
+
+
+def follow_booking(sender, instance, created, **kwargs):
+    """Move a booking's reservations with it, releasing units another live booking holds for the new time"""
+    if created or kwargs.get('raw'):
+        return
+    booking = instance
+    reservations = list(booking.equipment_reservations.all())
+    if not reservations:
+        return
+    start, end = held_range(booking)
+    moved = [
+        reservation for reservation in reservations
+        if (reservation.reserved_from, reservation.reserved_until) != (start, end)
+    ]
+    if moved:
+        now = timezone.now()
+        EquipmentReservation.objects.filter(pk__in=[reservation.pk for reservation in moved]).update(
+            reserved_from=start, reserved_until=end,
+        )
+        for reservation in moved:
+            reservation.reserved_from = start
+            reservation.reserved_until = end
+        EquipmentReservation.history.bulk_history_create(
+            moved, update=True, default_change_reason='Booking moved', default_date=now,
+        )
+    if booking.status not in HOLDING_STATUSES:
+        return
+    # Also covers a cancelled booking made live again after its units were given to someone else
+    clashing = EquipmentReservation.objects.filter(
+        pk__in=[reservation.pk for reservation in reservations]
+    ).filter(Exists(
+        EquipmentReservation.objects.filter(
+            equipment_id=OuterRef('equipment_id'),
+            booking__status__in=HOLDING_STATUSES,
+            reserved_from__lt=OuterRef('reserved_until'),
+            reserved_until__gt=OuterRef('reserved_from'),
+        ).exclude(booking_id=booking.pk)
+    ))
+    for reservation in clashing:
+        reservation.delete()
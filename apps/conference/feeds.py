@@ -0,0 +1,213 @@
+"""
+Conference calendar: JSON windows for the staff calendar and iCalendar feeds.
+
+Calendar apps poll the feeds every few minutes, so nothing is rendered per
+request. Every rendering is cached under the ``calendar`` version from
+``billing.versions``; saving or deleting a booking, an event or a room bumps
+it (see ``ConferenceConfig.ready``), the same way the restaurant menu is
+versioned in ``restaurant.publication``. The version lives in the database,
+so all workers agree on it. Responses carry an ETag derived from its token
+and a Last-Modified of the time it changed, so a poll that finds nothing
+changed is a 304 after one indexed read.
+
+Windows are read with a range query on the indexed ``start_datetime``.
+Bookings longer than ``MAX_SPAN`` days that started before the window are
+not shown in it.
+
+Feeds are public URLs for calendar apps, so they are addressed by a signed
+token rather than a session: ``feed_token`` signs the room (or the whole
+venue) and ``room_for_token`` checks it.
+"""
+import json
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+from django.core import signing
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.http import http_date
+
+from apps.billing import versions
+
+from .models import ConferenceBooking, ConferenceRoom
+
+
+VERSION_NAME = 'calendar'
+RENDER_TIMEOUT = 60 * 60 * 24
+
+MAX_SPAN = timedelta(days=7)
+FEED_PAST = timedelta(days=30)
+FEED_FUTURE = timedelta(days=365)
+
+FEED_SALT = 'conference.calendar.feed'
+VENUE = 'all'
+
+PRODID = '-//Kabul Taj Hotel//Conference Calendar//EN'
+
+
+def calendar_version():
+    """(token, changed at as a timestamp) of the current calendar contents"""
+    version = versions.current(VERSION_NAME)
+    return version.token, int(version.changed_at.timestamp())
+
+
+def invalidate_calendar(**kwargs):
+    """Issue a new calendar version; connected to booking, event and room post_save/post_delete"""
+    versions.bump(VERSION_NAME)
+
+
+class Rendering:
+    """A cached rendering plus the validators it is served with"""
+
+    def __init__(self, version, body, name):
+        token, issued_at = version
+        self.body = body
+        self.etag = f'"{token}-{name}"'
+        self.last_modified = http_date(issued_at)
+        self.issued_at = issued_at
+
+
+def _cached(name, build):
+    version = calendar_version()
+    key = f'conference:calendar:{version[0]}:{name}'
+    body = cache.get(key)
+    if body is None:
+        body = build()
+        cache.set(key, body, RENDER_TIMEOUT)
+    return Rendering(version, body, name)
+
+
+def window(view, anchor):
+    """First day and the day after the last day of the week or month holding anchor"""
+    if view == 'week':
+        first = anchor - timedelta(days=anchor.weekday())
+        return first, first + timedelta(days=7)
+    first = anchor.replace(day=1)
+    following = date(first.year + first.month // 12, first.month % 12 + 1, 1)
+    return first, following
+
+
+def bookings_between(start, end, room_id=None):
+    """Bookings overlapping [start, end), read by a range on start_datetime"""
+    bookings = (
+        ConferenceBooking.objects
+        .filter(start_datetime__gte=start - MAX_SPAN, start_datetime__lt=end, end_datetime__gt=start)
+        .select_related('room')
+        .order_by('start_datetime', 'pk')
+    )
+    if room_id is not None:
+        bookings = bookings.filter(room_id=room_id)
+    return bookings
+
+
+def calendar_json(view, anchor, room_id=None):
+    """The JSON body of one calendar window, cached per version"""
+    first, following = window(view, anchor)
+
+    def build():
+        start = timezone.make_aware(datetime.combine(first, time.min))
+        end = timezone.make_aware(datetime.combine(following, time.min))
+        return json.dumps({
+            'view': view,
+            'start': first.isoformat(),
+            'end': following.isoformat(),
+            'events': [_event(booking) for booking in bookings_between(start, end, room_id)],
+        })
+
+    return _cached(f'{view}-{first.isoformat()}-{room_id or VENUE}', build)
+
+
+def _event(booking):
+    return {
+        'id': booking.pk,
+        'booking_number': booking.booking_number,
+        'title': booking.event_title,
+        'client': booking.client_name,
+        'room_id': booking.room_id,
+        'room': booking.room.name,
+        'start': timezone.localtime(booking.start_datetime).isoformat(),
+        'end': timezone.localtime(booking.end_datetime).isoformat(),
+        'blocked_from': timezone.localtime(booking.blocked_from).isoformat() if booking.blocked_from else None,
+        'blocked_until': timezone.localtime(booking.blocked_until).isoformat() if booking.blocked_until else None,
+        'attendees': booking.attendees_count,
+        'status': booking.status,
+    }
+
+
+# iCalendar
+
+def feed_token(room_id=None):
+    return signing.dumps(room_id or VENUE, salt=FEED_SALT)
+
+
+def room_for_token(token):
+    """The room id a feed token was issued for, VENUE for the whole venue; raises signing.BadSignature"""
+    return signing.loads(token, salt=FEED_SALT)
+
+
+def ical_feed(room_id=None):
+    """The iCalendar feed of one room, or of the whole venue, cached per version"""
+
+    def build():
+        now = timezone.now()
+        room = ConferenceRoom.objects.filter(pk=room_id).values_list('name', flat=True).first() if room_id else None
+        lines = [
+            'BEGIN:VCALENDAR',
+            'VERSION:2.0',
+            f'PRODID:{PRODID}',
+            'CALSCALE:GREGORIAN',
+            'METHOD:PUBLISH',
+            f'X-WR-CALNAME:{_escape(room or "Conference Rooms")}',
+        ]
+        for booking in bookings_between(now - FEED_PAST, now + FEED_FUTURE, room_id):
+            lines.extend(_vevent(booking, now))
+        lines.append('END:VCALENDAR')
+        return ''.join(_fold(line) + '\r\n' for line in lines)
+
+    return _cached(f'ical-{room_id or VENUE}', build)
+
+
+def _vevent(booking, now):
+    status = {'cancelled': 'CANCELLED', 'pending': 'TENTATIVE'}.get(booking.status, 'CONFIRMED')
+    description = f'{booking.client_name}, {booking.attendees_count} attendee(s)'
+    if booking.event_description:
+        description += f'\n{booking.event_description}'
+    return [
+        'BEGIN:VEVENT',
+        f'UID:conference-booking-{booking.pk}@kabultaj',
+        f'DTSTAMP:{_utc(now)}',
+        f'LAST-MODIFIED:{_utc(booking.updated_at)}',
+        f'DTSTART:{_utc(booking.start_datetime)}',
+        f'DTEND:{_utc(booking.end_datetime)}',
+        f'SUMMARY:{_escape(booking.event_title)}',
+        f'LOCATION:{_escape(booking.room.name)}',
+        f'DESCRIPTION:{_escape(description)}',
+        f'STATUS:{status}',
+        'END:VEVENT',
+    ]
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _escape(text):
+    return (
+        str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _fold(line, limit=75):
+    """Fold a content line at 75 octets, as RFC 5545 requires"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= limit:
+        return line
+    parts, current = [], b''
+    for char in line:
+        piece = char.encode('utf-8')
+        if len(current) + len(piece) > (limit if not parts else limit - 1):
+            parts.append(current.decode('utf-8'))
+            current = b''
+        current += piece
+    parts.append(current.decode('utf-8'))
+    return '\r\n '.join(parts)
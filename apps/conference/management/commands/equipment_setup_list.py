@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.conference.equipment import allocate, setup_list
+
+
+class Command(BaseCommand):
+    help = "Print the conference equipment to set up on a day, and what is still missing"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            help="Day to set up (YYYY-MM-DD); defaults to tomorrow",
+        )
+        parser.add_argument(
+            "--allocate",
+            action="store_true",
+            help="First reserve free equipment for the day's bookings that still lack some",
+        )
+
+    def handle(self, *args, **options):
+        if options["date"]:
+            try:
+                day = datetime.strptime(options["date"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--date must be in YYYY-MM-DD format")
+        else:
+            day = timezone.localdate() + timedelta(days=1)
+
+        setup = setup_list(day)
+        if options["allocate"] and setup.shortages:
+            for booking in {shortage.booking.pk: shortage.booking for shortage in setup.shortages}.values():
+                allocate(booking)
+            setup = setup_list(day)
+
+        self.stdout.write(f"Setup list for {day:%A %Y-%m-%d}")
+        for booking in setup.bookings:
+            start = timezone.localtime(booking.blocked_from or booking.start_datetime)
+            self.stdout.write(f"{start:%H:%M}  {booking.room.name}  {booking.booking_number} {booking.event_title}")
+            for reservation in booking.equipment_reservations.all():
+                self.stdout.write(f"    {reservation.equipment.name} ({reservation.equipment.get_equipment_type_display()})")
+        if not setup.bookings:
+            self.stdout.write("No conference bookings start on this day.")
+
+        for shortage in setup.shortages:
+            self.stdout.write(self.style.WARNING(
+                f"Missing for {shortage.booking.booking_number}: {shortage.missing} x "
+                f"{shortage.requirement.get_equipment_type_display()} "
+                f"({shortage.reserved} of {shortage.requirement.quantity} reserved)"
+            ))
+        if not setup.shortages:
+            self.stdout.write(self.style.SUCCESS("All requested equipment is reserved."))
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:18
+
+from django.db import migrations, models
+from django.db.models import F, Max, OuterRef, Subquery
+
+
+def backfill_running_balances(apps, schema_editor):
+    ConferenceBooking = apps.get_model('conference', 'ConferenceBooking')
+    ConferencePayment = apps.get_model('conference', 'ConferencePayment')
+    payments = ConferencePayment.objects.filter(booking=OuterRef('pk')).order_by().values('booking')
+    ConferenceBooking.objects.update(
+        balance_amount=F('total_amount') - F('paid_amount'),
+        last_payment_at=Subquery(payments.annotate(last=Max('payment_date')).values('last')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conference', '0003_conferenceroom_image_1_conferenceroom_image_2_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conferencebooking',
+            name='balance_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='conferencebooking',
+            name='last_payment_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalconferencebooking',
+            name='balance_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='historicalconferencebooking',
+            name='last_payment_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_running_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conference', '0004_conferencebooking_balance_amount_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conferencepayment',
+            name='reconciled_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Set when the payment is matched to a bank or card statement line', null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalconferencepayment',
+            name='reconciled_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Set when the payment is matched to a bank or card statement line', null=True),
+        ),
+    ]
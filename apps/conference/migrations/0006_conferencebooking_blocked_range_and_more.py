@@ -0,0 +1,108 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:52
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+CONSTRAINT = 'conference_booking_no_overlap'
+HOLDING = "('pending', 'confirmed')"
+
+
+def backfill_blocked_ranges(apps, schema_editor):
+    """Set every booking's held range; overlapping live bookings keep an empty one so the constraint can be added"""
+    ConferenceBooking = apps.get_model('conference', 'ConferenceBooking')
+    ConferenceEvent = apps.get_model('conference', 'ConferenceEvent')
+    buffers = {
+        booking_id: (setup, cleanup)
+        for booking_id, setup, cleanup in ConferenceEvent.objects.values_list(
+            'booking_id', 'setup_time_required', 'cleanup_time_required'
+        )
+    }
+    bookings = list(ConferenceBooking.objects.order_by('room_id', 'start_datetime', 'pk'))
+    held_until = {}
+    for booking in bookings:
+        setup, cleanup = buffers.get(booking.pk, (0, 0))
+        booking.blocked_from = booking.start_datetime - timedelta(minutes=setup)
+        booking.blocked_until = booking.end_datetime + timedelta(minutes=cleanup)
+        if booking.status in ('pending', 'confirmed'):
+            previous_end = held_until.get(booking.room_id)
+            if previous_end is not None and booking.blocked_from < previous_end:
+                booking.blocked_from = booking.blocked_until = None
+                continue
+            held_until[booking.room_id] = max(previous_end or booking.blocked_until, booking.blocked_until)
+    ConferenceBooking.objects.bulk_update(bookings, ['blocked_from', 'blocked_until'], batch_size=500)
+
+
+def add_overlap_constraint(apps, schema_editor):
+    connection = schema_editor.connection
+    table = connection.ops.quote_name(apps.get_model('conference', 'ConferenceBooking')._meta.db_table)
+    if connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        schema_editor.execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT {CONSTRAINT} EXCLUDE USING gist ('
+            f"room_id WITH =, tstzrange(blocked_from, blocked_until, '[)') WITH &&"
+            f') WHERE (status IN {HOLDING} AND blocked_from IS NOT NULL AND blocked_until IS NOT NULL)'
+        )
+    elif connection.vendor == 'sqlite':
+        overlap = (
+            f'SELECT RAISE(ABORT, \'{CONSTRAINT}\') WHERE EXISTS ('
+            f'SELECT 1 FROM {table} WHERE room_id = NEW.room_id AND status IN {HOLDING} '
+            f'AND blocked_from IS NOT NULL AND blocked_until IS NOT NULL '
+            f'AND blocked_from < NEW.blocked_until AND blocked_until > NEW.blocked_from'
+        )
+        when = f'WHEN NEW.status IN {HOLDING} AND NEW.blocked_from IS NOT NULL AND NEW.blocked_until IS NOT NULL'
+        schema_editor.execute(
+            f'CREATE TRIGGER {CONSTRAINT}_insert BEFORE INSERT ON {table} {when} '
+            f'BEGIN {overlap}); END'
+        )
+        schema_editor.execute(
+            f'CREATE TRIGGER {CONSTRAINT}_update BEFORE UPDATE OF room_id, status, blocked_from, blocked_until '
+            f'ON {table} {when} BEGIN {overlap} AND id != NEW.id); END'
+        )
+
+
+def drop_overlap_constraint(apps, schema_editor):
+    connection = schema_editor.connection
+    table = connection.ops.quote_name(apps.get_model('conference', 'ConferenceBooking')._meta.db_table)
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {CONSTRAINT}')
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {CONSTRAINT}_insert')
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {CONSTRAINT}_update')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conference', '0005_conferencepayment_reconciled_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conferencebooking',
+            name='blocked_from',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='conferencebooking',
+            name='blocked_until',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalconferencebooking',
+            name='blocked_from',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalconferencebooking',
+            name='blocked_until',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='conferencebooking',
+            index=models.Index(fields=['room', 'blocked_from', 'blocked_until'], name='conference_booking_block_idx'),
+        ),
+        migrations.RunPython(backfill_blocked_ranges, migrations.RunPython.noop),
+        migrations.RunPython(add_overlap_constraint, drop_overlap_constraint),
+    ]
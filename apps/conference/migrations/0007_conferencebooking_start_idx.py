@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conference', '0006_conferencebooking_blocked_range_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conferencebooking',
+            index=models.Index(fields=['start_datetime'], name='conference_booking_start_idx'),
+        ),
+    ]
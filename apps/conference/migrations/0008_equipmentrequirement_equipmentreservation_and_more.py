@@ -0,0 +1,106 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import simple_history.models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('conference', '0007_conferencebooking_start_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentRequirement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('equipment_type', models.CharField(choices=[('projector', 'Projector'), ('screen', 'Screen'), ('sound_system', 'Sound System'), ('microphone', 'Microphone'), ('video_conference', 'Video Conference'), ('whiteboard', 'Whiteboard'), ('flipchart', 'Flipchart'), ('computer', 'Computer'), ('other', 'Other')], max_length=20)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='equipment_requirements', to='conference.conferencebooking')),
+            ],
+            options={
+                'verbose_name': 'Equipment Requirement',
+                'verbose_name_plural': 'Equipment Requirements',
+                'ordering': ['equipment_type'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EquipmentReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reserved_from', models.DateTimeField()),
+                ('reserved_until', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='equipment_reservations', to='conference.conferencebooking')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='conference_equipment_reserved', to=settings.AUTH_USER_MODEL)),
+                ('equipment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='conference.conferenceequipment')),
+            ],
+            options={
+                'verbose_name': 'Equipment Reservation',
+                'verbose_name_plural': 'Equipment Reservations',
+                'ordering': ['reserved_from'],
+            },
+        ),
+        migrations.CreateModel(
+            name='HistoricalEquipmentRequirement',
+            fields=[
+                ('id', models.BigIntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('equipment_type', models.CharField(choices=[('projector', 'Projector'), ('screen', 'Screen'), ('sound_system', 'Sound System'), ('microphone', 'Microphone'), ('video_conference', 'Video Conference'), ('whiteboard', 'Whiteboard'), ('flipchart', 'Flipchart'), ('computer', 'Computer'), ('other', 'Other')], max_length=20)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('history_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField(db_index=True)),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('booking', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='conference.conferencebooking')),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'historical Equipment Requirement',
+                'verbose_name_plural': 'historical Equipment Requirements',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': ('history_date', 'history_id'),
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.CreateModel(
+            name='HistoricalEquipmentReservation',
+            fields=[
+                ('id', models.BigIntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('reserved_from', models.DateTimeField()),
+                ('reserved_until', models.DateTimeField()),
+                ('created_at', models.DateTimeField(blank=True, editable=False)),
+                ('history_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField(db_index=True)),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('booking', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='conference.conferencebooking')),
+                ('created_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('equipment', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='conference.conferenceequipment')),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'historical Equipment Reservation',
+                'verbose_name_plural': 'historical Equipment Reservations',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': ('history_date', 'history_id'),
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentreservation',
+            index=models.Index(fields=['equipment', 'reserved_from', 'reserved_until'], name='conference_equip_resv_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='equipmentreservation',
+            constraint=models.UniqueConstraint(fields=('booking', 'equipment'), name='unique_booking_equipment'),
+        ),
+        migrations.AddConstraint(
+            model_name='equipmentrequirement',
+            constraint=models.UniqueConstraint(fields=('booking', 'equipment_type'), name='unique_booking_equipment_type'),
+        ),
+    ]
@@ -1,4 +1,8 @@
+from datetime import timedelta
+
 from django.db import models
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
 from django.conf import settings
 from simple_history.models import HistoricalRecords
 
@@ -95,9 +99,14 @@ class ConferenceBooking(models.Model):
     event_description = models.TextField(blank=True)
     start_datetime = models.DateTimeField()
     end_datetime = models.DateTimeField()
+    # Start and end widened by the event's setup and cleanup time; see conference.scheduling
+    blocked_from = models.DateTimeField(null=True, blank=True, editable=False)
+    blocked_until = models.DateTimeField(null=True, blank=True, editable=False)
     attendees_count = models.PositiveIntegerField()
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     paid_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    balance_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    last_payment_at = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='pending')
     special_requirements = models.TextField(blank=True)
@@ -115,10 +124,58 @@ class ConferenceBooking(models.Model):
         verbose_name = 'Conference Booking'
         verbose_name_plural = 'Conference Bookings'
         ordering = ['-start_datetime']
+        indexes = [
+            models.Index(fields=['room', 'blocked_from', 'blocked_until'], name='conference_booking_block_idx'),
+            models.Index(fields=['start_datetime'], name='conference_booking_start_idx'),
+        ]
 
     def __str__(self):
         return f"Booking {self.booking_number} - {self.event_title}"
 
+    def save(self, *args, **kwargs):
+        self.balance_amount = self.total_amount - self.paid_amount
+        self.blocked_from, self.blocked_until = self.blocked_range()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'blocked_from', 'blocked_until'}
+        super().save(*args, **kwargs)
+
+    def blocked_range(self, setup_minutes=None, cleanup_minutes=None):
+        """The time the room is held: the event plus its setup and cleanup time"""
+        event = getattr(self, 'event', None)
+        if setup_minutes is None:
+            setup_minutes = event.setup_time_required if event else 0
+        if cleanup_minutes is None:
+            cleanup_minutes = event.cleanup_time_required if event else 0
+        return (
+            self.start_datetime - timedelta(minutes=setup_minutes),
+            self.end_datetime + timedelta(minutes=cleanup_minutes),
+        )
+
+    def record_payment(self, amount, user=None):
+        """Add a completed payment to the running totals with one UPDATE.
+
+        Call inside the transaction that stores the ConferencePayment row.
+        """
+        now = timezone.now()
+        paid = F('paid_amount') + amount
+        ConferenceBooking.objects.filter(pk=self.pk).update(
+            paid_amount=paid,
+            balance_amount=F('total_amount') - paid,
+            payment_status=Case(
+                When(total_amount__lte=paid, then=Value('paid')),
+                When(paid_amount__lte=-amount, then=Value('pending')),
+                default=Value('partial'),
+            ),
+            last_payment_at=now,
+            updated_at=now,
+        )
+        self.refresh_from_db(fields=['paid_amount', 'balance_amount', 'payment_status', 'last_payment_at', 'updated_at'])
+        ConferenceBooking.history.bulk_history_create(
+            [self], update=True, default_user=user,
+            default_change_reason='Payment received', default_date=now,
+        )
+
     @property
     def duration_hours(self):
         duration = self.end_datetime - self.start_datetime
@@ -126,7 +183,7 @@ class ConferenceBooking(models.Model):
 
     @property
     def remaining_amount(self):
-        return self.total_amount - self.paid_amount
+        return self.balance_amount
 
 
 class ConferenceEvent(models.Model):
@@ -163,6 +220,64 @@ class ConferenceEvent(models.Model):
     def __str__(self):
         return f"{self.event_type.title()} - {self.booking.event_title}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # The booking holds the room for the setup and cleanup time as well
+        blocked = self.booking.blocked_range(self.setup_time_required, self.cleanup_time_required)
+        if blocked != (self.booking.blocked_from, self.booking.blocked_until):
+            self.booking.save(update_fields=['updated_at'])
+
+
+class EquipmentRequirement(models.Model):
+    """How many units of an equipment type a booking needs"""
+    booking = models.ForeignKey(ConferenceBooking, on_delete=models.CASCADE, related_name='equipment_requirements')
+    equipment_type = models.CharField(max_length=20, choices=ConferenceEquipment.EQUIPMENT_TYPES)
+    quantity = models.PositiveIntegerField(default=1)
+    history = HistoricalRecords()
+
+    class Meta:
+        verbose_name = 'Equipment Requirement'
+        verbose_name_plural = 'Equipment Requirements'
+        ordering = ['equipment_type']
+        constraints = [
+            models.UniqueConstraint(fields=['booking', 'equipment_type'], name='unique_booking_equipment_type'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.get_equipment_type_display()} - {self.booking.booking_number}"
+
+
+class EquipmentReservation(models.Model):
+    """A unit of equipment held for a booking; see conference.equipment"""
+    booking = models.ForeignKey(ConferenceBooking, on_delete=models.CASCADE, related_name='equipment_reservations')
+    equipment = models.ForeignKey(ConferenceEquipment, on_delete=models.CASCADE, related_name='reservations')
+    # The booking's blocked_from/blocked_until, copied so overlaps are found on this table's index
+    reserved_from = models.DateTimeField()
+    reserved_until = models.DateTimeField()
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='conference_equipment_reserved'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    history = HistoricalRecords()
+
+    class Meta:
+        verbose_name = 'Equipment Reservation'
+        verbose_name_plural = 'Equipment Reservations'
+        ordering = ['reserved_from']
+        indexes = [
+            models.Index(fields=['equipment', 'reserved_from', 'reserved_until'], name='conference_equip_resv_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['booking', 'equipment'], name='unique_booking_equipment'),
+        ]
+
+    def __str__(self):
+        return f"{self.equipment.name} - {self.booking.booking_number}"
+
 
 class ConferencePayment(models.Model):
     """Payment records for conference bookings"""
@@ -187,6 +302,8 @@ class ConferencePayment(models.Model):
         related_name='conference_payments_processed'
     )
     notes = models.TextField(blank=True)
+    reconciled_at = models.DateTimeField(null=True, blank=True, db_index=True,
+                                         help_text="Set when the payment is matched to a bank or card statement line")
     history = HistoricalRecords()
 
     class Meta:
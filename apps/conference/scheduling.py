@@ -0,0 +1,88 @@
+"""
+Conference room scheduling.
+
+A booking holds its room from ``blocked_from`` to ``blocked_until``: the
+event's start and end widened by the ``setup_time_required`` and
+``cleanup_time_required`` of its ConferenceEvent. The model keeps both
+columns current on every save. Two pending or confirmed bookings of the same
+room may not overlap there, and the database enforces it:
+
+* on PostgreSQL with an exclusion constraint over
+  ``tstzrange(blocked_from, blocked_until)`` and the room (btree_gist);
+* on SQLite, which has no range types, with triggers that abort an insert
+  or update overlapping another live booking of the room.
+
+Either way a double booking that slips past the checks below fails with an
+``IntegrityError`` instead of being stored. Bookings that already overlapped
+when the constraint was added were left with an empty range so it could be
+created; they still count as busy here, by their plain start and end, and
+are held to the constraint again on their next save.
+
+``check_room`` reports the bookings a new interval would clash with, and
+``free_rooms`` lists the rooms free for an interval and a party in one query
+on the ``(room, blocked_from, blocked_until)`` index.
+"""
+from datetime import timedelta
+
+from django.db.models import Q
+
+from .models import ConferenceBooking, ConferenceRoom
+
+
+HOLDING_STATUSES = ['pending', 'confirmed']
+UNAVAILABLE_ROOM_STATUSES = ['maintenance', 'out_of_order']
+
+
+class ScheduleConflict(Exception):
+    """Raised when a room is already held for part of the requested interval"""
+
+    def __init__(self, bookings):
+        self.bookings = bookings
+        super().__init__('; '.join(
+            f'{booking.booking_number} "{booking.event_title}" '
+            f'{booking.start_datetime:%Y-%m-%d %H:%M}-{booking.end_datetime:%H:%M}'
+            for booking in bookings
+        ))
+
+
+def blocked_range(start, end, setup_minutes=0, cleanup_minutes=0):
+    return start - timedelta(minutes=setup_minutes), end + timedelta(minutes=cleanup_minutes)
+
+
+def holding_bookings(block_start, block_end, exclude=None):
+    """Live bookings whose held time overlaps [block_start, block_end)"""
+    bookings = ConferenceBooking.objects.filter(status__in=HOLDING_STATUSES).filter(
+        Q(blocked_from__lt=block_end, blocked_until__gt=block_start)
+        # Bookings predating the constraint that overlapped another one
+        | Q(blocked_from__isnull=True, start_datetime__lt=block_end, end_datetime__gt=block_start)
+    )
+    if exclude is not None:
+        bookings = bookings.exclude(pk=exclude)
+    return bookings
+
+
+def conflicts(room_id, start, end, setup_minutes=0, cleanup_minutes=0, exclude=None):
+    block_start, block_end = blocked_range(start, end, setup_minutes, cleanup_minutes)
+    return list(
+        holding_bookings(block_start, block_end, exclude).filter(room_id=room_id).order_by('blocked_from')
+    )
+
+
+def check_room(room_id, start, end, setup_minutes=0, cleanup_minutes=0, exclude=None):
+    """Raise ScheduleConflict when the room is held for any part of the interval"""
+    clashing = conflicts(room_id, start, end, setup_minutes, cleanup_minutes, exclude)
+    if clashing:
+        raise ScheduleConflict(clashing)
+
+
+def free_rooms(start, end, attendees=0, setup_minutes=0, cleanup_minutes=0, exclude=None):
+    """Rooms that seat the attendees and are free for the interval, smallest first"""
+    block_start, block_end = blocked_range(start, end, setup_minutes, cleanup_minutes)
+    busy = holding_bookings(block_start, block_end, exclude).values('room_id')
+    return (
+        ConferenceRoom.objects
+        .filter(is_active=True, capacity__gte=attendees)
+        .exclude(status__in=UNAVAILABLE_ROOM_STATUSES)
+        .exclude(pk__in=busy)
+        .order_by('capacity', 'name')
+    )
@@ -1,13 +1,20 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import ConferenceRoom, ConferenceBooking, ConferenceEquipment
+from .models import ConferenceRoom, ConferenceBooking, ConferenceEquipment, EquipmentRequirement
 from django.db.models import Sum
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.core import signing
+from django.core.paginator import Paginator
+from django.http import Http404, HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
 from django import forms
 from django.utils import timezone
-from datetime import datetime
+from datetime import datetime, timedelta
 from apps.users.decorators import admin_required
+from apps.billing.numbering import next_number
+from . import equipment, feeds, scheduling
 
 
 @admin_required
@@ -278,12 +285,25 @@ def booking_list(request):
             models.Q(booking_number__icontains=search_query)
         )
     
+    counts = bookings.aggregate(
+        total=models.Count('pk'),
+        confirmed=models.Count('pk', filter=models.Q(status='confirmed')),
+        pending=models.Count('pk', filter=models.Q(status='pending')),
+        cancelled=models.Count('pk', filter=models.Q(status='cancelled')),
+    )
+    paginator = Paginator(bookings, 25)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    query = request.GET.copy()
+    query.pop('page', None)
+    
     context = {
-        'bookings': bookings,
-        'total_bookings': bookings.count(),
-        'confirmed_bookings': bookings.filter(status='confirmed').count(),
-        'pending_bookings': bookings.filter(status='pending').count(),
-        'cancelled_bookings': bookings.filter(status='cancelled').count(),
+        'bookings': page_obj,
+        'page_obj': page_obj,
+        'query_string': query.urlencode(),
+        'total_bookings': counts['total'],
+        'confirmed_bookings': counts['confirmed'],
+        'pending_bookings': counts['pending'],
+        'cancelled_bookings': counts['cancelled'],
     }
     
     return render(request, 'conference/booking_list.html', context)
@@ -314,8 +334,10 @@ class ConferenceBookingForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
-        # Filter rooms to only show available ones
-        self.fields['room'].queryset = ConferenceRoom.objects.filter(status='available', is_active=True)
+        # Rooms are checked against the bookings for the chosen time in clean(); only rooms out of service are hidden
+        self.fields['room'].queryset = ConferenceRoom.objects.filter(is_active=True).exclude(
+            status__in=scheduling.UNAVAILABLE_ROOM_STATUSES
+        )
         
         # Add help text
         self.fields['client_name'].help_text = 'Full name of the person making the booking'
@@ -324,7 +346,7 @@ class ConferenceBookingForm(forms.ModelForm):
         self.fields['event_title'].help_text = 'Name or title of the event'
         self.fields['attendees_count'].help_text = 'Expected number of attendees'
         self.fields['total_amount'].help_text = 'Total cost for the booking'
-        self.fields['room'].help_text = 'Select an available conference room'
+        self.fields['room'].help_text = 'Select a conference room that is free for the event time'
         self.fields['start_datetime'].help_text = 'Select a future date and time for the event start'
         self.fields['end_datetime'].help_text = 'Select a date and time after the start time'
     
@@ -348,6 +370,38 @@ class ConferenceBookingForm(forms.ModelForm):
             raise forms.ValidationError(f'Number of attendees ({attendees_count}) exceeds room capacity ({room.capacity}).')
         return attendees_count
 
+    def clean(self):
+        cleaned_data = super().clean()
+        room = cleaned_data.get('room')
+        start = cleaned_data.get('start_datetime')
+        end = cleaned_data.get('end_datetime')
+        if room and start and end and end > start and self.instance.status in scheduling.HOLDING_STATUSES:
+            event = getattr(self.instance, 'event', None)
+            setup = event.setup_time_required if event else 0
+            cleanup = event.cleanup_time_required if event else 0
+            try:
+                scheduling.check_room(room.pk, start, end, setup, cleanup, exclude=self.instance.pk)
+            except scheduling.ScheduleConflict as e:
+                free = scheduling.free_rooms(
+                    start, end, cleaned_data.get('attendees_count') or 0, setup, cleanup, exclude=self.instance.pk
+                )[:3]
+                message = f'{room.name} is already booked for this time (including setup and cleanup): {e}.'
+                if free:
+                    message += ' Free rooms: ' + ', '.join(free_room.name for free_room in free) + '.'
+                raise forms.ValidationError(message)
+        return cleaned_data
+
+
+def _save_booking(form, booking):
+    """Save a booking; False (with a form error) when the database rejects an overlapping booking"""
+    try:
+        with transaction.atomic():
+            booking.save()
+    except IntegrityError:
+        form.add_error('room', 'This room was just booked for an overlapping time. Please choose another time or room.')
+        return False
+    return True
+
 @admin_required
 def booking_create(request):
     if request.method == 'POST':
@@ -361,18 +415,16 @@ def booking_create(request):
             booking.paid_amount = 0
             # Generate booking number if not provided
             if not booking.booking_number:
-                import uuid
-                booking.booking_number = f"CONF-{uuid.uuid4().hex[:8].upper()}"
-            booking.save()
-            messages.success(request, f'Conference booking "{booking.booking_number}" created successfully.')
-            return redirect('conference:conference_booking_list')
-        else:
-            messages.error(request, 'Please correct the errors below.')
+                booking.booking_number = next_number('CONF')
+            if _save_booking(form, booking):
+                messages.success(request, f'Conference booking "{booking.booking_number}" created successfully.')
+                return redirect('conference:conference_booking_list')
+        messages.error(request, 'Please correct the errors below.')
     else:
         form = ConferenceBookingForm()
     
     # Get available rooms for the form
-    available_rooms = ConferenceRoom.objects.filter(status='available', is_active=True)
+    available_rooms = form.fields['room'].queryset
     
     # Check if there are available rooms
     if not available_rooms.exists():
@@ -398,10 +450,82 @@ def booking_detail(request, pk):
     
     context = {
         'booking': booking,
+        'equipment_requirements': equipment.with_reserved(booking.equipment_requirements.all()),
+        'equipment_reservations': booking.equipment_reservations.select_related('equipment').order_by(
+            'equipment__equipment_type', 'equipment__name'
+        ),
+        'equipment_types': ConferenceEquipment.EQUIPMENT_TYPES,
+        'holds_room': booking.status in scheduling.HOLDING_STATUSES,
     }
     return render(request, 'conference/booking_detail.html', context)
 
 
+@admin_required
+def booking_equipment(request, pk):
+    """Set an equipment requirement (quantity 0 removes it), reserve units, or release one"""
+    booking = get_object_or_404(ConferenceBooking, pk=pk)
+    if request.method != 'POST':
+        return redirect('conference:booking_detail', pk=pk)
+
+    action = request.POST.get('action')
+    if action == 'require':
+        equipment_type = request.POST.get('equipment_type')
+        try:
+            quantity = int(request.POST.get('quantity', ''))
+        except ValueError:
+            quantity = -1
+        if equipment_type not in dict(ConferenceEquipment.EQUIPMENT_TYPES) or quantity < 0:
+            messages.error(request, 'Choose an equipment type and a quantity of 0 or more.')
+        elif quantity == 0:
+            for requirement in booking.equipment_requirements.filter(equipment_type=equipment_type):
+                requirement.delete()
+            messages.success(request, 'Equipment requirement removed.')
+        else:
+            EquipmentRequirement.objects.update_or_create(
+                booking=booking, equipment_type=equipment_type, defaults={'quantity': quantity},
+            )
+            messages.success(request, 'Equipment requirement saved.')
+    elif action == 'allocate':
+        still_missing = equipment.allocate(booking, request.user)
+        if still_missing:
+            labels = dict(ConferenceEquipment.EQUIPMENT_TYPES)
+            messages.warning(request, 'Not enough free equipment: ' + ', '.join(
+                f'{count} x {labels[equipment_type]}' for equipment_type, count in still_missing.items()
+            ))
+        else:
+            messages.success(request, 'All required equipment is reserved.')
+    elif action == 'release':
+        reservation = get_object_or_404(
+            booking.equipment_reservations.select_related('equipment'),
+            pk=request.POST.get('reservation') if request.POST.get('reservation', '').isdigit() else None,
+        )
+        reservation.delete()
+        messages.success(request, f'{reservation.equipment.name} released.')
+    return redirect('conference:booking_detail', pk=pk)
+
+
+@admin_required
+def equipment_setup(request):
+    """What to set up on a day (default tomorrow), and equipment still missing for the coming days"""
+    try:
+        day = datetime.strptime(request.GET['date'], '%Y-%m-%d').date() if request.GET.get('date') else None
+    except ValueError:
+        messages.error(request, 'Dates are written YYYY-MM-DD.')
+        day = None
+    day = day or timezone.localdate() + timedelta(days=1)
+    start = equipment.day_bounds(timezone.localdate())[0]
+
+    context = {
+        'setup': equipment.setup_list(day),
+        'upcoming_shortages': equipment.shortages(start, start + timedelta(days=equipment.UPCOMING_DAYS)),
+        'upcoming_days': equipment.UPCOMING_DAYS,
+        'previous_day': day - timedelta(days=1),
+        'next_day': day + timedelta(days=1),
+        'title': 'Equipment Setup List',
+    }
+    return render(request, 'conference/equipment_setup.html', context)
+
+
 @admin_required
 def booking_edit(request, pk):
     """Edit conference booking"""
@@ -413,17 +537,15 @@ def booking_edit(request, pk):
     
     if request.method == 'POST':
         form = ConferenceBookingForm(request.POST, instance=booking)
-        if form.is_valid():
-            form.save()
+        if form.is_valid() and _save_booking(form, form.instance):
             messages.success(request, f'Conference booking "{booking.booking_number}" updated successfully.')
             return redirect('conference:conference_booking_list')
-        else:
-            messages.error(request, 'Please correct the errors below.')
+        messages.error(request, 'Please correct the errors below.')
     else:
         form = ConferenceBookingForm(instance=booking)
     
     # Get available rooms for the form
-    available_rooms = ConferenceRoom.objects.filter(status='available', is_active=True)
+    available_rooms = form.fields['room'].queryset
     
     context = {
         'form': form,
@@ -477,3 +599,84 @@ def booking_mark_completed(request, pk):
             return redirect('conference:booking_detail', pk=pk)
     # Fallback for non-POST requests
     return redirect('conference:booking_detail', pk=pk)
+
+
+@admin_required
+def free_room_list(request):
+    """Rooms free for an interval: ?start=YYYY-MM-DDTHH:MM&end=...&attendees=N[&setup=min&cleanup=min][&exclude=booking id]"""
+    try:
+        start = timezone.make_aware(datetime.strptime(request.GET.get('start', ''), '%Y-%m-%dT%H:%M'))
+        end = timezone.make_aware(datetime.strptime(request.GET.get('end', ''), '%Y-%m-%dT%H:%M'))
+        attendees = int(request.GET.get('attendees') or 0)
+        setup = int(request.GET.get('setup') or 0)
+        cleanup = int(request.GET.get('cleanup') or 0)
+        exclude = int(request.GET['exclude']) if request.GET.get('exclude') else None
+    except ValueError:
+        return JsonResponse({'error': 'start and end (YYYY-MM-DDTHH:MM) are required'}, status=400)
+    if end <= start:
+        return JsonResponse({'error': 'end must be after start'}, status=400)
+
+    rooms = scheduling.free_rooms(start, end, attendees, setup, cleanup, exclude=exclude)
+    return JsonResponse({
+        'rooms': [
+            {'id': room.pk, 'name': room.name, 'capacity': room.capacity, 'floor': room.floor,
+             'hourly_rate': str(room.hourly_rate), 'daily_rate': str(room.daily_rate)}
+            for room in rooms
+        ],
+    })
+
+
+# Calendar
+def _serve_rendering(request, rendering, content_type):
+    """Serve a cached feeds.Rendering, or 304 when the client already holds this version"""
+    response = get_conditional_response(request, etag=rendering.etag, last_modified=rendering.issued_at)
+    if response is None:
+        response = HttpResponse(rendering.body, content_type=content_type)
+    response['ETag'] = rendering.etag
+    response['Last-Modified'] = rendering.last_modified
+    # Clients keep their copy but must revalidate it on every poll
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@admin_required
+def booking_calendar(request):
+    """Week/month calendar of the bookings, filled from calendar_events"""
+    rooms = ConferenceRoom.objects.filter(is_active=True).order_by('name')
+    feed_urls = [('All conference rooms', reverse('conference:calendar_feed', args=[feeds.feed_token()]))]
+    feed_urls += [
+        (room.name, reverse('conference:calendar_feed', args=[feeds.feed_token(room.pk)]))
+        for room in rooms
+    ]
+    context = {
+        'rooms': rooms,
+        'feed_urls': [(name, request.build_absolute_uri(url)) for name, url in feed_urls],
+        'title': 'Conference Calendar',
+    }
+    return render(request, 'conference/calendar.html', context)
+
+
+@admin_required
+def calendar_events(request):
+    """Bookings of one window: ?view=week|month&date=YYYY-MM-DD[&room=id]"""
+    view = request.GET.get('view', 'week')
+    if view not in ('week', 'month'):
+        return JsonResponse({'error': 'view must be week or month'}, status=400)
+    try:
+        anchor = datetime.strptime(request.GET['date'], '%Y-%m-%d').date() if request.GET.get('date') else timezone.localdate()
+        room_id = int(request.GET['room']) if request.GET.get('room') else None
+    except ValueError:
+        return JsonResponse({'error': 'date must be YYYY-MM-DD and room an id'}, status=400)
+    return _serve_rendering(request, feeds.calendar_json(view, anchor, room_id), 'application/json')
+
+
+def calendar_feed(request, token):
+    """iCalendar feed for calendar apps; the signed token stands in for a login"""
+    try:
+        room = feeds.room_for_token(token)
+    except signing.BadSignature:
+        raise Http404('Unknown calendar feed')
+    room_id = None if room == feeds.VENUE else room
+    response = _serve_rendering(request, feeds.ical_feed(room_id), 'text/calendar; charset=utf-8')
+    response['Content-Disposition'] = 'inline; filename="conference.ics"'
+    return response
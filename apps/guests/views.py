@@ -2,7 +2,7 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from apps.users.decorators import receptionist_required
-from django.db.models import Q, Count, Sum, Min, Max
+from django.db.models import Q, Count, Sum, Min, Max, ProtectedError
 from django.core.paginator import Paginator
 from .models import Guest, GuestPreference, GuestDocument
 from apps.bookings.models import Booking, CheckIn, CheckOut
@@ -386,7 +386,11 @@ def guest_delete(request, pk):
     
     if request.method == 'POST':
         name = guest.full_name
-        guest.delete()
+        try:
+            guest.delete()
+        except ProtectedError:
+            messages.error(request, f'Cannot delete guest {name}. Their stays have folios with posted entries.')
+            return redirect('guest_detail', pk=guest.pk)
         messages.success(request, f'Guest {name} deleted successfully.')
         return redirect('guest_list')
     
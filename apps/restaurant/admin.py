@@ -1,15 +1,17 @@
+from django import forms
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import MenuCategory, MenuItem, Table, TableReservation, Order, OrderItem, RestaurantInvoice, RestaurantInvoiceItem, Transaction
+from . import seating
+from .models import MenuCategory, MenuItem, Table, TableReservation, Order, OrderItem, RestaurantInvoice, RestaurantInvoiceItem, Transaction, DailyClose, MenuItemSales, MenuItemPair, KitchenForecast
 
 
 @admin.register(MenuCategory)
 class MenuCategoryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'display_order', 'is_active', 'created_at']
+    list_display = ['name', 'display_order', 'kitchen_capacity', 'is_active', 'created_at']
     list_filter = ['is_active', 'created_at']
     search_fields = ['name', 'description']
     ordering = ['display_order', 'name']
-    list_editable = ['display_order', 'is_active']
+    list_editable = ['display_order', 'kitchen_capacity', 'is_active']
 
 
 @admin.register(MenuItem)
@@ -43,16 +45,41 @@ class MenuItemAdmin(admin.ModelAdmin):
 
 @admin.register(Table)
 class TableAdmin(admin.ModelAdmin):
-    list_display = ['table_number', 'capacity', 'location', 'status', 'is_active']
+    list_display = ['table_number', 'capacity', 'location', 'combine_group', 'status', 'is_active']
     list_filter = ['status', 'is_active', 'created_at']
     search_fields = ['table_number', 'location']
     ordering = ['table_number']
     list_editable = ['status', 'is_active']
 
 
+class TableReservationAdminForm(forms.ModelForm):
+    class Meta:
+        model = TableReservation
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        table = cleaned_data.get('table')
+        day = cleaned_data.get('reservation_date')
+        start_time = cleaned_data.get('reservation_time')
+        party_size = cleaned_data.get('party_size')
+        if cleaned_data.get('status') in seating.HOLDING_STATUSES and table and day and start_time and party_size:
+            tables = [table] + list(cleaned_data.get('joined_tables') or [])
+            table_ids = [t.pk for t in tables]
+            try:
+                seating.check_seating(tables, party_size, cleaned_data.get('duration_minutes'))
+                seating.check_tables(table_ids, day, start_time, party_size,
+                                     cleaned_data.get('duration_minutes'), exclude=self.instance.pk)
+            except (seating.SeatingError, seating.SeatingConflict) as e:
+                raise forms.ValidationError(str(e))
+        return cleaned_data
+
+
 @admin.register(TableReservation)
 class TableReservationAdmin(admin.ModelAdmin):
-    list_display = ['guest_name', 'table', 'reservation_date', 'reservation_time', 'party_size', 'status']
+    form = TableReservationAdminForm
+    list_display = ['guest_name', 'table', 'reservation_date', 'reservation_time', 'duration_minutes', 'party_size', 'status']
+    filter_horizontal = ['joined_tables']
     list_filter = ['status', 'reservation_date', 'table', 'created_at']
     search_fields = ['guest_name', 'guest_email', 'guest_phone', 'table__table_number']
     ordering = ['-reservation_date', '-reservation_time']
@@ -62,23 +89,23 @@ class TableReservationAdmin(admin.ModelAdmin):
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ['order_number', 'guest_name', 'table', 'total_amount', 'status', 'payment_status', 'created_at']
-    list_filter = ['status', 'payment_status', 'created_at', 'table']
-    search_fields = ['order_number', 'guest_name', 'guest_phone', 'table__table_number']
+    list_filter = ['status', 'payment_status', 'created_at', 'table', 'archived_at']
+    search_fields = ['order_number', 'client_key', 'guest_name', 'guest_phone', 'table__table_number']
     ordering = ['-created_at']
-    readonly_fields = ['order_number', 'created_at', 'updated_at']
+    readonly_fields = ['order_number', 'client_key', 'created_at', 'updated_at', 'room_charge_requested_at', 'archived_at']
     
     fieldsets = (
         ('Order Information', {
-            'fields': ('order_number', 'table', 'guest', 'room')
+            'fields': ('order_number', 'client_key', 'table', 'guest', 'room')
         }),
         ('Customer Details', {
             'fields': ('guest_name', 'guest_phone', 'special_instructions')
         }),
         ('Order Status', {
-            'fields': ('status', 'payment_status', 'total_amount')
+            'fields': ('status', 'payment_status', 'total_amount', 'room_charge_requested_at')
         }),
         ('Timestamps', {
-            'fields': ('created_at', 'updated_at'),
+            'fields': ('created_at', 'updated_at', 'archived_at'),
             'classes': ('collapse',)
         }),
     )
@@ -159,3 +186,74 @@ class TransactionAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(DailyClose)
+class DailyCloseAdmin(admin.ModelAdmin):
+    list_display = ['business_date', 'order_count', 'transaction_count', 'total_revenue', 'closed_at', 'closed_by']
+    date_hierarchy = 'business_date'
+    ordering = ['-business_date']
+
+    fieldsets = (
+        ('Close', {
+            'fields': ('business_date', 'closed_at', 'closed_by')
+        }),
+        ('Totals', {
+            'fields': ('order_count', 'transaction_count', 'total_revenue')
+        }),
+        ('Breakdowns', {
+            'fields': ('by_payment_method', 'by_table', 'by_server', 'by_category'),
+            'classes': ('collapse',)
+        }),
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(MenuItemSales)
+class MenuItemSalesAdmin(admin.ModelAdmin):
+    list_display = ['business_date', 'hour', 'menu_item', 'quantity', 'order_count', 'revenue']
+    list_filter = ['menu_item__category', 'menu_item__cuisine_type']
+    search_fields = ['menu_item__name']
+    date_hierarchy = 'business_date'
+    ordering = ['-business_date', 'hour']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(MenuItemPair)
+class MenuItemPairAdmin(admin.ModelAdmin):
+    list_display = ['item_a', 'item_b', 'order_count']
+    search_fields = ['item_a__name', 'item_b__name']
+    ordering = ['-order_count']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(KitchenForecast)
+class KitchenForecastAdmin(admin.ModelAdmin):
+    list_display = ['order', 'station', 'predicted_at', 'predicted_ready_at', 'ready_at', 'factor']
+    list_filter = ['station']
+    search_fields = ['order__order_number']
+    ordering = ['-predicted_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,266 @@
+"""
+Menu sales analytics.
+
+Reports never join ``OrderItem`` live. Orders are instead rolled up once,
+when they are served or billed: their items are added to ``MenuItemSales``
+(units, orders and revenue per menu item per hour) and every pair of distinct
+items on the same order bumps a ``MenuItemPair`` counter. The rollup works in
+batches like the archiver: a batch of pending orders is claimed with
+``SKIP LOCKED``, its items are grouped with one query, the counters are
+incremented with one insert-if-missing, one locking read and one
+``bulk_update`` per table, and the orders are stamped with
+``sales_rolled_up_at``. The stamp is bookkeeping only and writes no history.
+
+The rollup is queued when an order reaches a sold status, runs every few
+minutes from the beat schedule and can be run with
+``manage.py rollup_menu_sales``. An order is counted once; edits or
+cancellations after that are not taken back out.
+"""
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from itertools import combinations
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, ExtractHour, TruncDate
+from django.utils import timezone
+
+from .models import MenuItem, MenuItemPair, MenuItemSales, Order, OrderItem
+
+
+BATCH_SIZE = 500
+
+SOLD_STATUSES = ['served', 'billed']
+
+ZERO = Decimal('0.00')
+
+MONEY = models.DecimalField(max_digits=12, decimal_places=2)
+
+
+def pending_orders():
+    return Order.objects.filter(status__in=SOLD_STATUSES, sales_rolled_up_at__isnull=True)
+
+
+def rollup_menu_sales(batch_size=BATCH_SIZE, max_batches=None):
+    """Roll every pending order into the sales and pair counters, batch by batch.
+
+    Returns the number of orders rolled up.
+    """
+    rolled = batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            ids = list(
+                pending_orders()
+                .select_for_update(skip_locked=True, of=('self',))
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            _add_sales(ids)
+            _add_pairs(ids)
+            Order.objects.filter(pk__in=ids).update(sales_rolled_up_at=timezone.now())
+        rolled += len(ids)
+        batches += 1
+    return rolled
+
+
+def queue_rollup():
+    """Queue the rollup after the current transaction commits.
+
+    Without a Celery broker the scheduled ``rollup_menu_sales`` command picks
+    the orders up instead.
+    """
+    if not getattr(settings, 'CELERY_BROKER_URL', None):
+        return
+
+    def enqueue():
+        from .tasks import rollup_menu_sales as task
+        try:
+            task.delay()
+        except Exception:
+            # The beat schedule runs the rollup anyway; never fail an order update over it
+            pass
+
+    transaction.on_commit(enqueue)
+
+
+def order_status_changed(sender, instance, **kwargs):
+    """post_save receiver for Order: queue the rollup once the order is sold"""
+    if instance.status in SOLD_STATUSES and instance.sales_rolled_up_at is None:
+        queue_rollup()
+
+
+def _add_sales(order_ids):
+    rows = (
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .annotate(day=TruncDate('order__created_at'), hour=ExtractHour('order__created_at'))
+        .values('day', 'hour', 'menu_item_id')
+        .annotate(
+            quantity=Sum('quantity'),
+            orders=Count('order_id', distinct=True),
+            revenue=Sum(F('quantity') * F('unit_price'), output_field=MONEY),
+        )
+        .order_by()
+    )
+    increments = {
+        (row['day'], row['hour'], row['menu_item_id']): row
+        for row in rows
+    }
+    if not increments:
+        return
+
+    MenuItemSales.objects.bulk_create(
+        [MenuItemSales(business_date=day, hour=hour, menu_item_id=item) for day, hour, item in increments],
+        ignore_conflicts=True,
+    )
+    counters = MenuItemSales.objects.select_for_update().filter(
+        business_date__in={day for day, _, _ in increments},
+        menu_item_id__in={item for _, _, item in increments},
+    )
+    changed = []
+    for counter in counters:
+        row = increments.get((counter.business_date, counter.hour, counter.menu_item_id))
+        if row is None:
+            continue
+        counter.quantity += row['quantity']
+        counter.order_count += row['orders']
+        counter.revenue += row['revenue'] or ZERO
+        changed.append(counter)
+    MenuItemSales.objects.bulk_update(changed, ['quantity', 'order_count', 'revenue'], batch_size=BATCH_SIZE)
+
+
+def _add_pairs(order_ids):
+    items_by_order = {}
+    for order_id, item_id in (
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .values_list('order_id', 'menu_item_id').distinct().order_by()
+    ):
+        items_by_order.setdefault(order_id, set()).add(item_id)
+
+    increments = Counter()
+    for items in items_by_order.values():
+        increments.update(combinations(sorted(items), 2))
+    if not increments:
+        return
+
+    MenuItemPair.objects.bulk_create(
+        [MenuItemPair(item_a_id=a, item_b_id=b) for a, b in increments],
+        ignore_conflicts=True,
+    )
+    counters = MenuItemPair.objects.select_for_update().filter(
+        item_a_id__in={a for a, _ in increments},
+        item_b_id__in={b for _, b in increments},
+    )
+    changed = []
+    for counter in counters:
+        n = increments.get((counter.item_a_id, counter.item_b_id))
+        if n:
+            counter.order_count += n
+            changed.append(counter)
+    MenuItemPair.objects.bulk_update(changed, ['order_count'], batch_size=BATCH_SIZE)
+
+
+def default_period():
+    today = timezone.localdate()
+    return today - timedelta(days=29), today
+
+
+def sales_report(start_date, end_date, limit=10):
+    """Menu engineering figures for start_date..end_date (inclusive), from the rollup tables only"""
+    sales = MenuItemSales.objects.filter(business_date__range=(start_date, end_date))
+    in_period = Q(sales__business_date__range=(start_date, end_date))
+
+    top_sellers = (
+        sales.values('menu_item_id', 'menu_item__name', 'menu_item__category__name')
+        .annotate(quantity=Sum('quantity'), orders=Sum('order_count'), revenue=Sum('revenue'))
+        .order_by('-quantity', '-revenue')[:limit]
+    )
+
+    slow_movers = (
+        MenuItem.objects.filter(is_available=True)
+        .annotate(quantity=Coalesce(Sum('sales__quantity', filter=in_period), 0))
+        .order_by('quantity', 'name')
+        .values('id', 'name', 'category__name', 'quantity')[:limit]
+    )
+
+    by_category = (
+        sales.values('business_date', 'menu_item__category__name')
+        .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'))
+        .order_by('business_date', 'menu_item__category__name')
+    )
+    by_cuisine_hour = (
+        sales.values('hour', 'menu_item__cuisine_type')
+        .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'))
+        .order_by('hour', 'menu_item__cuisine_type')
+    )
+
+    # Pair counts are all-time, so attach rates are measured against all-time order counts
+    top_pairs = list(MenuItemPair.objects.select_related('item_a', 'item_b').order_by('-order_count')[:limit])
+    lifetime_orders = {}
+    if top_pairs:
+        lifetime_orders = dict(
+            MenuItemSales.objects
+            .filter(menu_item_id__in={p.item_a_id for p in top_pairs} | {p.item_b_id for p in top_pairs})
+            .values('menu_item_id').annotate(orders=Sum('order_count'))
+            .values_list('menu_item_id', 'orders').order_by()
+        )
+    pairs = [
+        {
+            'item_a': pair.item_a.name,
+            'item_b': pair.item_b.name,
+            'orders': pair.order_count,
+            'attach_a_to_b': _rate(pair.order_count, lifetime_orders.get(pair.item_a_id)),
+            'attach_b_to_a': _rate(pair.order_count, lifetime_orders.get(pair.item_b_id)),
+        }
+        for pair in top_pairs
+    ]
+
+    cuisine_labels = dict(MenuItem.CUISINE_CHOICES)
+    return {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'top_sellers': [_item_row(row) for row in top_sellers],
+        'slow_movers': [
+            {'id': row['id'], 'name': row['name'], 'category': row['category__name'], 'quantity': row['quantity']}
+            for row in slow_movers
+        ],
+        'attach_rates': pairs,
+        'by_category_day': [
+            {
+                'date': row['business_date'].isoformat(),
+                'category': row['menu_item__category__name'],
+                'quantity': row['quantity'],
+                'revenue': str(row['revenue']),
+            }
+            for row in by_category
+        ],
+        'by_cuisine_hour': [
+            {
+                'hour': row['hour'],
+                'cuisine': cuisine_labels.get(row['menu_item__cuisine_type'], row['menu_item__cuisine_type']),
+                'quantity': row['quantity'],
+                'revenue': str(row['revenue']),
+            }
+            for row in by_cuisine_hour
+        ],
+    }
+
+
+def _item_row(row):
+    return {
+        'id': row['menu_item_id'],
+        'name': row['menu_item__name'],
+        'category': row['menu_item__category__name'],
+        'quantity': row['quantity'],
+        'orders': row['orders'],
+        'revenue': str(row['revenue']),
+    }
+
+
+def _rate(together, orders):
+    if not orders:
+        return 0
+    return round(together * 100 / orders, 1)
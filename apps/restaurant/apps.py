@@ -5,3 +5,25 @@ class RestaurantConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.restaurant'
     verbose_name = 'Restaurant'
+
+    def ready(self):
+        from django.db.models.signals import post_save, post_delete
+        from .analytics import order_status_changed
+        from .kitchen import order_changed, order_item_changed
+        from .models import MenuCategory, MenuItem, Order, OrderItem
+        from .publication import invalidate_menu
+
+        # Served and billed orders are rolled into the menu sales counters off the request path
+        post_save.connect(order_status_changed, sender=Order, dispatch_uid='restaurant_order_sales_rollup')
+
+        # Push ticket deltas to the kitchen display
+        post_save.connect(order_changed, sender=Order, dispatch_uid='restaurant_kitchen_order_saved')
+        post_delete.connect(order_changed, sender=Order, dispatch_uid='restaurant_kitchen_order_deleted')
+        post_save.connect(order_item_changed, sender=OrderItem, dispatch_uid='restaurant_kitchen_item_saved')
+        post_delete.connect(order_item_changed, sender=OrderItem, dispatch_uid='restaurant_kitchen_item_deleted')
+
+        # New published menu version whenever an item or category changes
+        post_save.connect(invalidate_menu, sender=MenuItem, dispatch_uid='restaurant_menu_item_saved')
+        post_delete.connect(invalidate_menu, sender=MenuItem, dispatch_uid='restaurant_menu_item_deleted')
+        post_save.connect(invalidate_menu, sender=MenuCategory, dispatch_uid='restaurant_menu_category_saved')
+        post_delete.connect(invalidate_menu, sender=MenuCategory, dispatch_uid='restaurant_menu_category_deleted')
@@ -0,0 +1,125 @@
+"""
+Bulk removal of finished restaurant orders.
+
+Deleting orders one by one lets Django collect every related row per order
+and write a history row per object from the ``post_delete`` signal, which
+for month-end cleanups of thousands of billed orders runs for minutes.
+``remove_orders`` instead works on the whole selection in one transaction:
+the selection is read (and locked) with one query, which also decides what
+can be removed and what is reported back, and the removal then runs in
+chunks of ``CHUNK_SIZE`` orders with one statement per related table.
+
+Archiving marks the orders with ``archived_at`` exactly like
+``billing.archiver`` does. Deleting removes the orders together with
+everything ``on_delete`` would cascade to (items, restaurant invoices and
+their items, billing invoices with their items and payments, kitchen
+forecasts) and clears the links that would have been set to NULL. Deletion
+history rows are written with one bulk insert per model, so the audit trail
+matches what a one-by-one delete would have left.
+
+Only cancelled or billed orders are removed. They are no longer on the
+kitchen display, so no kitchen events are published for them.
+"""
+from collections import namedtuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.billing.models import DiscountRedemption, FolioEntry, Invoice, InvoiceItem, Payment
+
+from .models import KitchenForecast, Order, OrderItem, RestaurantInvoice, RestaurantInvoiceItem, Transaction
+
+
+CHUNK_SIZE = 500
+
+REMOVABLE_STATUSES = ['cancelled', 'billed']
+
+DELETE_REASON = 'Deleted in bulk'
+ARCHIVE_REASON = 'Archived in bulk'
+
+Removal = namedtuple('Removal', 'removed blocked')
+
+
+def remove_orders(order_ids, user=None, archive=False, chunk_size=CHUNK_SIZE):
+    """Delete (or archive) the cancelled and billed orders among order_ids.
+
+    Returns the order numbers that were removed and those that were not
+    because of their status.
+    """
+    with transaction.atomic():
+        selection = list(
+            Order.objects.select_for_update()
+            .filter(pk__in=order_ids)
+            .order_by('pk')
+            .values_list('pk', 'order_number', 'status', 'archived_at')
+        )
+        removable = [row for row in selection if row[2] in REMOVABLE_STATUSES]
+        if archive:
+            removable = [row for row in removable if row[3] is None]
+        ids = [row[0] for row in removable]
+        now = timezone.now()
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            if archive:
+                _archive(chunk, user, now)
+            else:
+                _delete(chunk, user, now)
+
+    return Removal(
+        removed=[row[1] for row in removable],
+        blocked=[row[1] for row in selection if row[2] not in REMOVABLE_STATUSES],
+    )
+
+
+def _archive(ids, user, now):
+    Order.objects.filter(pk__in=ids).update(archived_at=now)
+    Order.history.bulk_history_create(
+        Order.objects.filter(pk__in=ids),
+        update=True,
+        default_user=user,
+        default_change_reason=ARCHIVE_REASON,
+        default_date=now,
+    )
+
+
+def _delete(ids, user, now):
+    restaurant_invoices = RestaurantInvoice.objects.filter(order_id__in=ids)
+    billing_invoices = Invoice.objects.filter(order_id__in=ids)
+
+    # Links that on_delete=SET_NULL would have cleared
+    Transaction.objects.filter(order_id__in=ids).update(order=None)
+    Transaction.objects.filter(invoice__in=restaurant_invoices).update(invoice=None)
+    FolioEntry.objects.filter(order_id__in=ids).update(order=None)
+    DiscountRedemption.objects.filter(invoice__in=billing_invoices).update(invoice=None)
+
+    # Children before parents, as the cascade would
+    _delete_with_history(RestaurantInvoiceItem.objects.filter(invoice__order_id__in=ids), user, now)
+    _delete_with_history(RestaurantInvoice.objects.filter(order_id__in=ids), user, now)
+    _delete_with_history(InvoiceItem.objects.filter(invoice__order_id__in=ids), user, now)
+    _delete_with_history(Payment.objects.filter(invoice__order_id__in=ids), user, now)
+    _delete_with_history(Invoice.objects.filter(order_id__in=ids), user, now)
+    _delete_with_history(OrderItem.objects.filter(order_id__in=ids), user, now)
+    KitchenForecast.objects.filter(order_id__in=ids)._raw_delete(KitchenForecast.objects.db)
+    _delete_with_history(Order.objects.filter(pk__in=ids), user, now)
+
+
+def _delete_with_history(queryset, user, now):
+    """Write '-' history rows for queryset in one insert, then delete it with one statement"""
+    model = queryset.model
+    history_model = model.history.model
+    fields = [field.attname for field in history_model.tracked_fields]
+    rows = [
+        history_model(
+            history_date=now,
+            history_type='-',
+            history_user=user,
+            history_change_reason=DELETE_REASON,
+            **{name: getattr(obj, name) for name in fields}
+        )
+        for obj in queryset.order_by()
+    ]
+    if not rows:
+        return 0
+    history_model.objects.bulk_create(rows, batch_size=CHUNK_SIZE)
+    # No signals: the history is written above and nothing else listens for these deletes
+    return queryset._raw_delete(queryset.db)
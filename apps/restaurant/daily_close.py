@@ -0,0 +1,177 @@
+"""
+Restaurant end-of-day close (Z-report).
+
+Closing a business date groups that day's ``Transaction`` rows by payment
+method, table and server (the ``created_by`` of the order) and the matching
+order items by menu category, one grouped query each, and freezes the result
+in a ``DailyClose`` row. Closed days are never aggregated again.
+
+Days are closed strictly in order: ``close_through`` closes every day after
+the latest close up to the requested date, so the closed days always form one
+unbroken run. Everything after the latest close is the live period, which in
+normal operation is just today. Revenue figures for any date range are
+therefore one sum over ``DailyClose`` plus, only when the range reaches into
+the live period, one aggregate over the live transactions; the cost depends
+on the size of today, not on the size of the history.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import DailyClose, OrderItem, Transaction
+
+
+ZERO = Decimal('0.00')
+
+MONEY = models.DecimalField(max_digits=12, decimal_places=2)
+
+PAYMENT_METHOD_LABELS = dict(Transaction._meta.get_field('payment_method').choices)
+
+
+def default_business_date():
+    """The close normally runs after midnight and closes the previous day"""
+    return timezone.localdate() - timedelta(days=1)
+
+
+def day_start(day):
+    """Aware datetime at the start of a local calendar day"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def latest_closed_date():
+    return DailyClose.objects.order_by('-business_date').values_list('business_date', flat=True).first()
+
+
+def close_through(business_date=None, user=None):
+    """Close every unclosed day up to and including business_date.
+
+    Returns the DailyClose rows created, oldest first; an empty list when the
+    date was already closed. Today and later cannot be closed.
+    """
+    if business_date is None:
+        business_date = default_business_date()
+    if business_date >= timezone.localdate():
+        raise ValueError("Only past business dates can be closed")
+
+    closes = []
+    with transaction.atomic():
+        # Serialises concurrent runs: the second waits here and then sees the new closes
+        last = (
+            DailyClose.objects.select_for_update()
+            .order_by('-business_date').values_list('business_date', flat=True).first()
+        )
+        if last is not None:
+            day = last + timedelta(days=1)
+        else:
+            first = Transaction.objects.order_by('created_at').values_list('created_at', flat=True).first()
+            day = timezone.localtime(first).date() if first else business_date
+
+        while day <= business_date:
+            closes.append(DailyClose.objects.create(
+                business_date=day,
+                closed_at=timezone.now(),
+                closed_by=user,
+                **compute_totals(day_start(day), day_start(day + timedelta(days=1))),
+            ))
+            day += timedelta(days=1)
+    return closes
+
+
+def compute_totals(start, end=None):
+    """Grouped revenue totals for transactions created in [start, end)"""
+    transactions = Transaction.objects.filter(created_at__gte=start)
+    if end is not None:
+        transactions = transactions.filter(created_at__lt=end)
+    transactions = transactions.order_by()
+
+    by_payment_method = _breakdown(
+        transactions, 'payment_method',
+        label=lambda row: PAYMENT_METHOD_LABELS.get(row['payment_method']) or 'Unspecified',
+    )
+    by_table = _breakdown(
+        transactions, 'table_number',
+        label=lambda row: f"Table {row['table_number']}" if row['table_number'] else 'No table',
+    )
+    by_server = _breakdown(
+        transactions, 'order__created_by', 'order__created_by__username',
+        label=lambda row: row['order__created_by__username'] or 'Unassigned',
+    )
+    by_category = _breakdown(
+        OrderItem.objects.filter(order_id__in=transactions.values('order_id')).order_by(),
+        'menu_item__category', 'menu_item__category__name',
+        label=lambda row: row['menu_item__category__name'],
+        count=Sum('quantity'),
+        amount=Sum(F('quantity') * F('unit_price'), output_field=MONEY),
+    )
+    order_count = transactions.exclude(order__isnull=True).aggregate(n=Count('order', distinct=True))['n']
+
+    return {
+        'transaction_count': sum(row['count'] for row in by_payment_method),
+        'order_count': order_count,
+        'total_revenue': sum((Decimal(row['amount']) for row in by_payment_method), ZERO),
+        'by_payment_method': by_payment_method,
+        'by_table': by_table,
+        'by_server': by_server,
+        'by_category': by_category,
+    }
+
+
+def _breakdown(queryset, key, *extra, label, count=None, amount=None):
+    """One GROUP BY query turned into JSON-ready rows, largest amount first"""
+    rows = (
+        queryset.values(key, *extra)
+        .annotate(count=count or Count('pk'), amount=amount or Sum('amount'))
+        .order_by('-amount')
+    )
+    return [
+        {
+            'key': row[key],
+            'label': label(row),
+            'count': row['count'] or 0,
+            'amount': str(row['amount'] or ZERO),
+        }
+        for row in rows
+    ]
+
+
+def revenue_between(start_date=None, end_date=None):
+    """Restaurant revenue for transactions dated start_date..end_date inclusive.
+
+    Either bound may be None for an open range. Closed days are read from
+    DailyClose; only the part of the range after the latest close is
+    aggregated from Transaction.
+    """
+    last = latest_closed_date()
+    total = ZERO
+
+    if last is not None and (start_date is None or start_date <= last):
+        closes = DailyClose.objects.all()
+        if start_date is not None:
+            closes = closes.filter(business_date__gte=start_date)
+        if end_date is not None:
+            closes = closes.filter(business_date__lte=end_date)
+        total += closes.aggregate(total=Sum('total_revenue'))['total'] or ZERO
+
+    live_from = last + timedelta(days=1) if last is not None else None
+    if start_date is not None and (live_from is None or start_date > live_from):
+        live_from = start_date
+    if end_date is not None and live_from is not None and live_from > end_date:
+        return total
+
+    live = Transaction.objects.all()
+    if live_from is not None:
+        live = live.filter(created_at__gte=day_start(live_from))
+    if end_date is not None:
+        live = live.filter(created_at__lt=day_start(end_date + timedelta(days=1)))
+    total += live.aggregate(total=Sum('amount'))['total'] or ZERO
+    return total
+
+
+def live_totals():
+    """Breakdowns for everything not yet closed (normally just today)"""
+    last = latest_closed_date()
+    start = day_start(last + timedelta(days=1)) if last is not None else day_start(timezone.localdate())
+    return compute_totals(start)
@@ -0,0 +1,194 @@
+"""
+Kitchen load model and order ETAs.
+
+Each station (menu category) cooks ``kitchen_capacity`` order lines at once,
+and a line takes its menu item's ``preparation_time`` whatever the quantity.
+The in-flight lines of every placed or preparing order are held in a
+per-process ``KitchenLoad`` tagged with the id of the newest kitchen event
+(see ``restaurant.kitchen``). Forecasting an order reads that id with one
+indexed query and rebuilds the load with one more only when the event feed
+has moved on or the load is older than ``MAX_AGE``.
+
+A forecast replays the queue of every station the new order needs: lines
+already being prepared first, then placed lines oldest first, then the new
+order, each taking the first free place at its station. The order is ready
+when its last line is; that line's station is stored as the bottleneck.
+
+When an order reaches ready (or is served without passing ready) the actual
+time is stored next to the prediction. Each station's durations are scaled
+by the median actual/predicted ratio of its recent forecasts, so the model
+corrects itself as the kitchen speeds up or falls behind.
+"""
+import heapq
+import time
+from collections import namedtuple
+from datetime import timedelta
+from statistics import median
+
+from django.utils import timezone
+
+from . import kitchen
+from .models import KitchenForecast, MenuCategory, Order, OrderItem
+
+
+QUEUED_STATUSES = ['placed', 'preparing']
+DONE_STATUSES = ['ready', 'served', 'billed']
+
+MAX_AGE = 30
+FACTOR_MAX_AGE = 300
+FACTOR_SAMPLES = 50
+FACTOR_BOUNDS = (0.5, 3.0)
+DEFAULT_CAPACITY = 1
+
+Line = namedtuple('Line', 'order_id station_id queued_at minutes preparing')
+
+Forecast = namedtuple('Forecast', 'ready_at station_id factor')
+
+
+class KitchenLoad:
+    """In-flight order lines per station, as of one point in the event feed"""
+
+    def __init__(self, event_id, lines, capacities):
+        self.event_id = event_id
+        self.built_at = time.monotonic()
+        self.capacities = capacities
+        self.lines = {}
+        for line in lines:
+            self.lines.setdefault(line.station_id, []).append(line)
+        for station_lines in self.lines.values():
+            # Lines on the stove go first, then the queue in arrival order
+            station_lines.sort(key=lambda line: (not line.preparing, line.queued_at, line.order_id))
+
+    @classmethod
+    def build(cls, event_id):
+        rows = (
+            OrderItem.objects.filter(order__status__in=QUEUED_STATUSES)
+            .values_list('order_id', 'menu_item__category_id', 'order__created_at',
+                         'menu_item__preparation_time', 'order__status')
+        )
+        lines = [
+            Line(order_id, station_id, queued_at, minutes or 0, status == 'preparing')
+            for order_id, station_id, queued_at, minutes, status in rows
+        ]
+        capacities = dict(MenuCategory.objects.values_list('pk', 'kitchen_capacity'))
+        return cls(event_id, lines, capacities)
+
+    def forecast(self, new_lines, now, factors):
+        """Ready time of an order made of new_lines (station_id, minutes), given the current load"""
+        if not new_lines:
+            return Forecast(now, None, 1.0)
+        order_ids = {line.order_id for line in new_lines}
+        finish = []
+        for station_id in {line.station_id for line in new_lines}:
+            factor = factors.get(station_id, 1.0)
+            free_at = [now] * max(self.capacities.get(station_id, DEFAULT_CAPACITY), 1)
+            for line in self.lines.get(station_id, []):
+                if line.order_id in order_ids:
+                    continue
+                start = heapq.heappop(free_at)
+                duration = timedelta(minutes=line.minutes * factor)
+                if line.preparing:
+                    # Already cooking: count only what is left, at least a minute
+                    duration = max(line.queued_at + duration - now, timedelta(minutes=1))
+                heapq.heappush(free_at, start + duration)
+            for line in new_lines:
+                if line.station_id != station_id:
+                    continue
+                start = heapq.heappop(free_at)
+                done = start + timedelta(minutes=line.minutes * factor)
+                heapq.heappush(free_at, done)
+                finish.append((done, station_id))
+        ready_at, station_id = max(finish)
+        return Forecast(ready_at, station_id, factors.get(station_id, 1.0))
+
+
+_load = None
+_factors = (0, {})
+
+
+def current_load():
+    """The cached KitchenLoad, rebuilt when the event feed moved or it got too old"""
+    global _load
+    event_id = kitchen.latest_event_id()
+    if (_load is None or _load.event_id != event_id
+            or time.monotonic() - _load.built_at > MAX_AGE):
+        _load = KitchenLoad.build(event_id)
+    return _load
+
+
+def correction_factors():
+    """Median actual/uncorrected-predicted ratio of recent forecasts per bottleneck station"""
+    global _factors
+    if time.monotonic() - _factors[0] > FACTOR_MAX_AGE:
+        samples = {}
+        rows = (
+            KitchenForecast.objects.filter(ready_at__isnull=False, station__isnull=False)
+            .order_by('-ready_at')
+            .values_list('station_id', 'predicted_at', 'predicted_ready_at', 'ready_at', 'factor')[:FACTOR_SAMPLES * 20]
+        )
+        for station_id, predicted_at, predicted_ready_at, ready_at, factor in rows:
+            station_samples = samples.setdefault(station_id, [])
+            predicted = (predicted_ready_at - predicted_at).total_seconds()
+            if len(station_samples) < FACTOR_SAMPLES and predicted > 0:
+                # Measure against the prediction the plain preparation times would have given
+                station_samples.append(factor * (ready_at - predicted_at).total_seconds() / predicted)
+        low, high = FACTOR_BOUNDS
+        _factors = (time.monotonic(), {
+            station_id: min(max(median(ratios), low), high)
+            for station_id, ratios in samples.items() if ratios
+        })
+    return _factors[1]
+
+
+def forecast_order(order_id):
+    """Predict and store the ready time of a newly placed order; returns the KitchenForecast"""
+    now = timezone.now()
+    new_lines = [
+        Line(order_id, station_id, now, minutes or 0, False)
+        for station_id, minutes in OrderItem.objects.filter(order_id=order_id)
+        .values_list('menu_item__category_id', 'menu_item__preparation_time')
+    ]
+    predicted = current_load().forecast(new_lines, now, correction_factors())
+    forecast, _ = KitchenForecast.objects.get_or_create(
+        order_id=order_id,
+        defaults={
+            'station_id': predicted.station_id,
+            'predicted_at': now,
+            'predicted_ready_at': predicted.ready_at,
+            'factor': predicted.factor,
+        },
+    )
+    return forecast
+
+
+def observe(order_id):
+    """Forecast an order when it is first seen placed; record when it is actually ready"""
+    status = Order.objects.filter(pk=order_id).values_list('status', flat=True).first()
+    if status == 'placed':
+        if not KitchenForecast.objects.filter(order_id=order_id).exists():
+            forecast_order(order_id)
+    elif status in DONE_STATUSES:
+        KitchenForecast.objects.filter(order_id=order_id, ready_at__isnull=True).update(ready_at=timezone.now())
+
+
+def accuracy(days=7):
+    """Mean predicted and actual minutes per bottleneck station over the last few days"""
+    since = timezone.now() - timedelta(days=days)
+    stats = {}
+    for forecast in (
+        KitchenForecast.objects.filter(ready_at__gte=since).select_related('station')
+    ):
+        name = forecast.station.name if forecast.station else 'Unknown'
+        row = stats.setdefault(name, {'station': name, 'orders': 0, 'predicted': 0.0, 'actual': 0.0})
+        row['orders'] += 1
+        row['predicted'] += forecast.predicted_minutes
+        row['actual'] += forecast.actual_minutes
+    return [
+        {
+            'station': row['station'],
+            'orders': row['orders'],
+            'predicted_minutes': round(row['predicted'] / row['orders'], 1),
+            'actual_minutes': round(row['actual'] / row['orders'], 1),
+        }
+        for row in sorted(stats.values(), key=lambda row: row['station'])
+    ]
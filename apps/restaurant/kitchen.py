@@ -0,0 +1,156 @@
+"""
+Kitchen display queue.
+
+The display shows every placed, preparing and ready order as a ticket, oldest
+first, with its items grouped by station (the menu category). A screen loads
+the whole queue once and from then on only receives deltas.
+
+Deltas come from ``KitchenEvent``, an append-only table. Saving or deleting
+an ``Order`` or ``OrderItem`` publishes the order's ticket after the
+transaction commits, once per order however many rows changed, as one event
+holding the complete ticket (or a removal once the order leaves the queue).
+Publishing also lets ``restaurant.eta`` forecast new orders and record when
+orders are ready, so every ticket carries its predicted ready time.
+``restaurant.eta`` also tags its kitchen load with ``latest_event_id``.
+
+Clients follow the feed over server-sent events (``event_stream``), or by
+polling (``poll_events``) where EventSource is missing. Neither holds a
+connection open: production runs a couple of sync gunicorn workers, and a
+dozen screens each parked on one would block every other request. A
+response carries whatever is new after the client's last event id, read with
+one range query on the primary key, and returns at once. The stream then
+ends with a ``retry`` hint, so EventSource reconnects ``POLL_RETRY_MS``
+later by itself and resumes from Last-Event-ID.
+"""
+import json
+import threading
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import eta
+from .models import KitchenEvent, Order
+
+
+ACTIVE_STATUSES = ['placed', 'preparing', 'ready']
+
+POLL_RETRY_MS = 2000
+MAX_EVENTS = 200
+
+RETENTION = timedelta(days=2)
+
+_pending = threading.local()
+
+
+def ticket_queryset():
+    return (
+        Order.objects.filter(status__in=ACTIVE_STATUSES)
+        .select_related('table', 'forecast')
+        .prefetch_related('items__menu_item__category')
+        .order_by('created_at', 'pk')
+    )
+
+
+def serialize_ticket(order):
+    forecast = getattr(order, 'forecast', None)
+    return {
+        'id': order.pk,
+        'order_number': order.order_number,
+        'table': order.table.table_number,
+        'guest': order.guest_name,
+        'status': order.status,
+        'created_at': order.created_at.isoformat(),
+        'eta': forecast.predicted_ready_at.isoformat() if forecast else None,
+        'special_instructions': order.special_instructions,
+        'items': [
+            {
+                'id': item.pk,
+                'name': item.menu_item.name,
+                'quantity': item.quantity,
+                'station': item.menu_item.category.name,
+                'special_instructions': item.special_instructions,
+            }
+            for item in order.items.all()
+        ],
+    }
+
+
+def snapshot():
+    """The whole queue plus the id of the newest event it already reflects"""
+    # Read the id first: an event racing the ticket query is replayed, and replaying a full ticket is harmless
+    last_event_id = latest_event_id()
+    return {
+        'last_event_id': last_event_id,
+        'tickets': [serialize_ticket(order) for order in ticket_queryset()],
+    }
+
+
+def latest_event_id():
+    return KitchenEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def publish_ticket(order_id):
+    """Append the current state of one order to the feed"""
+    # Forecast new orders first so their ticket carries the ETA
+    eta.observe(order_id)
+    order = ticket_queryset().filter(pk=order_id).first()
+    if order is None:
+        payload = {'type': 'removed', 'order_id': order_id}
+    else:
+        payload = {'type': 'ticket', 'ticket': serialize_ticket(order)}
+    return KitchenEvent.objects.create(order_id=order_id, payload=payload)
+
+
+def queue_publish(order_id):
+    """Publish an order's ticket once the surrounding transaction commits, at most once per transaction"""
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        publish_ticket(order_id)
+        return
+    # A commit or rollback replaces run_on_commit with a new list, which starts a new pending set
+    hooks = connection.run_on_commit
+    if getattr(_pending, 'hooks', None) is not hooks:
+        _pending.hooks, _pending.order_ids = hooks, set()
+    if order_id in _pending.order_ids:
+        return
+    _pending.order_ids.add(order_id)
+    transaction.on_commit(lambda: publish_ticket(order_id))
+
+
+def order_changed(sender, instance, **kwargs):
+    """post_save/post_delete receiver for Order"""
+    queue_publish(instance.pk)
+
+
+def order_item_changed(sender, instance, **kwargs):
+    """post_save/post_delete receiver for OrderItem"""
+    queue_publish(instance.order_id)
+
+
+def events_after(last_id):
+    return list(
+        KitchenEvent.objects.filter(id__gt=last_id)
+        .order_by('id').values('id', 'payload')[:MAX_EVENTS]
+    )
+
+
+def event_stream(last_id):
+    """Server-sent events for everything after last_id; the client reconnects for more"""
+    yield f"retry: {POLL_RETRY_MS}\n\n"
+    for event in events_after(last_id):
+        yield f"id: {event['id']}\nevent: {event['payload']['type']}\ndata: {json.dumps(event['payload'])}\n\n"
+
+
+def poll_events(last_id):
+    """Polling fallback: the events after last_id, possibly none"""
+    events = events_after(last_id)
+    if events:
+        return {'last_event_id': events[-1]['id'], 'events': [event['payload'] for event in events]}
+    return {'last_event_id': last_id, 'events': []}
+
+
+def prune_events(older_than=RETENTION):
+    """Drop events no screen can still need; returns the number deleted"""
+    deleted, _ = KitchenEvent.objects.filter(created_at__lt=timezone.now() - older_than).delete()
+    return deleted
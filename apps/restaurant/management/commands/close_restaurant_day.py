@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.restaurant.daily_close import close_through, default_business_date
+
+
+class Command(BaseCommand):
+    help = "Close the restaurant day: freeze the Z-report for every open day up to the given date"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            help="Last business date to close (YYYY-MM-DD); defaults to yesterday",
+        )
+
+    def handle(self, *args, **options):
+        if options["date"]:
+            try:
+                business_date = datetime.strptime(options["date"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--date must be in YYYY-MM-DD format")
+        else:
+            business_date = default_business_date()
+
+        try:
+            closes = close_through(business_date)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if not closes:
+            self.stdout.write(self.style.WARNING(f"{business_date} was already closed."))
+            return
+
+        for close in closes:
+            self.stdout.write(
+                f"{close.business_date}: {close.order_count} order(s), "
+                f"{close.transaction_count} transaction(s), ${close.total_revenue}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Closed {len(closes)} day(s) through {business_date}."))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from apps.restaurant.analytics import rollup_menu_sales, BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Roll served and billed orders into the menu sales and item pair counters (for deployments without Celery beat)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Orders rolled up per transaction",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=None,
+            help="Stop after this many batches",
+        )
+
+    def handle(self, *args, **options):
+        rolled = rollup_menu_sales(options["batch_size"], options["max_batches"])
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {rolled} order(s)."))
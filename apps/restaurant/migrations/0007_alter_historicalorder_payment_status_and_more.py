@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0006_populate_existing_transactions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='historicalorder',
+            name='payment_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('paid', 'Paid'), ('charged_to_room', 'Charged to Room'), ('refunded', 'Refunded')], default='pending', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='historicalrestaurantinvoice',
+            name='payment_method',
+            field=models.CharField(blank=True, choices=[('cash', 'Cash'), ('card', 'Credit/Debit Card'), ('bank_transfer', 'Bank Transfer'), ('mobile_money', 'Mobile Money'), ('room_charge', 'Charge to Room'), ('other', 'Other')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='historicaltransaction',
+            name='payment_method',
+            field=models.CharField(blank=True, choices=[('cash', 'Cash'), ('card', 'Credit/Debit Card'), ('bank_transfer', 'Bank Transfer'), ('mobile_money', 'Mobile Money'), ('room_charge', 'Charge to Room'), ('other', 'Other')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='payment_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('paid', 'Paid'), ('charged_to_room', 'Charged to Room'), ('refunded', 'Refunded')], default='pending', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='restaurantinvoice',
+            name='payment_method',
+            field=models.CharField(blank=True, choices=[('cash', 'Cash'), ('card', 'Credit/Debit Card'), ('bank_transfer', 'Bank Transfer'), ('mobile_money', 'Mobile Money'), ('room_charge', 'Charge to Room'), ('other', 'Other')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='payment_method',
+            field=models.CharField(blank=True, choices=[('cash', 'Cash'), ('card', 'Credit/Debit Card'), ('bank_transfer', 'Bank Transfer'), ('mobile_money', 'Mobile Money'), ('room_charge', 'Charge to Room'), ('other', 'Other')], max_length=20),
+        ),
+    ]
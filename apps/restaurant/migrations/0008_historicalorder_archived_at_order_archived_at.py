@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0007_alter_historicalorder_payment_status_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalorder',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Set by the archiver once the order is billed and settled', null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Set by the archiver once the order is billed and settled', null=True),
+        ),
+    ]
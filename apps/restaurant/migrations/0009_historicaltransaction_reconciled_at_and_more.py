@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0008_historicalorder_archived_at_order_archived_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicaltransaction',
+            name='reconciled_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Set when the transaction is matched to a bank or card statement line', null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='reconciled_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Set when the transaction is matched to a bank or card statement line', null=True),
+        ),
+    ]
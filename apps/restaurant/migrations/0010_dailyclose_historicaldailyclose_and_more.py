@@ -0,0 +1,71 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import simple_history.models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('restaurant', '0009_historicaltransaction_reconciled_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyClose',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_date', models.DateField(unique=True)),
+                ('closed_at', models.DateTimeField()),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('by_payment_method', models.JSONField(blank=True, default=list)),
+                ('by_table', models.JSONField(blank=True, default=list)),
+                ('by_server', models.JSONField(blank=True, default=list)),
+                ('by_category', models.JSONField(blank=True, default=list)),
+                ('closed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='restaurant_daily_closes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Daily Close',
+                'verbose_name_plural': 'Daily Closes',
+                'ordering': ['-business_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='HistoricalDailyClose',
+            fields=[
+                ('id', models.BigIntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('business_date', models.DateField(db_index=True)),
+                ('closed_at', models.DateTimeField()),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('by_payment_method', models.JSONField(blank=True, default=list)),
+                ('by_table', models.JSONField(blank=True, default=list)),
+                ('by_server', models.JSONField(blank=True, default=list)),
+                ('by_category', models.JSONField(blank=True, default=list)),
+                ('history_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField(db_index=True)),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('closed_by', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'historical Daily Close',
+                'verbose_name_plural': 'historical Daily Closes',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': ('history_date', 'history_id'),
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['created_at'], name='restaurant_txn_created_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0010_dailyclose_historicaldailyclose_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalorder',
+            name='sales_rolled_up_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Set once the order is counted in the menu sales rollup', null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='sales_rolled_up_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Set once the order is counted in the menu sales rollup', null=True),
+        ),
+        migrations.CreateModel(
+            name='MenuItemSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_date', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales', to='restaurant.menuitem')),
+            ],
+            options={
+                'verbose_name': 'Menu Item Sales',
+                'verbose_name_plural': 'Menu Item Sales',
+                'ordering': ['-business_date', 'hour'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MenuItemPair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('item_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='restaurant.menuitem')),
+                ('item_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='restaurant.menuitem')),
+            ],
+            options={
+                'verbose_name': 'Menu Item Pair',
+                'verbose_name_plural': 'Menu Item Pairs',
+                'ordering': ['-order_count'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='menuitemsales',
+            constraint=models.UniqueConstraint(fields=('business_date', 'hour', 'menu_item'), name='unique_menu_item_sales_hour'),
+        ),
+        migrations.AddConstraint(
+            model_name='menuitempair',
+            constraint=models.UniqueConstraint(fields=('item_a', 'item_b'), name='unique_menu_item_pair'),
+        ),
+    ]
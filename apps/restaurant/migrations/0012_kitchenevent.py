@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0011_menuitemsales_menuitempair_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KitchenEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.BigIntegerField(help_text='Not a foreign key: removal events outlive the order')),
+                ('payload', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Kitchen Event',
+                'verbose_name_plural': 'Kitchen Events',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0012_kitchenevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalmenucategory',
+            name='kitchen_capacity',
+            field=models.PositiveSmallIntegerField(default=2, help_text='Dishes this station can prepare at the same time'),
+        ),
+        migrations.AddField(
+            model_name='menucategory',
+            name='kitchen_capacity',
+            field=models.PositiveSmallIntegerField(default=2, help_text='Dishes this station can prepare at the same time'),
+        ),
+        migrations.CreateModel(
+            name='KitchenForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('predicted_at', models.DateTimeField()),
+                ('predicted_ready_at', models.DateTimeField()),
+                ('factor', models.FloatField(default=1.0, help_text="Correction applied to the bottleneck station's preparation times")),
+                ('ready_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='forecast', to='restaurant.order')),
+                ('station', models.ForeignKey(blank=True, help_text='Station expected to finish last', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='restaurant.menucategory')),
+            ],
+            options={
+                'verbose_name': 'Kitchen Forecast',
+                'verbose_name_plural': 'Kitchen Forecasts',
+                'ordering': ['-predicted_at'],
+            },
+        ),
+    ]
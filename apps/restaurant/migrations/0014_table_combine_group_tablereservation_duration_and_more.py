@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0013_menucategory_kitchen_capacity_kitchenforecast_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicaltable',
+            name='combine_group',
+            field=models.CharField(blank=True, help_text='Tables sharing a group can be pushed together for larger parties', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='table',
+            name='combine_group',
+            field=models.CharField(blank=True, help_text='Tables sharing a group can be pushed together for larger parties', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='historicaltablereservation',
+            name='duration_minutes',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Leave empty to use the default for the party size', null=True),
+        ),
+        migrations.AddField(
+            model_name='tablereservation',
+            name='duration_minutes',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Leave empty to use the default for the party size', null=True),
+        ),
+        migrations.AddField(
+            model_name='tablereservation',
+            name='joined_tables',
+            field=models.ManyToManyField(blank=True, help_text='Further tables pushed together with the main table', related_name='joined_reservations', to='restaurant.table'),
+        ),
+        migrations.AddIndex(
+            model_name='tablereservation',
+            index=models.Index(fields=['reservation_date', 'reservation_time'], name='restaurant_resv_date_time_idx'),
+        ),
+    ]
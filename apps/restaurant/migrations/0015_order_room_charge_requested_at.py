@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0014_table_combine_group_tablereservation_duration_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalorder',
+            name='room_charge_requested_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text="Set when the order is to be posted to its room's folio", null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='room_charge_requested_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text="Set when the order is to be posted to its room's folio", null=True),
+        ),
+    ]
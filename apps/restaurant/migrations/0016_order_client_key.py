@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0015_order_room_charge_requested_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalorder',
+            name='client_key',
+            field=models.CharField(blank=True, db_index=True, help_text='Idempotency key from the POS tablet that took the order', max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='client_key',
+            field=models.CharField(blank=True, help_text='Idempotency key from the POS tablet that took the order', max_length=64, null=True, unique=True),
+        ),
+    ]
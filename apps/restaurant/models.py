@@ -1,3 +1,5 @@
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
 from django.db import models
 from django.conf import settings
 from simple_history.models import HistoricalRecords
@@ -8,6 +10,7 @@ class MenuCategory(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     display_order = models.PositiveIntegerField(default=0)
+    kitchen_capacity = models.PositiveSmallIntegerField(default=2, help_text='Dishes this station can prepare at the same time')
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     history = HistoricalRecords()
@@ -69,6 +72,8 @@ class Table(models.Model):
     table_number = models.CharField(max_length=10, unique=True)
     capacity = models.PositiveIntegerField()
     location = models.CharField(max_length=100, blank=True)  # e.g., "Garden View", "Window Side"
+    combine_group = models.CharField(max_length=50, blank=True,
+                                     help_text="Tables sharing a group can be pushed together for larger parties")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='available')
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -98,7 +103,11 @@ class TableReservation(models.Model):
     guest_email = models.EmailField(blank=True)
     reservation_date = models.DateField()
     reservation_time = models.TimeField()
+    duration_minutes = models.PositiveSmallIntegerField(null=True, blank=True,
+                                                        help_text="Leave empty to use the default for the party size")
     party_size = models.PositiveIntegerField()
+    joined_tables = models.ManyToManyField(Table, blank=True, related_name='joined_reservations',
+                                           help_text="Further tables pushed together with the main table")
     special_requests = models.TextField(blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_by = models.ForeignKey(
@@ -115,10 +124,22 @@ class TableReservation(models.Model):
         verbose_name = 'Table Reservation'
         verbose_name_plural = 'Table Reservations'
         ordering = ['-reservation_date', '-reservation_time']
+        indexes = [
+            models.Index(fields=['reservation_date', 'reservation_time'], name='restaurant_resv_date_time_idx'),
+        ]
 
     def __str__(self):
         return f"Reservation for {self.guest_name} - Table {self.table.table_number}"
 
+    @property
+    def starts_at(self):
+        return datetime.combine(self.reservation_date, self.reservation_time)
+
+    @property
+    def ends_at(self):
+        from .seating import default_duration
+        return self.starts_at + timedelta(minutes=self.duration_minutes or default_duration(self.party_size))
+
 
 class Order(models.Model):
     """Restaurant orders"""
@@ -134,10 +155,13 @@ class Order(models.Model):
     PAYMENT_STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('paid', 'Paid'),
+        ('charged_to_room', 'Charged to Room'),
         ('refunded', 'Refunded'),
     ]
     
     order_number = models.CharField(max_length=20, unique=True)
+    client_key = models.CharField(max_length=64, unique=True, null=True, blank=True,
+                                  help_text="Idempotency key from the POS tablet that took the order")
     table = models.ForeignKey(Table, on_delete=models.CASCADE, related_name='orders')
     guest = models.ForeignKey('guests.Guest', on_delete=models.SET_NULL, null=True, blank=True, related_name='restaurant_orders')
     room = models.ForeignKey('rooms.Room', on_delete=models.SET_NULL, null=True, blank=True, related_name='restaurant_orders')
@@ -155,6 +179,12 @@ class Order(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    archived_at = models.DateTimeField(null=True, blank=True, db_index=True,
+                                       help_text="Set by the archiver once the order is billed and settled")
+    sales_rolled_up_at = models.DateTimeField(null=True, blank=True, db_index=True,
+                                              help_text="Set once the order is counted in the menu sales rollup")
+    room_charge_requested_at = models.DateTimeField(null=True, blank=True, db_index=True,
+                                                    help_text="Set when the order is to be posted to its room's folio")
     history = HistoricalRecords()
 
     class Meta:
@@ -172,8 +202,8 @@ class Order(models.Model):
 
     def generate_order_number(self):
         """Generate unique order number"""
-        import uuid
-        return f"ORD-{uuid.uuid4().hex[:8].upper()}"
+        from apps.billing.numbering import next_number
+        return next_number('ORD')
 
     @property
     def order_type(self):
@@ -233,6 +263,7 @@ class RestaurantInvoice(models.Model):
         ('card', 'Credit/Debit Card'),
         ('bank_transfer', 'Bank Transfer'),
         ('mobile_money', 'Mobile Money'),
+        ('room_charge', 'Charge to Room'),
         ('other', 'Other'),
     ]
     
@@ -282,22 +313,22 @@ class RestaurantInvoice(models.Model):
         if not self.invoice_number:
             self.invoice_number = self.generate_invoice_number()
         
-        # Calculate tax and total
-        self.tax_amount = (self.subtotal * self.tax_rate) / 100
+        # Calculate tax and total, rounded to the cent like billing.pricing
+        self.tax_amount = (Decimal(self.subtotal) * Decimal(self.tax_rate) / 100).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
         self.total_amount = self.subtotal + self.tax_amount - self.discount_amount
         
         super().save(*args, **kwargs)
 
     def generate_invoice_number(self):
         """Generate unique invoice number"""
-        import uuid
-        return f"RINV-{uuid.uuid4().hex[:8].upper()}"
+        from apps.billing.numbering import next_number
+        return next_number('RINV')
 
     @property
     def is_overdue(self):
         """Check if invoice is overdue"""
         from django.utils import timezone
-        return self.status == 'sent' and self.due_date < timezone.now().date()
+        return self.status in ('sent', 'overdue') and self.due_date < timezone.now().date()
 
     @property
     def days_overdue(self):
@@ -356,12 +387,17 @@ class Transaction(models.Model):
         null=True,
         related_name='transactions_created'
     )
+    reconciled_at = models.DateTimeField(null=True, blank=True, db_index=True,
+                                         help_text="Set when the transaction is matched to a bank or card statement line")
     history = HistoricalRecords()
 
     class Meta:
         verbose_name = 'Transaction'
         verbose_name_plural = 'Transactions'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='restaurant_txn_created_idx'),
+        ]
 
     def __str__(self):
         return f"Transaction {self.transaction_id} - {self.customer_name} - ${self.amount}"
@@ -373,5 +409,128 @@ class Transaction(models.Model):
 
     def generate_transaction_id(self):
         """Generate unique transaction ID"""
-        import uuid
-        return f"TXN-{uuid.uuid4().hex[:8].upper()}"
+        from apps.billing.numbering import next_number
+        return next_number('TXN')
+
+
+class DailyClose(models.Model):
+    """Frozen end-of-day (Z) report for the restaurant, written by restaurant.daily_close"""
+    business_date = models.DateField(unique=True)
+    closed_at = models.DateTimeField()
+    closed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='restaurant_daily_closes'
+    )
+
+    transaction_count = models.PositiveIntegerField(default=0)
+    order_count = models.PositiveIntegerField(default=0)
+    total_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    # Each breakdown is a list of {"key", "label", "count", "amount"} rows, largest amount first
+    by_payment_method = models.JSONField(default=list, blank=True)
+    by_table = models.JSONField(default=list, blank=True)
+    by_server = models.JSONField(default=list, blank=True)
+    by_category = models.JSONField(default=list, blank=True)
+    history = HistoricalRecords()
+
+    class Meta:
+        verbose_name = 'Daily Close'
+        verbose_name_plural = 'Daily Closes'
+        ordering = ['-business_date']
+
+    def __str__(self):
+        return f"Restaurant close {self.business_date}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Daily close reports are frozen and cannot be changed")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Daily close reports are frozen and cannot be deleted")
+
+
+class MenuItemSales(models.Model):
+    """Units and revenue per menu item per hour, maintained by restaurant.analytics"""
+    business_date = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='sales')
+    quantity = models.PositiveIntegerField(default=0)
+    order_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Menu Item Sales'
+        verbose_name_plural = 'Menu Item Sales'
+        ordering = ['-business_date', 'hour']
+        constraints = [
+            models.UniqueConstraint(fields=['business_date', 'hour', 'menu_item'], name='unique_menu_item_sales_hour'),
+        ]
+
+    def __str__(self):
+        return f"{self.menu_item.name} {self.business_date} {self.hour:02d}:00 - {self.quantity}"
+
+
+class MenuItemPair(models.Model):
+    """Number of orders containing both items; item_a always has the lower id"""
+    item_a = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='+')
+    item_b = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='+')
+    order_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Menu Item Pair'
+        verbose_name_plural = 'Menu Item Pairs'
+        ordering = ['-order_count']
+        constraints = [
+            models.UniqueConstraint(fields=['item_a', 'item_b'], name='unique_menu_item_pair'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_a.name} + {self.item_b.name} - {self.order_count}"
+
+
+class KitchenEvent(models.Model):
+    """Append-only feed of ticket changes read by the kitchen display (see restaurant.kitchen)"""
+    order_id = models.BigIntegerField(help_text="Not a foreign key: removal events outlive the order")
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Kitchen Event'
+        verbose_name_plural = 'Kitchen Events'
+        ordering = ['id']
+
+    def __str__(self):
+        return f"Kitchen event {self.pk} - order {self.order_id}"
+
+
+class KitchenForecast(models.Model):
+    """Ready time predicted for an order when it was placed, and the time it was actually ready"""
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name='forecast')
+    station = models.ForeignKey(MenuCategory, on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+                                help_text="Station expected to finish last")
+    predicted_at = models.DateTimeField()
+    predicted_ready_at = models.DateTimeField()
+    factor = models.FloatField(default=1.0, help_text="Correction applied to the bottleneck station's preparation times")
+    ready_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Kitchen Forecast'
+        verbose_name_plural = 'Kitchen Forecasts'
+        ordering = ['-predicted_at']
+
+    def __str__(self):
+        return f"{self.order.order_number} ready by {self.predicted_ready_at:%H:%M}"
+
+    @property
+    def predicted_minutes(self):
+        return (self.predicted_ready_at - self.predicted_at).total_seconds() / 60
+
+    @property
+    def actual_minutes(self):
+        if self.ready_at is None:
+            return None
+        return (self.ready_at - self.predicted_at).total_seconds() / 60
@@ -0,0 +1,199 @@
+"""
+Order sync for the POS tablets.
+
+Tablets queue orders while offline and send them in batches. Every order
+carries a ``key`` generated on the tablet, stored as ``Order.client_key``
+(unique), so a batch can be re-sent after a dropped connection without
+creating anything twice: keys already in the database, or repeated within
+the batch, are answered with the order they already made.
+
+Items are checked against the menu with one query for the whole batch:
+only available items are accepted, always at their current price. Tables,
+rooms and guests are looked up with one query each as well. The accepted orders,
+their items and their history rows are then written with one bulk insert
+per model, the tables are marked occupied with one ``UPDATE``, and every new
+order is published to the kitchen display once the transaction commits.
+
+``sync_orders`` answers with one result per key: ``created``,
+``duplicate`` or ``rejected`` with the reasons.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from simple_history.utils import bulk_create_with_history
+
+from apps.billing.numbering import next_number
+from apps.guests.models import Guest
+from apps.rooms.models import Room
+
+from . import kitchen
+from .models import MenuItem, Order, OrderItem, Table
+
+
+MAX_ORDERS = 100
+MAX_KEY_LENGTH = 64
+
+CHANGE_REASON = 'POS sync'
+
+
+class SyncError(Exception):
+    """Raised when a batch cannot be read at all"""
+
+
+def sync_orders(batch, user=None):
+    """Create the orders in batch that are new and valid; returns {key: result}"""
+    if not isinstance(batch, list):
+        raise SyncError('orders must be a list')
+    if len(batch) > MAX_ORDERS:
+        raise SyncError(f'At most {MAX_ORDERS} orders per batch')
+    try:
+        return _sync(batch, user)
+    except IntegrityError:
+        # Another request created some of these keys after we looked; their orders are duplicates now
+        return _sync(batch, user)
+
+
+def _sync(batch, user):
+    results = {}
+    entries = {}
+    for entry in batch:
+        key = entry.get('key') if isinstance(entry, dict) else None
+        if not isinstance(key, str) or not key or len(key) > MAX_KEY_LENGTH:
+            raise SyncError(f'Every order needs a key of at most {MAX_KEY_LENGTH} characters')
+        # The first occurrence of a key wins; repeats are answered with its result
+        entries.setdefault(key, entry)
+
+    for order_id, key, order_number, total in (
+        Order.objects.filter(client_key__in=entries).values_list('pk', 'client_key', 'order_number', 'total_amount')
+    ):
+        results[key] = _result('duplicate', order_id, order_number, total)
+        del entries[key]
+
+    tables = set(
+        Table.objects.filter(pk__in={_int(e.get('table')) for e in entries.values()}, is_active=True)
+        .values_list('pk', flat=True)
+    )
+    rooms = set(Room.objects.filter(pk__in={_int(e.get('room')) for e in entries.values()}).values_list('pk', flat=True))
+    guests = set(Guest.objects.filter(pk__in={_int(e.get('guest')) for e in entries.values()}).values_list('pk', flat=True))
+    menu_item_ids = {
+        _int(item.get('menu_item_id'))
+        for e in entries.values() if isinstance(e.get('items'), list)
+        for item in e['items'] if isinstance(item, dict)
+    }
+    prices = dict(MenuItem.objects.filter(pk__in=menu_item_ids, is_available=True).values_list('pk', 'price'))
+
+    orders, lines, repriced = [], [], {}
+    for key, entry in entries.items():
+        errors = _validate(entry, tables, rooms, guests, prices)
+        if errors:
+            results[key] = {'status': 'rejected', 'errors': errors}
+            continue
+        order = Order(
+            order_number=next_number('ORD'),
+            client_key=key,
+            table_id=_int(entry['table']),
+            room_id=_int(entry.get('room')),
+            guest_id=_int(entry.get('guest')),
+            guest_name=str(entry.get('guest_name') or '')[:200],
+            guest_phone=str(entry.get('guest_phone') or '')[:15],
+            special_instructions=str(entry.get('special_instructions') or ''),
+            created_by=user,
+        )
+        total = Decimal('0.00')
+        for item in entry['items']:
+            menu_item_id, quantity = _int(item['menu_item_id']), _int(item['quantity'])
+            price = prices[menu_item_id]
+            if 'unit_price' in item and _decimal(item['unit_price']) != price:
+                repriced.setdefault(key, []).append(menu_item_id)
+            lines.append((order, OrderItem(
+                menu_item_id=menu_item_id,
+                quantity=quantity,
+                unit_price=price,
+                special_instructions=str(item.get('special_instructions') or ''),
+            )))
+            total += quantity * price
+        order.total_amount = total
+        orders.append(order)
+
+    if orders:
+        with transaction.atomic():
+            bulk_create_with_history(orders, Order, default_user=user, default_change_reason=CHANGE_REASON)
+            for order, line in lines:
+                line.order_id = order.pk
+            bulk_create_with_history(
+                [line for _, line in lines], OrderItem, default_user=user, default_change_reason=CHANGE_REASON,
+            )
+            _occupy({order.table_id for order in orders}, user)
+            for order in orders:
+                kitchen.queue_publish(order.pk)
+
+    for order in orders:
+        results[order.client_key] = _result('created', order.pk, order.order_number, order.total_amount)
+        if order.client_key in repriced:
+            results[order.client_key]['repriced'] = repriced[order.client_key]
+    return {entry['key']: results[entry['key']] for entry in batch}
+
+
+def _validate(entry, tables, rooms, guests, prices):
+    errors = []
+    if _int(entry.get('table')) not in tables:
+        errors.append('Unknown or inactive table')
+    if entry.get('room') and _int(entry['room']) not in rooms:
+        errors.append('Unknown room')
+    if entry.get('guest') and _int(entry['guest']) not in guests:
+        errors.append('Unknown guest')
+    if not entry.get('guest_name'):
+        errors.append('guest_name is required')
+    items = entry.get('items')
+    if not isinstance(items, list) or not items:
+        errors.append('An order needs at least one item')
+        return errors
+    for item in items:
+        if not isinstance(item, dict):
+            errors.append('Malformed item')
+            continue
+        menu_item_id, quantity = _int(item.get('menu_item_id')), _int(item.get('quantity'))
+        if menu_item_id not in prices:
+            errors.append(f'Menu item {item.get("menu_item_id")} is not available')
+        if quantity is None or quantity < 1:
+            errors.append(f'Invalid quantity for menu item {item.get("menu_item_id")}')
+        if 'unit_price' in item and _decimal(item['unit_price']) is None:
+            errors.append(f'Invalid unit_price for menu item {item.get("menu_item_id")}')
+    return errors
+
+
+def _occupy(table_ids, user):
+    """Mark the tables occupied with one UPDATE and one bulk history insert"""
+    now = timezone.now()
+    tables = list(Table.objects.filter(pk__in=table_ids).exclude(status='occupied'))
+    if not tables:
+        return
+    Table.objects.filter(pk__in=[table.pk for table in tables]).update(status='occupied')
+    for table in tables:
+        table.status = 'occupied'
+    Table.history.bulk_history_create(
+        tables,
+        update=True,
+        default_user=user,
+        default_change_reason=CHANGE_REASON,
+        default_date=now,
+    )
+
+
+def _result(status, order_id, order_number, total):
+    return {'status': status, 'order_id': order_id, 'order_number': order_number, 'total': str(total)}
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _decimal(value):
+    try:
+        return Decimal(str(value))
+    except (ArithmeticError, ValueError):
+        return None
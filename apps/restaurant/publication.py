@@ -0,0 +1,83 @@
+"""
+Published menu for order-entry screens.
+
+The available menu is built once per menu version: the ``menu`` version
+from ``billing.versions`` is bumped whenever a MenuItem or MenuCategory is
+saved or deleted (see ``RestaurantConfig.ready``), the same way tax rates
+are versioned in ``billing.pricing``. The version lives in the database, so
+every worker sees a change and they all hand out the same ETag. Each process
+keeps the menu it built for the current version, so serving it costs one
+indexed read of the version row.
+
+Responses carry a strong ETag derived from the version (and the category
+filter), so screens that already hold the current menu get ``304 Not
+Modified`` without a body.
+"""
+import json
+
+from apps.billing import versions
+
+from .models import MenuItem
+
+
+VERSION_NAME = 'menu'
+
+_published = (None, None)
+
+
+class PublishedMenu:
+    """The available menu of one version, pre-serialised per category"""
+
+    def __init__(self, version, items):
+        self.version = version
+        self.items = items
+        self.by_category = {}
+        for item in items:
+            self.by_category.setdefault(str(item['category_id']), []).append(item)
+        self._bodies = {}
+
+    def etag(self, category_id=None):
+        if category_id:
+            return f'"{self.version}-{category_id}"'
+        return f'"{self.version}"'
+
+    def body(self, category_id=None):
+        """JSON body in the shape get_menu_items has always returned, cached per filter"""
+        key = category_id or ''
+        if key not in self._bodies:
+            items = self.by_category.get(str(category_id), []) if category_id else self.items
+            self._bodies[key] = json.dumps({'items': items, 'version': self.version})
+        return self._bodies[key]
+
+
+def menu_version():
+    return versions.current(VERSION_NAME).token
+
+
+def published_menu():
+    """The menu for the current version, built with one query when the version changes"""
+    global _published
+    version = menu_version()
+    if _published[0] != version:
+        menu_items = list(
+            MenuItem.objects.filter(is_available=True).select_related('category')
+            .order_by('category__display_order', 'category__name', 'name')
+        )
+        items = [
+            {
+                'id': item.id,
+                'name': item.name,
+                'price': float(item.price),
+                'description': item.description,
+                'category': item.category.name,
+                'category_id': item.category_id,
+            }
+            for item in menu_items
+        ]
+        _published = (version, PublishedMenu(version, items))
+    return _published[1]
+
+
+def invalidate_menu(**kwargs):
+    """Publish a new menu version; connected to MenuItem/MenuCategory post_save/post_delete"""
+    versions.bump(VERSION_NAME)
@@ -0,0 +1,182 @@
+"""
+Table reservation seating engine.
+
+A reservation holds its tables from ``reservation_time`` for
+``duration_minutes`` (or the default for its party size) plus a short
+turnover, so two reservations on the same table conflict when those
+intervals overlap. A ``SeatingPlan`` loads every live reservation around one
+day in a single query and keeps, per table, the sorted start and end times
+of its bookings (with a running maximum of the ends, so tables that are
+already double-booked are still handled); whether a table is free for an
+interval is then a binary search instead of a query.
+
+``best_tables`` answers "where do we seat a party of N at T" in one call:
+single tables first, then combinations of free tables from the same
+``combine_group``, ranked by fewest empty seats and then fewest tables.
+``reserve`` locks the chosen tables, re-checks them against the database and
+creates the reservation, so two hosts can never book the same table for the
+same time.
+"""
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+from itertools import accumulate, combinations
+
+from django.db import transaction
+
+from .models import Table, TableReservation
+
+
+# (largest party, minutes) - the first row that fits the party applies
+DEFAULT_DURATIONS = [
+    (2, 90),
+    (4, 105),
+    (6, 120),
+    (10, 150),
+]
+LARGE_PARTY_DURATION = 180
+
+TURNOVER_MINUTES = 15
+MAX_COMBINED_TABLES = 3
+
+HOLDING_STATUSES = ['pending', 'confirmed']
+UNAVAILABLE_TABLE_STATUSES = ['out_of_order']
+
+Option = namedtuple('Option', 'tables seats spare')
+
+
+class SeatingConflict(Exception):
+    """Raised when the requested tables are no longer free"""
+
+
+class SeatingError(Exception):
+    """Raised when a reservation could not be seated at its tables at all"""
+
+
+def default_duration(party_size):
+    for largest, minutes in DEFAULT_DURATIONS:
+        if party_size <= largest:
+            return minutes
+    return LARGE_PARTY_DURATION
+
+
+def interval(day, start_time, party_size, duration_minutes=None):
+    """The time a reservation holds its tables, turnover included"""
+    start = datetime.combine(day, start_time)
+    minutes = (duration_minutes or default_duration(party_size)) + TURNOVER_MINUTES
+    return start, start + timedelta(minutes=minutes)
+
+
+class SeatingPlan:
+    """Reservation intervals per table for one day (plus late bookings from the day before)"""
+
+    def __init__(self, day, exclude=None):
+        self.day = day
+        self.tables = list(
+            Table.objects.filter(is_active=True).exclude(status__in=UNAVAILABLE_TABLE_STATUSES)
+            .order_by('table_number')
+        )
+        self._starts = {}
+        self._latest_end = {}
+
+        reservations = (
+            TableReservation.objects
+            .filter(status__in=HOLDING_STATUSES,
+                    reservation_date__range=(day - timedelta(days=1), day + timedelta(days=1)))
+            .prefetch_related('joined_tables')
+        )
+        if exclude is not None:
+            reservations = reservations.exclude(pk=exclude)
+        held = defaultdict(list)
+        for reservation in reservations:
+            span = interval(reservation.reservation_date, reservation.reservation_time,
+                            reservation.party_size, reservation.duration_minutes)
+            held[reservation.table_id].append(span)
+            for table in reservation.joined_tables.all():
+                held[table.pk].append(span)
+        for table_id, spans in held.items():
+            spans.sort()
+            self._starts[table_id] = [start for start, _ in spans]
+            self._latest_end[table_id] = list(accumulate((end for _, end in spans), max))
+
+    def is_free(self, table_id, start, end):
+        """True when no reservation on the table overlaps [start, end)"""
+        starts = self._starts.get(table_id)
+        if not starts:
+            return True
+        # Every booking starting before our end must have finished by our start
+        i = bisect_left(starts, end)
+        return i == 0 or self._latest_end[table_id][i - 1] <= start
+
+    def best_tables(self, party_size, start_time, duration_minutes=None, limit=3):
+        """Up to ``limit`` seating options for the party, best first"""
+        start, end = interval(self.day, start_time, party_size, duration_minutes)
+        free = [table for table in self.tables if self.is_free(table.pk, start, end)]
+
+        options = [
+            Option((table,), table.capacity, table.capacity - party_size)
+            for table in free if table.capacity >= party_size
+        ]
+
+        groups = defaultdict(list)
+        for table in free:
+            if table.combine_group:
+                groups[table.combine_group].append(table)
+        for tables in groups.values():
+            for size in range(2, min(MAX_COMBINED_TABLES, len(tables)) + 1):
+                for combo in combinations(tables, size):
+                    seats = sum(table.capacity for table in combo)
+                    # Skip combinations that would still fit without one of their tables
+                    if seats >= party_size and seats - min(t.capacity for t in combo) < party_size:
+                        options.append(Option(combo, seats, seats - party_size))
+
+        options.sort(key=lambda option: (option.spare, len(option.tables), option.tables[0].table_number))
+        return options[:limit]
+
+    def conflicts(self, table_ids, day, start_time, party_size, duration_minutes=None):
+        """The given tables that are not free for the reservation"""
+        start, end = interval(day, start_time, party_size, duration_minutes)
+        return [table_id for table_id in table_ids if not self.is_free(table_id, start, end)]
+
+
+def check_tables(table_ids, day, start_time, party_size, duration_minutes=None, exclude=None):
+    """Raise SeatingConflict when any of the tables is already held for that time"""
+    busy = SeatingPlan(day, exclude=exclude).conflicts(table_ids, day, start_time, party_size, duration_minutes)
+    if busy:
+        numbers = Table.objects.filter(pk__in=busy).order_by('table_number').values_list('table_number', flat=True)
+        raise SeatingConflict(f"Table(s) {', '.join(numbers)} already reserved at that time")
+
+
+def check_seating(tables, party_size, duration_minutes=None):
+    """Raise SeatingError unless the tables are distinct, seat the party and the duration is positive"""
+    if not tables:
+        raise SeatingError('At least one table is required')
+    if len({table.pk for table in tables}) != len(tables):
+        raise SeatingError('Each table may only be given once')
+    seats = sum(table.capacity for table in tables)
+    if seats < party_size:
+        raise SeatingError(f'The tables seat {seats}, not a party of {party_size}')
+    if duration_minutes is not None and duration_minutes < 1:
+        raise SeatingError('Duration must be at least one minute')
+
+
+def reserve(tables, day, start_time, party_size, user=None, duration_minutes=None, **fields):
+    """Create a reservation on tables (the first is the main table) after locking and re-checking them"""
+    check_seating(tables, party_size, duration_minutes)
+    table_ids = [table.pk for table in tables]
+    with transaction.atomic():
+        # Locking the tables serialises every reservation that touches them
+        list(Table.objects.select_for_update().filter(pk__in=table_ids).order_by('pk'))
+        check_tables(table_ids, day, start_time, party_size, duration_minutes)
+        reservation = TableReservation.objects.create(
+            table=tables[0],
+            reservation_date=day,
+            reservation_time=start_time,
+            party_size=party_size,
+            duration_minutes=duration_minutes,
+            created_by=user,
+            **fields
+        )
+        if len(tables) > 1:
+            reservation.joined_tables.set(tables[1:])
+    return reservation
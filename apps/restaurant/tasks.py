@@ -0,0 +1,23 @@
+from celery import shared_task
+
+from . import analytics, kitchen
+from .daily_close import close_through
+
+
+@shared_task
+def close_restaurant_day():
+    """Freeze the Z-report for every open day up to yesterday; scheduled by CELERY_BEAT_SCHEDULE"""
+    closes = close_through()
+    return [close.business_date.isoformat() for close in closes]
+
+
+@shared_task
+def rollup_menu_sales():
+    """Roll served and billed orders into the menu sales counters; queued on sale and scheduled"""
+    return analytics.rollup_menu_sales()
+
+
+@shared_task
+def prune_kitchen_events():
+    """Drop kitchen display events older than the retention period; scheduled hourly"""
+    return kitchen.prune_events()
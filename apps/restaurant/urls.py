@@ -18,6 +18,8 @@ urlpatterns = [
     path('tables/create/', views.table_create, name='table_create'),
     path('tables/<int:pk>/edit/', views.table_edit, name='table_edit'),
     path('tables/<int:pk>/update-status/', views.table_update_status, name='table_update_status'),
+    path('tables/availability/', views.table_availability, name='table_availability'),
+    path('tables/reserve/', views.table_reserve, name='table_reserve'),
     
     # Order Management
     path('orders/', views.order_list, name='order_list'),
@@ -27,6 +29,7 @@ urlpatterns = [
     path('orders/<int:pk>/update-status/', views.order_update_status, name='order_update_status'),
     path('orders/<int:pk>/delete/', views.order_delete, name='order_delete'),
     path('orders/bulk-delete/', views.order_bulk_delete, name='order_bulk_delete'),
+    path('orders/<int:pk>/charge-to-room/', views.order_charge_to_room, name='order_charge_to_room'),
     path('orders/<int:order_id>/invoice/create/', views.restaurant_invoice_create_from_order, name='invoice_create_from_order'),
     path('orders/<int:order_id>/invoice/pay/', views.restaurant_invoice_start_payment, name='invoice_start_payment'),
     
@@ -43,7 +46,22 @@ urlpatterns = [
     path('billing/invoices/<int:pk>/update-status/', views.restaurant_invoice_update_status, name='invoice_update_status'),
     path('billing/invoices/<int:pk>/process-payment/', views.restaurant_invoice_process_payment, name='invoice_process_payment'),
     
+    # Kitchen display
+    path('kitchen/', views.kitchen_display, name='kitchen_display'),
+    path('kitchen/tickets/', views.kitchen_tickets, name='kitchen_tickets'),
+    path('kitchen/stream/', views.kitchen_stream, name='kitchen_stream'),
+    path('kitchen/events/', views.kitchen_events, name='kitchen_events'),
+    
+    # Menu analytics
+    path('analytics/', views.menu_analytics, name='menu_analytics'),
+    
+    # End-of-day close
+    path('billing/closes/', views.daily_close_list, name='daily_close_list'),
+    path('billing/closes/<int:pk>/', views.daily_close_detail, name='daily_close_detail'),
+    
     # AJAX endpoints
     path('api/menu-items/', views.get_menu_items, name='get_menu_items'),
+    path('api/orders/sync/', views.order_sync, name='order_sync'),
+    path('api/analytics/', views.menu_analytics_api, name='menu_analytics_api'),
     path('api/order-details/<int:order_id>/', views.get_order_details_for_invoice, name='get_order_details_for_invoice'),
 ] 
\ No newline at end of file
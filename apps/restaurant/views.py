@@ -3,15 +3,22 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from apps.users.decorators import restaurant_required
 from django.core.paginator import Paginator
+from django.db import transaction
 from django.db.models import Q, Sum
 from django.http import JsonResponse
-from apps.restaurant.models import MenuItem, MenuCategory, Table, Order, OrderItem, Transaction
+from apps.restaurant.models import MenuItem, MenuCategory, Table, Order, OrderItem, Transaction, DailyClose
+from apps.restaurant import analytics, cleanup, daily_close, eta, kitchen, pos_sync, publication, seating
 from apps.guests.models import Guest
 from apps.rooms.models import Room
+from apps.billing.folio import charge_order_to_room, FolioError
+from apps.billing.room_charges import folios_for_rooms, queue_room_charges
+from apps.billing.pricing import Line, create_invoice_items, order_lines, price_lines, tax_rate_for
 import json
-from apps.restaurant.models import RestaurantInvoice, RestaurantInvoiceItem
+from datetime import datetime
+from apps.restaurant.models import RestaurantInvoice
 from django.utils import timezone
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import parse_etags
 from reportlab.lib.pagesizes import mm
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import mm as mm_unit
@@ -26,10 +33,10 @@ def restaurant_dashboard(request):
     pending_orders = Order.objects.filter(status='placed').count()
     active_tables = Table.objects.filter(status='occupied').count()
     
-    # Calculate revenue from transactions instead of orders
-    total_revenue = Transaction.objects.aggregate(
-        total=Sum('amount')
-    )['total'] or 0
+    # Revenue from transactions: frozen daily closes plus the live day
+    today = timezone.localdate()
+    today_revenue = daily_close.revenue_between(today, today)
+    total_revenue = daily_close.revenue_between()
     
     # Recent orders
     recent_orders = Order.objects.select_related('table', 'guest', 'room').order_by('-created_at')[:5]
@@ -44,6 +51,7 @@ def restaurant_dashboard(request):
         'total_orders': total_orders,
         'pending_orders': pending_orders,
         'active_tables': active_tables,
+        'today_revenue': today_revenue,
         'total_revenue': total_revenue,
         'recent_orders': recent_orders,
         'recent_transactions': recent_transactions,
@@ -347,8 +355,10 @@ def order_list(request):
     status = request.GET.get('status', '')
     payment_status = request.GET.get('payment_status', '')
     guest_id = request.GET.get('guest_id', '')
+    archived = request.GET.get('archived', '')
     
-    orders = Order.objects.select_related('table', 'guest', 'room').all()
+    # Settled orders are archived and listed separately
+    orders = Order.objects.select_related('table', 'guest', 'room').filter(archived_at__isnull=(archived != '1'))
     
     if search:
         orders = orders.filter(
@@ -386,6 +396,7 @@ def order_list(request):
         'status': status,
         'payment_status': payment_status,
         'guest_id': guest_id,
+        'archived': archived,
         'status_choices': Order.STATUS_CHOICES,
         'payment_status_choices': Order.PAYMENT_STATUS_CHOICES,
         'total_orders': total_orders,
@@ -409,44 +420,46 @@ def order_create(request):
             guest_phone = request.POST.get('guest_phone', '')
             special_instructions = request.POST.get('special_instructions', '')
             
-            # Create order
-            order = Order.objects.create(
-                table_id=table_id,
-                guest_id=guest_id,
-                room_id=room_id,
-                guest_name=guest_name,
-                guest_phone=guest_phone,
-                special_instructions=special_instructions,
-                created_by=request.user,
-            )
+            # One transaction, so the kitchen display sees the order once, complete
+            with transaction.atomic():
+                # Create order
+                order = Order.objects.create(
+                    table_id=table_id,
+                    guest_id=guest_id,
+                    room_id=room_id,
+                    guest_name=guest_name,
+                    guest_phone=guest_phone,
+                    special_instructions=special_instructions,
+                    created_by=request.user,
+                )
             
-            # Add order items
-            items_data = json.loads(request.POST.get('items', '[]'))
-            total_amount = 0
+                # Add order items
+                items_data = json.loads(request.POST.get('items', '[]'))
+                total_amount = 0
             
-            for item_data in items_data:
-                menu_item = MenuItem.objects.get(id=item_data['menu_item_id'])
-                quantity = int(item_data['quantity'])
-                unit_price = menu_item.price
+                for item_data in items_data:
+                    menu_item = MenuItem.objects.get(id=item_data['menu_item_id'])
+                    quantity = int(item_data['quantity'])
+                    unit_price = menu_item.price
                 
-                OrderItem.objects.create(
-                    order=order,
-                    menu_item=menu_item,
-                    quantity=quantity,
-                    unit_price=unit_price,
-                    special_instructions=item_data.get('special_instructions', '')
-                )
+                    OrderItem.objects.create(
+                        order=order,
+                        menu_item=menu_item,
+                        quantity=quantity,
+                        unit_price=unit_price,
+                        special_instructions=item_data.get('special_instructions', '')
+                    )
                 
-                total_amount += quantity * unit_price
+                    total_amount += quantity * unit_price
             
-            # Update order total
-            order.total_amount = total_amount
-            order.save()
+                # Update order total
+                order.total_amount = total_amount
+                order.save()
             
-            # Update table status
-            table = order.table
-            table.status = 'occupied'
-            table.save()
+                # Update table status
+                table = order.table
+                table.status = 'occupied'
+                table.save()
             
             messages.success(request, f'Order {order.order_number} created successfully.')
             return redirect('restaurant:order_list')
@@ -456,7 +469,7 @@ def order_create(request):
     # Get available data
     tables = Table.objects.filter(status='available', is_active=True)
     guests = Guest.objects.all().order_by('first_name', 'last_name')
-    rooms = Room.objects.filter(status='available')
+    rooms = Room.objects.filter(status='occupied')
     menu_items = MenuItem.objects.filter(is_available=True).select_related('category')
     
     context = {
@@ -472,7 +485,7 @@ def order_create(request):
 @restaurant_required
 def order_detail(request, pk):
     """View order details"""
-    order = get_object_or_404(Order, pk=pk)
+    order = get_object_or_404(Order.objects.select_related('forecast'), pk=pk)
     
     context = {
         'order': order,
@@ -513,32 +526,34 @@ def order_edit(request, pk):
                 new_table.status = 'occupied'
                 new_table.save()
             
-            # Update order items
-            items_data = json.loads(request.POST.get('items', '[]'))
-            total_amount = 0
+            # Replace the items in one transaction so the kitchen display never sees the order empty
+            with transaction.atomic():
+                # Update order items
+                items_data = json.loads(request.POST.get('items', '[]'))
+                total_amount = 0
             
-            # Clear existing items
-            order.items.all().delete()
+                # Clear existing items
+                order.items.all().delete()
             
-            # Add new items
-            for item_data in items_data:
-                menu_item = MenuItem.objects.get(id=item_data['menu_item_id'])
-                quantity = int(item_data['quantity'])
-                unit_price = menu_item.price
+                # Add new items
+                for item_data in items_data:
+                    menu_item = MenuItem.objects.get(id=item_data['menu_item_id'])
+                    quantity = int(item_data['quantity'])
+                    unit_price = menu_item.price
                 
-                OrderItem.objects.create(
-                    order=order,
-                    menu_item=menu_item,
-                    quantity=quantity,
-                    unit_price=unit_price,
-                    special_instructions=item_data.get('special_instructions', '')
-                )
+                    OrderItem.objects.create(
+                        order=order,
+                        menu_item=menu_item,
+                        quantity=quantity,
+                        unit_price=unit_price,
+                        special_instructions=item_data.get('special_instructions', '')
+                    )
                 
-                total_amount += quantity * unit_price
+                    total_amount += quantity * unit_price
             
-            # Update order total
-            order.total_amount = total_amount
-            order.save()
+                # Update order total
+                order.total_amount = total_amount
+                order.save()
             
             messages.success(request, f'Order {order.order_number} updated successfully.')
             return redirect('restaurant:order_detail', pk=order.pk)
@@ -583,24 +598,34 @@ def order_update_status(request, pk):
 
 @restaurant_required
 def get_menu_items(request):
-    """Get menu items for AJAX requests"""
-    category_id = request.GET.get('category')
-    menu_items = MenuItem.objects.filter(is_available=True)
-    
-    if category_id:
-        menu_items = menu_items.filter(category_id=category_id)
-    
-    items_data = []
-    for item in menu_items:
-        items_data.append({
-            'id': item.id,
-            'name': item.name,
-            'price': float(item.price),
-            'description': item.description,
-            'category': item.category.name,
-        })
-    
-    return JsonResponse({'items': items_data})
+    """Get menu items for AJAX requests, from the published menu with ETag revalidation"""
+    category_id = request.GET.get('category', '')
+    if category_id and not category_id.isdigit():
+        return JsonResponse({'items': []})
+
+    menu = publication.published_menu()
+    etag = menu.etag(category_id)
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(menu.body(category_id), content_type='application/json')
+    response['ETag'] = etag
+    # Screens keep their copy but must revalidate it on every load
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@restaurant_required
+def order_sync(request):
+    """Batch order upload from the POS tablets: {"orders": [...]} -> {"results": {key: result}}"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'POST required'}, status=405)
+    try:
+        batch = json.loads(request.body or b'{}').get('orders')
+        results = pos_sync.sync_orders(batch, user=request.user)
+    except (ValueError, AttributeError, pos_sync.SyncError) as e:
+        return JsonResponse({'success': False, 'error': str(e) or 'Malformed batch'}, status=400)
+    return JsonResponse({'success': True, 'results': results})
 
 
 @restaurant_required
@@ -649,47 +674,37 @@ def order_delete(request, pk):
 
 @restaurant_required
 def order_bulk_delete(request):
-    """Delete multiple orders with proper validation"""
+    """Delete (or archive, with action=archive) multiple cancelled or billed orders"""
     if request.method == 'POST':
         order_ids = request.POST.getlist('order_ids')
+        archive = request.POST.get('action') == 'archive'
         
         if not order_ids:
             messages.warning(request, 'No orders selected for deletion.')
             return redirect('restaurant:order_list')
         
         try:
-            # Get orders that can be deleted
-            orders_to_delete = Order.objects.filter(
-                id__in=order_ids,
-                status__in=['cancelled', 'billed']
-            )
-            
-            # Get orders that cannot be deleted
-            orders_cannot_delete = Order.objects.filter(
-                id__in=order_ids
-            ).exclude(status__in=['cancelled', 'billed'])
-            
-            deleted_count = 0
-            for order in orders_to_delete:
-                order.delete()
-                deleted_count += 1
+            result = cleanup.remove_orders(order_ids, user=request.user, archive=archive)
             
             # Show appropriate messages
-            if deleted_count > 0:
-                messages.success(
-                    request, 
-                    f'{deleted_count} order(s) have been permanently deleted.'
-                )
+            if result.removed:
+                if archive:
+                    messages.success(request, f'{len(result.removed)} order(s) have been archived.')
+                else:
+                    messages.success(
+                        request, 
+                        f'{len(result.removed)} order(s) have been permanently deleted.'
+                    )
             
-            if orders_cannot_delete.exists():
-                cannot_delete_numbers = [order.order_number for order in orders_cannot_delete]
+            if result.blocked:
                 messages.warning(
                     request, 
-                    f'The following orders could not be deleted (only cancelled or billed orders can be deleted): {", ".join(cannot_delete_numbers)}'
+                    f'The following orders could not be {"archived" if archive else "deleted"} '
+                    f'(only cancelled or billed orders can be): {", ".join(result.blocked)}'
                 )
             
-            if deleted_count == 0 and not orders_cannot_delete.exists():
-                messages.warning(request, 'No valid orders found for deletion.')
+            if not result.removed and not result.blocked:
+                messages.warning(request, f'No valid orders found for {"archiving" if archive else "deletion"}.')
                 
         except Exception as e:
             messages.error(
@@ -701,6 +716,278 @@ def order_bulk_delete(request):
     return redirect('restaurant:order_list')
 
 
+@restaurant_required
+def order_charge_to_room(request, pk):
+    """Flag a room-service order for posting to the folio of the guest staying in its room"""
+    order = get_object_or_404(Order.objects.select_related('room', 'table'), pk=pk)
+    if request.method != 'POST':
+        return redirect('restaurant:order_detail', pk=order.pk)
+
+    if order.status == 'cancelled' or order.payment_status != 'pending':
+        messages.warning(request, f'Order {order.order_number} has already been settled or cancelled.')
+        return redirect('restaurant:order_detail', pk=order.pk)
+    if not order.room_id:
+        messages.error(request, f'Order {order.order_number} is not linked to a room.')
+        return redirect('restaurant:order_detail', pk=order.pk)
+    if order.room_charge_requested_at:
+        messages.info(request, f'Order {order.order_number} is already waiting to be posted to room {order.room.room_number}.')
+        return redirect('restaurant:order_detail', pk=order.pk)
+    if not folios_for_rooms([order.room_id]):
+        messages.error(request, f'Room {order.room.room_number} has no checked-in stay to charge.')
+        return redirect('restaurant:order_detail', pk=order.pk)
+
+    # The charge is posted to the folio by the room-charge batch (billing.room_charges)
+    with transaction.atomic():
+        order.room_charge_requested_at = timezone.now()
+        order.save(update_fields=['room_charge_requested_at', 'updated_at'])
+        queue_room_charges()
+
+    messages.success(request, f'Order {order.order_number} will be charged to room {order.room.room_number}.')
+    return redirect('restaurant:order_detail', pk=order.pk)
+
+
+def _post_order_to_room(order, user, invoice=None):
+    """Charge an order to its room's folio and settle it; call inside a transaction"""
+    amount = invoice.total_amount if invoice else order.total_amount
+    charge_order_to_room(order, user=user, amount=amount)
+    order.payment_status = 'charged_to_room'
+    order.status = 'billed'
+    order.save()
+    Transaction.objects.create(
+        transaction_type='invoice' if invoice else 'order',
+        invoice=invoice,
+        order=order,
+        customer_name=invoice.customer_name if invoice else order.customer_info,
+        table_number=order.table.table_number,
+        amount=amount,
+        payment_method='room_charge',
+        created_by=user
+    )
+
+
+def _create_order_invoice(order, user, lines=None, **fields):
+    """Invoice an order at the current restaurant tax rate, items in one insert"""
+    priced = price_lines(order_lines(order) if lines is None else lines, tax_rate_for('restaurant'))
+    with transaction.atomic():
+        invoice = RestaurantInvoice.objects.create(
+            order=order,
+            subtotal=priced.subtotal,
+            tax_rate=priced.tax_rate,
+            discount_amount=priced.discount_amount,
+            due_date=timezone.now().date(),
+            created_by=user,
+            **fields
+        )
+        create_invoice_items(invoice, priced, user)
+    return invoice
+
+
+# End-of-day close (Z-report)
+@restaurant_required
+def daily_close_list(request):
+    """Past closes plus the running totals of the day that is still open"""
+    if request.method == 'POST':
+        try:
+            business_date = datetime.strptime(request.POST.get('business_date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            business_date = daily_close.default_business_date()
+        try:
+            closes = daily_close.close_through(business_date, user=request.user)
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect('restaurant:daily_close_list')
+        if closes:
+            messages.success(request, f'Closed {len(closes)} day(s) through {business_date}.')
+        else:
+            messages.info(request, f'{business_date} was already closed.')
+        return redirect('restaurant:daily_close_list')
+
+    paginator = Paginator(DailyClose.objects.select_related('closed_by'), 30)
+    page_obj = paginator.get_page(request.GET.get('page'))
+
+    live = daily_close.live_totals()
+    context = {
+        'page_obj': page_obj,
+        'live': live,
+        'live_sections': _close_sections(live),
+        'last_closed': daily_close.latest_closed_date(),
+        'default_business_date': daily_close.default_business_date(),
+    }
+    return render(request, 'restaurant/daily_close_list.html', context)
+
+
+@restaurant_required
+def daily_close_detail(request, pk):
+    """Frozen Z-report for one business date"""
+    close = get_object_or_404(DailyClose.objects.select_related('closed_by'), pk=pk)
+    sections = _close_sections({
+        'by_payment_method': close.by_payment_method,
+        'by_table': close.by_table,
+        'by_server': close.by_server,
+        'by_category': close.by_category,
+    })
+    return render(request, 'restaurant/daily_close_detail.html', {'close': close, 'sections': sections})
+
+
+def _close_sections(totals):
+    return [
+        ('Payment Method', totals['by_payment_method']),
+        ('Server', totals['by_server']),
+        ('Table', totals['by_table']),
+        ('Menu Category', totals['by_category']),
+    ]
+
+
+# Reservation seating
+def _parse_slot(data):
+    """(date, time, party_size, duration_minutes) from request data; raises ValueError"""
+    day = datetime.strptime(data.get('date', ''), '%Y-%m-%d').date()
+    start_time = datetime.strptime(data.get('time', ''), '%H:%M').time()
+    party_size = int(data.get('party', ''))
+    if party_size < 1:
+        raise ValueError('party must be at least 1')
+    duration = int(data['duration']) if data.get('duration') else None
+    if duration is not None and duration < 1:
+        raise ValueError('duration must be at least 1 minute')
+    return day, start_time, party_size, duration
+
+
+def _serialize_option(option):
+    return {
+        'tables': [{'id': table.pk, 'table_number': table.table_number, 'capacity': table.capacity}
+                   for table in option.tables],
+        'seats': option.seats,
+        'spare': option.spare,
+    }
+
+
+@restaurant_required
+def table_availability(request):
+    """Best table(s) for a party at a time: ?date=YYYY-MM-DD&time=HH:MM&party=N[&duration=minutes]"""
+    try:
+        day, start_time, party_size, duration = _parse_slot(request.GET)
+    except (ValueError, KeyError):
+        return JsonResponse({'success': False, 'error': 'date, time and party are required; duration must be positive'}, status=400)
+
+    options = seating.SeatingPlan(day).best_tables(party_size, start_time, duration)
+    return JsonResponse({
+        'success': True,
+        'duration': duration or seating.default_duration(party_size),
+        'options': [_serialize_option(option) for option in options],
+    })
+
+
+@restaurant_required
+def table_reserve(request):
+    """Reserve the given tables (first one is the main table) if they are still free"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'POST required'}, status=405)
+    try:
+        day, start_time, party_size, duration = _parse_slot(request.POST)
+        table_ids = [int(pk) for pk in request.POST.getlist('tables')]
+    except (ValueError, KeyError):
+        return JsonResponse({'success': False, 'error': 'date, time, party and tables are required; duration must be positive'}, status=400)
+    if len(set(table_ids)) != len(table_ids):
+        return JsonResponse({'success': False, 'error': 'Each table may only be given once'}, status=400)
+
+    tables = {table.pk: table for table in Table.objects.filter(pk__in=table_ids, is_active=True)}
+    if not table_ids or len(tables) != len(table_ids):
+        return JsonResponse({'success': False, 'error': 'Unknown table'}, status=400)
+    if not request.POST.get('guest_name'):
+        return JsonResponse({'success': False, 'error': 'guest_name is required'}, status=400)
+
+    try:
+        reservation = seating.reserve(
+            [tables[pk] for pk in table_ids], day, start_time, party_size,
+            user=request.user,
+            duration_minutes=duration,
+            guest_name=request.POST['guest_name'],
+            guest_phone=request.POST.get('guest_phone', ''),
+            guest_email=request.POST.get('guest_email', ''),
+            special_requests=request.POST.get('special_requests', ''),
+            status='confirmed',
+        )
+    except seating.SeatingError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except seating.SeatingConflict as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=409)
+    return JsonResponse({'success': True, 'reservation_id': reservation.pk})
+
+
+# Kitchen display
+@restaurant_required
+def kitchen_display(request):
+    """Live ticket queue for kitchen screens"""
+    context = {
+        'status_choices': [choice for choice in Order.STATUS_CHOICES if choice[0] in kitchen.ACTIVE_STATUSES],
+        'accuracy': eta.accuracy(),
+    }
+    return render(request, 'restaurant/kitchen_display.html', context)
+
+
+@restaurant_required
+def kitchen_tickets(request):
+    """Full ticket queue; screens load it once and then follow the event feed"""
+    return JsonResponse(kitchen.snapshot())
+
+
+def _last_event_id(request):
+    raw = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or '0'
+    try:
+        return max(int(raw), 0)
+    except ValueError:
+        return 0
+
+
+@restaurant_required
+def kitchen_stream(request):
+    """Server-sent events with ticket deltas"""
+    response = StreamingHttpResponse(kitchen.event_stream(_last_event_id(request)), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@restaurant_required
+def kitchen_events(request):
+    """Polling fallback for screens without EventSource"""
+    return JsonResponse(kitchen.poll_events(_last_event_id(request)))
+
+
+# Menu sales analytics
+def _analytics_period(request):
+    start_date, end_date = analytics.default_period()
+    try:
+        if request.GET.get('start_date'):
+            start_date = datetime.strptime(request.GET['start_date'], '%Y-%m-%d').date()
+        if request.GET.get('end_date'):
+            end_date = datetime.strptime(request.GET['end_date'], '%Y-%m-%d').date()
+    except ValueError:
+        start_date, end_date = analytics.default_period()
+    if start_date > end_date:
+        start_date, end_date = end_date, start_date
+    return start_date, end_date
+
+
+@restaurant_required
+def menu_analytics(request):
+    """Top sellers, slow movers, attach rates and category/cuisine revenue"""
+    start_date, end_date = _analytics_period(request)
+    context = {
+        'report': analytics.sales_report(start_date, end_date),
+        'start_date': start_date,
+        'end_date': end_date,
+    }
+    return render(request, 'restaurant/menu_analytics.html', context)
+
+
+@restaurant_required
+def menu_analytics_api(request):
+    """JSON version of the menu analytics page"""
+    start_date, end_date = _analytics_period(request)
+    return JsonResponse(analytics.sales_report(start_date, end_date))
+
+
 # Restaurant Billing & Invoice Views
 @restaurant_required
 def restaurant_billing_dashboard(request):
@@ -709,9 +996,7 @@ def restaurant_billing_dashboard(request):
     total_invoices = RestaurantInvoice.objects.count()
     pending_invoices = RestaurantInvoice.objects.filter(status='sent').count()
     overdue_invoices = RestaurantInvoice.objects.filter(status='overdue').count()
-    total_revenue = RestaurantInvoice.objects.filter(status='paid').aggregate(
-        total=Sum('total_amount')
-    )['total'] or 0
+    total_revenue = daily_close.revenue_between()
     
     # Recent invoices
     recent_invoices = RestaurantInvoice.objects.select_related('order').order_by('-created_at')[:5]
@@ -785,50 +1070,21 @@ def restaurant_invoice_create(request):
             order_id = request.POST.get('order')
             order = get_object_or_404(Order, id=order_id)
             
-            # Get today's date for due date (simplified - no due date selection)
-            from django.utils import timezone
-            today = timezone.now().date()
+            # Invoice items from the posted items data, or from the order directly
+            items_data = json.loads(request.POST.get('items_data', '[]'))
+            lines = [
+                Line(item_data['description'], item_data['quantity'], item_data['unit_price'], item_data['menu_item_id'])
+                for item_data in items_data
+            ] or None
             
-            # Create invoice with simplified data
-            invoice = RestaurantInvoice.objects.create(
-                order=order,
+            # Simplified form: no contact details, notes or terms; due today
+            invoice = _create_order_invoice(
+                order,
+                request.user,
+                lines=lines,
                 customer_name=request.POST.get('customer_name', order.customer_info),
-                customer_email='',  # No email collection in simplified form
-                customer_phone='',  # No phone collection in simplified form
-                customer_address='',  # No address collection in simplified form
-                subtotal=request.POST.get('subtotal', order.total_amount),
-                tax_rate=0,  # No tax in simplified form
-                discount_amount=0,  # No discount in simplified form
-                due_date=today,  # Set due date to today (simplified)
-                notes='',  # No notes in simplified form
-                terms_conditions='',  # No terms in simplified form
-                created_by=request.user
             )
             
-            # Create invoice items from order items
-            items_data = json.loads(request.POST.get('items_data', '[]'))
-            if not items_data:
-                # If no items data, get from order directly
-                for order_item in order.items.all():
-                    RestaurantInvoiceItem.objects.create(
-                        invoice=invoice,
-                        menu_item=order_item.menu_item,
-                        description=order_item.menu_item.name,
-                        quantity=order_item.quantity,
-                        unit_price=order_item.unit_price
-                    )
-            else:
-                # Use provided items data
-                for item_data in items_data:
-                    menu_item = MenuItem.objects.get(id=item_data['menu_item_id'])
-                    RestaurantInvoiceItem.objects.create(
-                        invoice=invoice,
-                        menu_item=menu_item,
-                        description=item_data['description'],
-                        quantity=item_data['quantity'],
-                        unit_price=item_data['unit_price']
-                    )
-            
             messages.success(request, f'Invoice {invoice.invoice_number} created successfully.')
             # Redirect directly to print page for immediate printing
             return redirect('restaurant:invoice_print', pk=invoice.pk)
@@ -855,35 +1111,15 @@ def restaurant_invoice_create_from_order(request, order_id):
         messages.info(request, f'Invoice {existing.invoice_number} already exists for this order.')
         return redirect('restaurant:invoice_detail', pk=existing.pk)
 
-    from django.utils import timezone
-    today = timezone.now().date()
-
-    # Create a basic invoice using Order data
-    invoice = RestaurantInvoice.objects.create(
-        order=order,
+    # Create a basic invoice using Order data, copying the order items
+    invoice = _create_order_invoice(
+        order,
+        request.user,
         customer_name=getattr(order, 'customer_info', order.guest_name),
-        customer_email='',
         customer_phone=order.guest_phone or '',
-        customer_address='',
-        subtotal=order.total_amount,
-        tax_rate=0,
-        discount_amount=0,
-        due_date=today,
         notes=f'Generated from order {order.order_number}',
-        terms_conditions='',
-        created_by=request.user
     )
 
-    # Copy order items into invoice items
-    for order_item in order.items.all():
-        RestaurantInvoiceItem.objects.create(
-            invoice=invoice,
-            menu_item=order_item.menu_item,
-            description=order_item.menu_item.name,
-            quantity=order_item.quantity,
-            unit_price=order_item.unit_price
-        )
-
     messages.success(request, f'Invoice {invoice.invoice_number} created from order {order.order_number}.')
     return redirect('restaurant:invoice_detail', pk=invoice.pk)
 
@@ -909,26 +1145,29 @@ def restaurant_invoice_edit(request, pk):
             invoice.customer_email = request.POST.get('customer_email', '')
             invoice.customer_phone = request.POST.get('customer_phone', '')
             invoice.customer_address = request.POST.get('customer_address', '')
-            invoice.subtotal = request.POST.get('subtotal')
-            invoice.tax_rate = request.POST.get('tax_rate', 0)
-            invoice.discount_amount = request.POST.get('discount_amount', 0)
             invoice.due_date = request.POST.get('due_date')
             invoice.notes = request.POST.get('notes', '')
             invoice.terms_conditions = request.POST.get('terms_conditions', '')
-            invoice.save()
             
-            # Update invoice items
-            invoice.items.all().delete()  # Remove existing items
+            # Price the posted items in one pass; the subtotal follows the items
             items_data = json.loads(request.POST.get('items_data', '[]'))
-            for item_data in items_data:
-                menu_item = MenuItem.objects.get(id=item_data['menu_item_id'])
-                RestaurantInvoiceItem.objects.create(
-                    invoice=invoice,
-                    menu_item=menu_item,
-                    description=item_data['description'],
-                    quantity=item_data['quantity'],
-                    unit_price=item_data['unit_price']
-                )
+            priced = price_lines(
+                [
+                    Line(item_data['description'], item_data['quantity'], item_data['unit_price'], item_data['menu_item_id'])
+                    for item_data in items_data
+                ],
+                tax_rate=request.POST.get('tax_rate') or 0,
+                discount=request.POST.get('discount_amount') or 0,
+            )
+            invoice.subtotal = priced.subtotal if items_data else request.POST.get('subtotal')
+            invoice.tax_rate = priced.tax_rate
+            invoice.discount_amount = priced.discount_amount if items_data else request.POST.get('discount_amount', 0)
+            
+            with transaction.atomic():
+                invoice.save()
+                # Replace the invoice items
+                invoice.items.all().delete()
+                create_invoice_items(invoice, priced, request.user)
             
             messages.success(request, f'Invoice {invoice.invoice_number} updated successfully.')
             return redirect('restaurant:invoice_detail', pk=invoice.pk)
@@ -1146,6 +1385,21 @@ def restaurant_invoice_process_payment(request, pk):
                 messages.error(request, 'Please choose a payment method.')
                 return redirect('restaurant:invoice_process_payment', pk=invoice.pk)
 
+            if payment_method == 'room_charge':
+                try:
+                    with transaction.atomic():
+                        _post_order_to_room(invoice.order, request.user, invoice=invoice)
+                        invoice.status = 'paid'
+                        invoice.payment_method = payment_method
+                        invoice.payment_reference = payment_reference or invoice.order.order_number
+                        invoice.payment_due_date = timezone.now().date()
+                        invoice.save()
+                except FolioError as e:
+                    messages.error(request, str(e))
+                    return redirect('restaurant:invoice_process_payment', pk=invoice.pk)
+                messages.success(request, f'{invoice.invoice_number} charged to room {invoice.order.room.room_number}.')
+                return redirect('restaurant:invoice_detail', pk=invoice.pk)
+
             invoice.status = 'paid'
             invoice.payment_method = payment_method
             invoice.payment_reference = payment_reference
@@ -1194,27 +1448,11 @@ def restaurant_invoice_start_payment(request, order_id):
         return redirect('restaurant:invoice_process_payment', pk=existing.pk)
 
     # Create invoice then redirect
-    today = timezone.now().date()
-    invoice = RestaurantInvoice.objects.create(
-        order=order,
+    invoice = _create_order_invoice(
+        order,
+        request.user,
         customer_name=getattr(order, 'customer_info', order.guest_name),
-        customer_email='',
         customer_phone=order.guest_phone or '',
-        customer_address='',
-        subtotal=order.total_amount,
-        tax_rate=0,
-        discount_amount=0,
-        due_date=today,
         notes=f'Generated from order {order.order_number}',
-        terms_conditions='',
-        created_by=request.user
     )
-    for oi in order.items.all():
-        RestaurantInvoiceItem.objects.create(
-            invoice=invoice,
-            menu_item=oi.menu_item,
-            description=oi.menu_item.name,
-            quantity=oi.quantity,
-            unit_price=oi.unit_price
-        )
     return redirect('restaurant:invoice_process_payment', pk=invoice.pk)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Room, RoomType, RoomMaintenance, RoomAmenity
+from .models import Room, RoomType, RoomMaintenance, RoomAmenity, RoomRate
 
 
 @admin.register(RoomType)
@@ -26,7 +26,7 @@ class RoomTypeAdmin(admin.ModelAdmin):
 @admin.register(Room)
 class RoomAdmin(admin.ModelAdmin):
     list_display = ['room_number', 'room_type', 'floor', 'status', 'effective_price', 'is_active']
-    list_filter = ['status', 'floor', 'room_type', 'is_active']
+    list_filter = ['status', 'floor', 'room_type', 'is_smoking', 'is_active']
     search_fields = ['room_number', 'room_type__name']
     readonly_fields = ['created_at', 'updated_at']
     ordering = ['room_number']
@@ -36,7 +36,7 @@ class RoomAdmin(admin.ModelAdmin):
             'fields': ('room_number', 'room_type', 'floor')
         }),
         ('Status & Pricing', {
-            'fields': ('status', 'current_price')
+            'fields': ('status', 'current_price', 'is_smoking')
         }),
         ('Additional Information', {
             'fields': ('notes', 'is_active', 'created_at', 'updated_at')
@@ -84,3 +84,24 @@ class RoomAmenityAdmin(admin.ModelAdmin):
             'fields': ('is_active', 'created_at')
         }),
     )
+
+
+@admin.register(RoomRate)
+class RoomRateAdmin(admin.ModelAdmin):
+    list_display = ['name', 'room_type', 'start_date', 'end_date', 'weekdays', 'price', 'priority', 'is_active']
+    list_filter = ['room_type', 'is_active', 'start_date']
+    search_fields = ['name', 'room_type__name']
+    readonly_fields = ['created_at', 'updated_at']
+    ordering = ['room_type', 'start_date', '-priority']
+    
+    fieldsets = (
+        ('Rate Information', {
+            'fields': ('name', 'room_type', 'price', 'priority')
+        }),
+        ('Validity', {
+            'fields': ('start_date', 'end_date', 'weekdays')
+        }),
+        ('Status', {
+            'fields': ('is_active', 'created_at', 'updated_at')
+        }),
+    )
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:07
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import simple_history.models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('rooms', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoricalRoomRate',
+            fields=[
+                ('id', models.BigIntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('name', models.CharField(help_text='e.g. Summer season, Weekend, Eid holidays', max_length=100)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(help_text='Last night the rate applies to (inclusive)')),
+                ('weekdays', models.CharField(default='1111111', help_text='Seven 0/1 flags, Monday first (e.g. 0000110 for Friday and Saturday)', max_length=7, validators=[django.core.validators.RegexValidator(message='Weekdays must be seven 0/1 flags', regex='^[01]{7}$')])),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('priority', models.PositiveIntegerField(default=0, help_text='Higher priority wins when rates overlap')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(blank=True, editable=False)),
+                ('updated_at', models.DateTimeField(blank=True, editable=False)),
+                ('history_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField(db_index=True)),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('room_type', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='rooms.roomtype')),
+            ],
+            options={
+                'verbose_name': 'historical Room Rate',
+                'verbose_name_plural': 'historical Room Rates',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': ('history_date', 'history_id'),
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.CreateModel(
+            name='RoomRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='e.g. Summer season, Weekend, Eid holidays', max_length=100)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(help_text='Last night the rate applies to (inclusive)')),
+                ('weekdays', models.CharField(default='1111111', help_text='Seven 0/1 flags, Monday first (e.g. 0000110 for Friday and Saturday)', max_length=7, validators=[django.core.validators.RegexValidator(message='Weekdays must be seven 0/1 flags', regex='^[01]{7}$')])),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('priority', models.PositiveIntegerField(default=0, help_text='Higher priority wins when rates overlap')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('room_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rates', to='rooms.roomtype')),
+            ],
+            options={
+                'verbose_name': 'Room Rate',
+                'verbose_name_plural': 'Room Rates',
+                'ordering': ['room_type', 'start_date', '-priority'],
+                'indexes': [models.Index(fields=['room_type', 'start_date', 'end_date'], name='rooms_rate_type_dates_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0004_roomrate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalroom',
+            name='is_smoking',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='is_smoking',
+            field=models.BooleanField(default=False),
+        ),
+    ]
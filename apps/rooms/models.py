@@ -1,6 +1,6 @@
 from django.db import models
 from simple_history.models import HistoricalRecords
-from django.core.validators import MinValueValidator, MaxValueValidator
+from django.core.validators import MinValueValidator, MaxValueValidator, RegexValidator
 from decimal import Decimal
 
 
@@ -54,6 +54,7 @@ class Room(models.Model):
     floor = models.PositiveIntegerField(choices=FLOOR_CHOICES)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='available')
     current_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    is_smoking = models.BooleanField(default=False)
     notes = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -145,3 +146,38 @@ class RoomAmenity(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class RoomRate(models.Model):
+    """Seasonal and weekday rate for a room type over a date range"""
+    WEEKDAY_MASK_HELP = "Seven 0/1 flags, Monday first (e.g. 0000110 for Friday and Saturday)"
+
+    room_type = models.ForeignKey(RoomType, on_delete=models.CASCADE, related_name='rates')
+    name = models.CharField(max_length=100, help_text="e.g. Summer season, Weekend, Eid holidays")
+    start_date = models.DateField()
+    end_date = models.DateField(help_text="Last night the rate applies to (inclusive)")
+    weekdays = models.CharField(max_length=7, default='1111111', help_text=WEEKDAY_MASK_HELP, validators=[
+        RegexValidator(regex=r'^[01]{7}$', message="Weekdays must be seven 0/1 flags")
+    ])
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    priority = models.PositiveIntegerField(default=0, help_text="Higher priority wins when rates overlap")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    history = HistoricalRecords()
+
+    class Meta:
+        verbose_name = 'Room Rate'
+        verbose_name_plural = 'Room Rates'
+        ordering = ['room_type', 'start_date', '-priority']
+        indexes = [
+            models.Index(fields=['room_type', 'start_date', 'end_date'], name='rooms_rate_type_dates_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} - {self.room_type.name} ({self.start_date} to {self.end_date}): ${self.price}"
+
+    def applies_on(self, day):
+        """Check if this rate covers the given night"""
+        return (self.start_date <= day <= self.end_date and
+                self.weekdays[day.weekday()] == '1')
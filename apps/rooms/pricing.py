@@ -0,0 +1,112 @@
+"""
+Rate calendar for room pricing.
+
+Nightly prices come from ``RoomRate`` ranges layered over ``RoomType.base_price``.
+A calendar loads every rate overlapping a date window in one query, expands it
+into one nightly series per room type and keeps running totals of that series,
+so the price of any stay inside the window is a single subtraction instead of a
+loop over rooms and nights.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from .models import RoomType, RoomRate
+
+
+ZERO = Decimal('0.00')
+
+
+class RateCalendar:
+    """Nightly rates for the nights ``start_date`` .. ``end_date - 1``"""
+
+    def __init__(self, start_date, end_date, room_types=None):
+        if end_date < start_date:
+            raise ValueError("end_date must not be before start_date")
+        self.start_date = start_date
+        self.end_date = end_date
+        self.nights = (end_date - start_date).days
+
+        if room_types is None:
+            room_types = RoomType.objects.all()
+        self._nightly = {
+            room_type.pk: [room_type.base_price] * self.nights
+            for room_type in room_types
+        }
+
+        rates = RoomRate.objects.filter(
+            is_active=True,
+            room_type_id__in=list(self._nightly),
+            start_date__lt=end_date,
+            end_date__gte=start_date,
+        ).order_by('priority', 'pk')
+
+        # Lowest priority first so that higher-priority rates overwrite it
+        for rate in rates:
+            self._apply(rate)
+
+        self._running = {
+            room_type_id: [ZERO, *accumulate(series)]
+            for room_type_id, series in self._nightly.items()
+        }
+
+    def _apply(self, rate):
+        """Write a rate into its room type series, one slice per weekday"""
+        series = self._nightly[rate.room_type_id]
+        first = max(rate.start_date, self.start_date)
+        last = min(rate.end_date, self.end_date - timedelta(days=1))
+        if first > last:
+            return
+        lo = (first - self.start_date).days
+        hi = (last - self.start_date).days + 1
+        for weekday, flag in enumerate(rate.weekdays):
+            if flag != '1':
+                continue
+            begin = lo + (weekday - first.weekday()) % 7
+            count = len(range(begin, hi, 7))
+            if count:
+                series[begin:hi:7] = [rate.price] * count
+
+    def _offsets(self, check_in, check_out):
+        if not (self.start_date <= check_in <= check_out <= self.end_date):
+            raise ValueError(
+                f"Stay {check_in} to {check_out} is outside the calendar window "
+                f"{self.start_date} to {self.end_date}"
+            )
+        return (check_in - self.start_date).days, (check_out - self.start_date).days
+
+    def nightly_rates(self, room_type_id):
+        """Return (date, price) pairs for every night in the window"""
+        return [
+            (self.start_date + timedelta(days=offset), price)
+            for offset, price in enumerate(self._nightly[room_type_id])
+        ]
+
+    def stay_total(self, room_type_id, check_in, check_out):
+        """Total room charge for a room type between check-in and check-out"""
+        lo, hi = self._offsets(check_in, check_out)
+        running = self._running[room_type_id]
+        return running[hi] - running[lo]
+
+    def quote(self, room, check_in, check_out):
+        """Total for a specific room; a manual ``current_price`` overrides the calendar"""
+        if room.current_price:
+            lo, hi = self._offsets(check_in, check_out)
+            return room.current_price * (hi - lo)
+        return self.stay_total(room.room_type_id, check_in, check_out)
+
+    def quote_rooms(self, rooms, check_in, check_out):
+        """Return {room_id: total} for many rooms over the same stay"""
+        return {room.pk: self.quote(room, check_in, check_out) for room in rooms}
+
+    def quote_stays(self, stays):
+        """Totals for many (room_type_id, check_in, check_out) stays, in order"""
+        return [self.stay_total(*stay) for stay in stays]
+
+
+def quote_stay(room, check_in, check_out):
+    """Price a single stay for a room using the rate calendar"""
+    if not check_in or not check_out or check_out <= check_in:
+        return ZERO
+    calendar = RateCalendar(check_in, check_out, room_types=[room.room_type])
+    return calendar.quote(room, check_in, check_out)
@@ -7,6 +7,7 @@ from django.db.models import Q, Count, Sum
 from django.utils import timezone
 from datetime import datetime, timedelta
 from .models import Room, RoomType, RoomMaintenance
+from .pricing import RateCalendar
 from apps.bookings.models import Booking
 
 
@@ -115,18 +116,25 @@ def room_availability(request):
             # Convert to date objects
             check_in = datetime.strptime(check_in_date, '%Y-%m-%d').date()
             check_out = datetime.strptime(check_out_date, '%Y-%m-%d').date()
+            if check_out <= check_in:
+                return JsonResponse({'error': 'Check-out date must be after check-in date.'}, status=400)
             
-            # Find available rooms
-            available_rooms = get_available_rooms(check_in, check_out, int(guests))
+            # Find available rooms and price every stay from one rate calendar
+            available_rooms = list(get_available_rooms(check_in, check_out, int(guests)).select_related('room_type'))
+            calendar = RateCalendar(check_in, check_out, room_types={room.room_type for room in available_rooms})
+            totals = calendar.quote_rooms(available_rooms, check_in, check_out)
+            nights = calendar.nights
             
             return JsonResponse({
+                'nights': nights,
                 'available_rooms': [
                     {
                         'id': room.id,
                         'room_number': room.room_number,
                         'room_type': room.room_type.name,
                         'capacity': room.room_type.capacity,
-                        'price': float(room.effective_price),
+                        'price': float(round(totals[room.id] / nights, 2)),
+                        'total_amount': float(totals[room.id]),
                         'floor': room.get_floor_display(),
                     }
                     for room in available_rooms
@@ -4,6 +4,7 @@ Django settings for hotel_project.
 
 import os
 from pathlib import Path
+from celery.schedules import crontab
 from decouple import config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -146,6 +147,16 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'night-audit': {
+        'task': 'apps.billing.tasks.night_audit',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    'archive-settled-records': {
+        'task': 'apps.billing.tasks.archive_settled_records',
+        'schedule': crontab(minute='*/15'),
+    },
+}
 
 # Email Configuration
 EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
@@ -4,6 +4,7 @@ Django settings for hotel_project.
 
 import os
 from pathlib import Path
+from celery.schedules import crontab
 from decouple import config
 
 
@@ -182,6 +183,32 @@ if CELERY_BROKER_URL:
     CELERY_TASK_SERIALIZER = 'json'
     CELERY_RESULT_SERIALIZER = 'json'
     CELERY_TIMEZONE = TIME_ZONE
+    CELERY_BEAT_SCHEDULE = {
+        'night-audit': {
+            'task': 'apps.billing.tasks.night_audit',
+            'schedule': crontab(hour=2, minute=0),
+        },
+        'archive-settled-records': {
+            'task': 'apps.billing.tasks.archive_settled_records',
+            'schedule': crontab(minute='*/15'),
+        },
+        'post-room-charges': {
+            'task': 'apps.billing.tasks.post_room_charges',
+            'schedule': crontab(minute='*/5'),
+        },
+        'rollup-menu-sales': {
+            'task': 'apps.restaurant.tasks.rollup_menu_sales',
+            'schedule': crontab(minute='*/5'),
+        },
+        'prune-kitchen-events': {
+            'task': 'apps.restaurant.tasks.prune_kitchen_events',
+            'schedule': crontab(minute=45),
+        },
+        'close-restaurant-day': {
+            'task': 'apps.restaurant.tasks.close_restaurant_day',
+            'schedule': crontab(hour=0, minute=30),
+        },
+    }
 
 # Email Configuration
 EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')